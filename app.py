@@ -1,22 +1,26 @@
 # app.py
 import os
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-from flask_session import Session
 from db import db  # Import db from db.py
 from flask_migrate import Migrate
 from cogs import register_cogs  # Import the register_cogs function
+from utils.compression import init_compression
+from utils.search_index import ensure_search_index
+from utils.db_tuning import engine_options, apply_sqlite_pragmas
+from utils.session_backend import configure_sessions
+from utils.static_assets import init_static_assets
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file if present
 load_dotenv()
 
 def create_app():
-    app = Flask(__name__, static_folder='static', static_url_path='')
+    # The frontend is served by utils.static_assets, not Flask's static route
+    app = Flask(__name__, static_folder=None)
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-default-secret-key')
-    app.config['SESSION_TYPE'] = 'filesystem'  # Use filesystem for session storage
     app.config['SESSION_PERMANENT'] = False
 
     # --- Add Timeout and File Upload Configurations ---
@@ -25,6 +29,8 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
     app.config['REQUEST_TIMEOUT'] = 60  # 60 seconds
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Limit file size to 16 MB
+    # Let Apache/lighttpd send upload bytes (nginx: UPLOADS_ACCEL_REDIRECT_PREFIX)
+    app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
 
     # Database configuration
     print("\nGetting DB credentials...")
@@ -42,12 +48,16 @@ def create_app():
         print("Using local SQLite database:", app.config["SQLALCHEMY_DATABASE_URI"])
 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 
 
     # Initialize extensions
     CORS(app, supports_credentials=True)
-    Session(app)  # Initialize server-side sessions
+    init_compression(app)  # gzip/brotli for JSON API responses
     db.init_app(app)  # Initialize the database
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine)  # Before the first connection is opened
+    configure_sessions(app, db)  # SESSION_BACKEND: filesystem, sqlalchemy or cookie
 
     # Initialize Flask-Migrate
     migrate = Migrate(app, db)
@@ -58,18 +68,10 @@ def create_app():
     # Create database tables if they don't exist
     with app.app_context():
         db.create_all()
+        ensure_search_index()  # Full-text index is not a model table
 
     # Add routes for serving the frontend (e.g., React)
-    @app.route("/")
-    def index():
-        return send_from_directory(app.static_folder, 'index.html')
-
-    @app.route("/<path:path>")
-    def static_proxy(path):
-        # Serve static files if they exist, else serve index.html (for SPA routing)
-        if os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
-        return send_from_directory(app.static_folder, 'index.html')
+    init_static_assets(app, os.path.join(app.root_path, 'static'))
 
     return app
 
@@ -0,0 +1,96 @@
+# benchmarks/compressed_storage.py
+"""
+Measure database size and read throughput of Message.content stored plain
+versus compressed by utils.compressed_text.
+
+Usage:
+    python benchmarks/compressed_storage.py --messages 50000 --threshold 1024
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from db import db
+from models import Conversation, Message
+from utils import compressed_text
+
+PARAGRAPHS = [
+    "## Overview\nThe Marine Corps continues to modernize its logistics enterprise to support distributed operations.",
+    "- **Readiness:** Units report maintenance status weekly through the readiness dashboard.",
+    "1. Review the current training schedule.\n2. Identify gaps in qualification.\n3. Submit the updated plan.",
+    "![Generated Image](https://example.blob.core.windows.net/private/images/img-abc123.png?st=2024&se=2024&sp=r)",
+    "Expeditionary advanced base operations require resilient communications and sustainment in contested littorals.",
+    "| Unit | Status | Notes |\n|------|--------|-------|\n| 1st Bn | Ready | None |\n| 2nd Bn | Limited | Parts |",
+]
+
+
+def reply(rng):
+    # Assistant replies: a few hundred bytes up to several kilobytes of markdown
+    return "\n\n".join(rng.choice(PARAGRAPHS) for _ in range(rng.randint(2, 40)))
+
+
+def build(path, codec, n_messages, threshold):
+    compressed_text.configure(codec=codec, threshold=threshold)
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    rng = random.Random(0)
+    base = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        session.execute(insert(Conversation), [
+            {"id": i, "session_id": "bench", "title": f"Conversation {i}", "timestamp": base, "version": 0}
+            for i in range(1, 101)
+        ])
+        start = time.perf_counter()
+        for offset in range(0, n_messages, 5000):
+            session.execute(insert(Message), [
+                {"conversation_id": rng.randint(1, 100), "role": "assistant",
+                 "content": reply(rng), "timestamp": base + timedelta(seconds=i)}
+                for i in range(offset, min(offset + 5000, n_messages))
+            ])
+        session.commit()
+        write_seconds = time.perf_counter() - start
+    engine.dispose()
+    return write_seconds
+
+
+def read_all(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as session:
+        start = time.perf_counter()
+        total = 0
+        rows = 0
+        for content in session.execute(select(Message.content).execution_options(yield_per=2000)).scalars():
+            total += len(content)
+            rows += 1
+        seconds = time.perf_counter() - start
+    engine.dispose()
+    return rows, total, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    codecs = ["", "zlib"] + (["zstd"] if compressed_text.zstandard else [])
+    workdir = tempfile.mkdtemp()
+    print(f"{'codec':8} {'db size':>10} {'write':>9} {'read rows/s':>12} {'read MB/s':>10}")
+    for codec in codecs:
+        path = os.path.join(workdir, f"{codec or 'plain'}.db")
+        write_seconds = build(path, codec, args.messages, args.threshold)
+        rows, total, seconds = read_all(path)
+        print(f"{codec or 'plain':8} {os.path.getsize(path) / 1e6:8.1f}MB {write_seconds:8.2f}s "
+              f"{rows / seconds:12,.0f} {total / seconds / 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/fts_search.py
+"""
+Seed a SQLite database with a large message corpus and compare the FTS5
+search used by GET /conversations/search against a LIKE scan.
+
+Usage:
+    python benchmarks/fts_search.py --messages 1000000 --db /tmp/bench_fts.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from db import db
+import models  # noqa: F401  (registers the tables on db.metadata)
+from utils.search_index import SQLITE_DDL, SQLITE_SEARCH, to_fts5_query
+
+DOMAIN_WORDS = (
+    "marine corps amphibious assault logistics doctrine training deployment readiness vehicle "
+    "aviation infantry artillery command control communications intelligence maintenance supply "
+    "budget policy strategy exercise brief summary report analysis operation force reconnaissance "
+    "expeditionary littoral maritime combat support equipment personnel leadership mission planning"
+).split()
+
+
+def vocabulary(rng, size=30000):
+    """Synthetic vocabulary with the domain words spread over common and rare ranks."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+    for i, word in enumerate(DOMAIN_WORDS):
+        words[int(10 * 1.25 ** i) % size] = word
+    return words
+
+LIKE_SEARCH = (
+    "SELECT message.id, message.conversation_id, message.content FROM message "
+    "JOIN conversation ON conversation.id = message.conversation_id "
+    "WHERE conversation.session_id = ? AND message.content LIKE ? "
+    "ORDER BY message.timestamp DESC LIMIT 20"
+)
+
+
+def sentence(rng, words, length):
+    # Zipf-ish: early words in the vocabulary are far more common than later ones
+    return ' '.join(words[min(int(rng.paretovariate(1.0)) - 1, len(words) - 1)] for _ in range(length))
+
+
+def seed(path, n_messages, n_conversations, n_sessions):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(0)
+    words = vocabulary(rng)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2024, 1, 1)
+    sessions = [str(uuid.uuid4()) for _ in range(n_sessions)]
+    conn.executemany(
+        "INSERT INTO conversation (id, session_id, title, timestamp, version) VALUES (?, ?, ?, ?, 0)",
+        ((i, rng.choice(sessions), f"Conversation {i}", base + timedelta(minutes=i))
+         for i in range(1, n_conversations + 1))
+    )
+    chunk = 100000
+    for start in range(0, n_messages, chunk):
+        conn.executemany(
+            "INSERT INTO message (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+            ((rng.randint(1, n_conversations), 'user' if i % 2 == 0 else 'assistant',
+              sentence(rng, words, rng.randint(10, 120)), base + timedelta(seconds=i))
+             for i in range(start, min(start + chunk, n_messages)))
+        )
+        conn.commit()
+        print(f"  seeded {min(start + chunk, n_messages):,} / {n_messages:,} messages", end="\r")
+    print()
+
+    start = time.perf_counter()
+    conn.execute(SQLITE_DDL)
+    conn.execute(
+        "INSERT INTO message_fts (rowid, content, conversation_id, session_id) "
+        "SELECT message.id, message.content, message.conversation_id, conversation.session_id "
+        "FROM message JOIN conversation ON conversation.id = message.conversation_id"
+    )
+    conn.commit()
+    print(f"Built FTS index in {time.perf_counter() - start:.1f}s")
+    conn.close()
+    return sessions
+
+
+def timed(conn, sql, params, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params()).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bench_fts_search.db")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.db} with {args.messages:,} messages...")
+    sessions = seed(args.db, args.messages, args.conversations, args.sessions)
+    print(f"Database size: {os.path.getsize(args.db) / 1e6:.1f} MB")
+
+    conn = sqlite3.connect(args.db)
+    rng = random.Random(1)
+    print(f"\n{'query':32} {'FTS median':>12} {'FTS p95':>10} {'LIKE median':>12} {'LIKE p95':>10}")
+    for query in ["marine", "amphibious assault", "littoral mission", "reconnaissance planning", "logis"]:
+        fts = timed(conn, SQLITE_SEARCH.replace(':query', '?').replace(':limit', '20').replace(':offset', '0'),
+                    lambda: (to_fts5_query(query, rng.choice(sessions)),), args.runs)
+        like = timed(conn, LIKE_SEARCH, lambda: (rng.choice(sessions), f"%{query}%"), args.runs)
+        print(f"{query:32} {fts[0]:10.2f}ms {fts[1]:8.2f}ms {like[0]:10.2f}ms {like[1]:8.2f}ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
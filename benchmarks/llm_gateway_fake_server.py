@@ -0,0 +1,188 @@
+# benchmarks/llm_gateway_fake_server.py
+"""
+Drive utils.llm_gateway against a local fake OpenAI server that enforces
+requests- and tokens-per-minute limits the way the real API does: requests
+over the limit get a 429 with a Retry-After header.
+
+A burst of background requests is sent alongside a trickle of interactive
+ones, first straight through the OpenAI SDK with retries off (what the app
+did before the gateway), then through the gateway. Reported per run: 429s
+returned by the server, requests that still failed, and interactive latency.
+
+The server charges each request with utils.token_budget (prompt tokens plus
+max_tokens), standing in for OpenAI's own accounting.
+
+Usage:
+    python benchmarks/llm_gateway_fake_server.py --background 150 --interactive 30
+    python benchmarks/llm_gateway_fake_server.py --serve --port 8089   # server only
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import openai
+from utils.llm_gateway import LLMGateway, TokenBucket, estimate_tokens
+
+
+class FakeOpenAI:
+    """Rate-limit state shared by the request handlers."""
+
+    def __init__(self, rpm, tpm, burst_seconds, latency):
+        self.requests = TokenBucket(max(rpm * burst_seconds / 60, 1), rpm / 60)
+        self.tokens = TokenBucket(tpm * burst_seconds / 60, tpm / 60)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def admit(self, tokens):
+        """Return 0 if the request is admitted, else the seconds until it would be."""
+        with self.lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                self.rejected += 1
+                return wait
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.accepted += 1
+            return 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self.send_json(404, {"error": {"message": "not found"}})
+            wait = state.admit(estimate_tokens(body))
+            if wait:
+                return self.send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"retry-after-ms": str(int(wait * 1000) + 1)}
+                )
+            time.sleep(state.latency)
+            self.send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "ok"},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            })
+
+    return Handler
+
+
+def start_server(port, rpm, tpm, burst_seconds, latency):
+    state = FakeOpenAI(rpm, tpm, burst_seconds, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def run_workload(client, args, use_priority):
+    prompt = [{"role": "user", "content": "word " * args.prompt_words}]
+    latencies, failures = [], []
+
+    def call(priority):
+        kwargs = {"model": "gpt-4o-mini", "messages": prompt, "max_tokens": args.max_tokens}
+        if use_priority:
+            kwargs["priority"] = priority
+        start = time.perf_counter()
+        try:
+            client.chat.completions.create(**kwargs)
+            if priority == "interactive":
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            failures.append(e.__class__.__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(call, "background") for _ in range(args.background)]
+        for _ in range(args.interactive):
+            # Users arrive while the backlog is being worked through
+            time.sleep(args.interactive_interval)
+            futures.append(pool.submit(call, "interactive"))
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start, latencies, failures
+
+
+def report(name, state, elapsed, latencies, failures):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else float('nan')
+    print(f"{name:<22} {elapsed:6.1f}s  429s={state.rejected:<5} ok={state.accepted:<5} "
+          f"failed={len(failures):<5} interactive p50={p(0.5):7.0f}ms p95={p(0.95):7.0f}ms "
+          f"(n={len(latencies)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--tpm", type=int, default=120000)
+    parser.add_argument("--burst-seconds", type=float, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per accepted request")
+    parser.add_argument("--background", type=int, default=150)
+    parser.add_argument("--interactive", type=int, default=30)
+    parser.add_argument("--interactive-interval", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--prompt-words", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--serve", action="store_true", help="Only run the fake server")
+    args = parser.parse_args()
+
+    if args.serve:
+        server, _ = start_server(args.port, args.rpm, args.tpm, args.burst_seconds, args.latency)
+        print(f"Fake OpenAI on http://127.0.0.1:{args.port}/v1 (rpm={args.rpm}, tpm={args.tpm})")
+        threading.Event().wait()
+
+    runs = [
+        ("direct, no retries", lambda: raw, False),
+        ("gateway, no priority", lambda: LLMGateway(raw, limits=limits, burst_seconds=args.burst_seconds), False),
+        ("gateway, priority", lambda: LLMGateway(raw, limits=limits, burst_seconds=args.burst_seconds), True),
+    ]
+    limits = {"gpt-4o-mini": (args.rpm, args.tpm)}
+    for i, (name, make_client, use_priority) in enumerate(runs):
+        port = args.port + i  # A fresh server, and fresh limits, per run
+        server, state = start_server(port, args.rpm, args.tpm, args.burst_seconds, args.latency)
+        raw = openai.OpenAI(base_url=f"http://127.0.0.1:{port}/v1", api_key="fake", max_retries=0,
+                            http_client=httpx.Client(limits=httpx.Limits(max_connections=args.concurrency)))
+        elapsed, latencies, failures = run_workload(make_client(), args, use_priority)
+        report(name, state, elapsed, latencies, failures)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/query_paths.py
+"""
+Seed a SQLite database with a large chat history and compare latency and
+query plans of the hot query paths with and without the model indexes.
+
+Usage:
+    python benchmarks/query_paths.py --messages 2000000 --db /tmp/bench.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from db import db
+import models  # noqa: F401  (registers the tables on db.metadata)
+
+QUERIES = {
+    "conversation list": (
+        "SELECT id, title, timestamp FROM conversation WHERE session_id = ? ORDER BY timestamp DESC LIMIT 10",
+        lambda keys: (random.choice(keys["sessions"]),)
+    ),
+    "message history": (
+        "SELECT role, content FROM message WHERE conversation_id = ? ORDER BY timestamp",
+        lambda keys: (random.randint(1, keys["conversations"]),)
+    ),
+    "session files": (
+        "SELECT id, filename FROM uploaded_file WHERE session_id = ?",
+        lambda keys: (random.choice(keys["sessions"]),)
+    ),
+    "upload authorization": (
+        "SELECT id FROM uploaded_file WHERE session_id = ? AND filename = ? LIMIT 1",
+        lambda keys: random.choice(keys["files"])
+    ),
+}
+
+
+def timestamp(base, seconds):
+    return (base + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def seed(path, n_messages, n_conversations, n_sessions, n_files):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2024, 1, 1)
+    sessions = [str(uuid.uuid4()) for _ in range(n_sessions)]
+
+    conn.executemany(
+        "INSERT INTO conversation (id, session_id, title, timestamp, version) VALUES (?, ?, ?, ?, 0)",
+        ((i, random.choice(sessions), f"Conversation {i}", timestamp(base, i * 60))
+         for i in range(1, n_conversations + 1))
+    )
+
+    files = []
+    for i in range(1, n_files + 1):
+        session_id = random.choice(sessions)
+        filename = f"{uuid.uuid4()}_report_{i}.pdf"
+        files.append((session_id, filename))
+    conn.executemany(
+        "INSERT INTO uploaded_file (session_id, filename, original_filename, file_url, file_type, timestamp) "
+        "VALUES (?, ?, ?, ?, 'application/pdf', ?)",
+        ((session_id, filename, filename.split('_', 1)[1], f"/uploads/{filename}", timestamp(base, i))
+         for i, (session_id, filename) in enumerate(files))
+    )
+
+    content = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    chunk = 100000
+    for start in range(0, n_messages, chunk):
+        rows = []
+        for i in range(start, min(start + chunk, n_messages)):
+            rows.append((
+                random.randint(1, n_conversations),
+                'user' if i % 2 == 0 else 'assistant',
+                content,
+                timestamp(base, i)
+            ))
+        conn.executemany(
+            "INSERT INTO message (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        print(f"  seeded {min(start + chunk, n_messages):,} / {n_messages:,} messages", end="\r")
+    print()
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return {"sessions": sessions, "conversations": n_conversations, "files": files}
+
+
+def model_indexes():
+    return [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+
+def drop_indexes(path):
+    conn = sqlite3.connect(path)
+    for index in model_indexes():
+        conn.execute(f"DROP INDEX IF EXISTS {index.name}")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def create_indexes(path):
+    engine = create_engine(f"sqlite:///{path}")
+    for index in model_indexes():
+        index.create(engine, checkfirst=True)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def measure(path, keys, runs):
+    conn = sqlite3.connect(path)
+    results = {}
+    for name, (sql, make_params) in QUERIES.items():
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", make_params(keys)).fetchall()
+        timings = []
+        for _ in range(runs):
+            params = make_params(keys)
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[int(len(timings) * 0.95) - 1],
+            "plan": "; ".join(row[-1] for row in plan),
+        }
+    conn.close()
+    return results
+
+
+def report(label, results):
+    print(f"\n== {label} ==")
+    for name, result in results.items():
+        print(f"{name:22} median {result['median_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms")
+        print(f"{'':22} plan: {result['plan']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bench_query_paths.db")
+    parser.add_argument("--messages", type=int, default=2000000)
+    parser.add_argument("--conversations", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"Seeding {args.db} with {args.messages:,} messages...")
+    keys = seed(args.db, args.messages, args.conversations, args.sessions, args.files)
+
+    drop_indexes(args.db)
+    before = measure(args.db, keys, args.runs)
+    report("without indexes", before)
+
+    start = time.perf_counter()
+    create_indexes(args.db)
+    print(f"\nBuilt indexes in {time.perf_counter() - start:.1f}s")
+    after = measure(args.db, keys, args.runs)
+    report("with indexes", after)
+
+    print("\n== speedup (median) ==")
+    for name in QUERIES:
+        speedup = before[name]["median_ms"] / max(after[name]["median_ms"], 1e-6)
+        print(f"{name:22} {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
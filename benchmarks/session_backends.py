@@ -0,0 +1,94 @@
+# benchmarks/session_backends.py
+"""
+Measure the per-request cost of each session backend offered by
+utils.session_backend: a minimal route that reads the session (as every API
+call does) and one that writes it (as starting a conversation does), each
+compared against a request that carries no session cookie at all.
+
+Usage:
+    python benchmarks/session_backends.py --requests 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify, session
+from flask_sqlalchemy import SQLAlchemy
+from utils.db_tuning import apply_sqlite_pragmas, engine_options
+from utils.session_backend import SESSION_BACKENDS, configure_sessions
+
+
+def make_app(backend, workdir):
+    app = Flask(__name__)
+    uri = f"sqlite:///{os.path.join(workdir, backend + '.db')}"
+    app.config.update(
+        SECRET_KEY="bench",
+        SESSION_PERMANENT=False,
+        SESSION_FILE_DIR=os.path.join(workdir, "flask_session"),
+        SQLALCHEMY_DATABASE_URI=uri,
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options(uri),
+    )
+    # A fresh SQLAlchemy instance per app so each backend gets its own session model
+    db = SQLAlchemy()
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine)
+    configure_sessions(app, db, backend)
+
+    @app.route("/baseline")
+    def baseline():
+        return jsonify({})
+
+    @app.route("/read")
+    def read():
+        return jsonify({"session_id": session.get("session_id"),
+                        "conversation": session.get("current_conversation_id")})
+
+    @app.route("/write")
+    def write():
+        session["current_conversation_id"] = session.get("current_conversation_id", 0) + 1
+        return jsonify({})
+
+    @app.route("/login")
+    def login():
+        session["session_id"] = str(uuid.uuid4())
+        return jsonify({})
+
+    return app
+
+
+def per_request_us(client, path, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(path)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    print(f"{args.requests} requests per route, microseconds per request\n")
+    print(f"{'backend':12} {'no session':>10} {'read':>10} {'write':>10} {'read cost':>10} {'write cost':>11}")
+    for backend in SESSION_BACKENDS:
+        app = make_app(backend, workdir)
+        anonymous = app.test_client()
+        client = app.test_client()
+        client.get("/login")
+        for path in ("/read", "/write"):
+            per_request_us(client, path, 50)  # warm up
+        base = per_request_us(anonymous, "/baseline", args.requests)
+        read = per_request_us(client, "/read", args.requests)
+        write = per_request_us(client, "/write", args.requests)
+        print(f"{backend:12} {base:10.0f} {read:10.0f} {write:10.0f} {read - base:10.0f} {write - base:11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/sqlite_writers.py
+"""
+Run several writer processes against one SQLite file, as multiple gunicorn
+workers do, and compare the default rollback journal with the WAL profile
+applied by utils.db_tuning.
+
+Each writer performs chat-turn-sized transactions (two message inserts and a
+conversation version bump) while a reader process keeps loading history.
+
+Usage:
+    python benchmarks/sqlite_writers.py --writers 4 --turns 500
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+from db import db
+from models import Conversation, Message
+from utils.db_tuning import apply_sqlite_pragmas, engine_options
+
+
+def make_engine(path, tuned):
+    uri = f"sqlite:///{path}"
+    if tuned:
+        engine = create_engine(uri, **engine_options(uri))
+        apply_sqlite_pragmas(engine, wal=True)
+    else:
+        # SQLite defaults: rollback journal, synchronous=FULL, no busy wait
+        engine = create_engine(uri, connect_args={"timeout": 0})
+    return engine
+
+
+def writer(path, tuned, turns, conversation_id, results):
+    engine = make_engine(path, tuned)
+    done = locked = 0
+    start = time.perf_counter()
+    for turn in range(turns):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Message), [
+                    {"conversation_id": conversation_id, "role": "user",
+                     "content": f"question {turn}", "timestamp": datetime.utcnow()},
+                    {"conversation_id": conversation_id, "role": "assistant",
+                     "content": "answer " * 100, "timestamp": datetime.utcnow()},
+                ])
+                conn.execute(
+                    update(Conversation).where(Conversation.id == conversation_id)
+                    .values(version=Conversation.version + 1)
+                )
+            done += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    results.put(("writer", done, locked, time.perf_counter() - start))
+
+
+def reader(path, tuned, stop, results):
+    engine = make_engine(path, tuned)
+    reads = locked = 0
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    select(Message.role, Message.content)
+                    .where(Message.conversation_id == 1).order_by(Message.timestamp)
+                ).all()
+            reads += 1
+        except OperationalError:
+            locked += 1
+    results.put(("reader", reads, locked, 0))
+
+
+def run(tuned, writers, turns):
+    path = os.path.join(tempfile.mkdtemp(), "writers.db")
+    engine = make_engine(path, tuned)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Conversation), [
+            {"id": i, "session_id": "bench", "title": "bench", "version": 0} for i in range(1, writers + 1)
+        ])
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    read_proc = multiprocessing.Process(target=reader, args=(path, tuned, stop, results))
+    procs = [
+        multiprocessing.Process(target=writer, args=(path, tuned, turns, i + 1, results))
+        for i in range(writers)
+    ]
+    start = time.perf_counter()
+    read_proc.start()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    read_proc.join()
+
+    committed = failed = reads = read_failures = 0
+    for _ in range(writers + 1):
+        kind, ok, errors, _ = results.get()
+        if kind == "writer":
+            committed += ok
+            failed += errors
+        else:
+            reads, read_failures = ok, errors
+    return committed, failed, elapsed, reads, read_failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers x {args.turns} turns, 1 concurrent reader\n")
+    print(f"{'profile':18} {'committed':>10} {'locked':>8} {'turns/s':>9} {'reads':>8} {'read errs':>10}")
+    for label, tuned in [("rollback journal", False), ("WAL + NORMAL", True)]:
+        committed, failed, elapsed, reads, read_failures = run(tuned, args.writers, args.turns)
+        print(f"{label:18} {committed:10} {failed:8} {committed / elapsed:9.0f} {reads:8} {read_failures:10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,24 @@ from .conversations import ConversationsCog
 from .orchestration_analysis import OrchestrationAnalysisCog
 from .web_search import WebSearchCog
 from .code_files import CodeFilesCog
+from .metrics import MetricsCog
+from .batch_chat import BatchChatCog
 
 
 def register_cogs(app, flask_app):
     chat_cog = ChatCog(app, flask_app)
-    uploads_cog = UploadsCog(chat_cog.upload_folder)
+    uploads_cog = UploadsCog(chat_cog.upload_folder, storage=chat_cog.upload_storage,
+                             visualizer=chat_cog.code_structure_visualizer_cog)
     conversations_cog = ConversationsCog()
     orchestration_analysis_cog = OrchestrationAnalysisCog(chat_cog.client)
     web_search_cog = WebSearchCog(openai_client=chat_cog.client)
     code_files_cog = CodeFilesCog()
+    metrics_cog = MetricsCog()
+    batch_chat_cog = BatchChatCog(chat_cog)
 
     app.register_blueprint(chat_cog.bp)
     app.register_blueprint(uploads_cog.bp)
     app.register_blueprint(conversations_cog.bp)
+    app.register_blueprint(metrics_cog.bp)
+    app.register_blueprint(batch_chat_cog.bp)
     # Register other cogs as needed
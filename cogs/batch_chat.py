@@ -0,0 +1,229 @@
+# cogs/batch_chat.py
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from db import db
+from models import Conversation, UploadedFile
+from cogs.orchestration_analysis import OrchestrationAnalysisCog
+from .web_search import WebSearchCog
+from utils.persistence import persist_messages
+
+DEFAULT_SYSTEM_PROMPT = "You are a USMC AI agent. Provide relevant responses."
+
+
+class BatchChatCog:
+    def __init__(self, chat_cog):
+        """
+        Initialize the BatchChatCog.
+
+        :param chat_cog: The ChatCog whose prompt assembly, orchestration handling
+            and response cache batch prompts share.
+        """
+        self.bp = Blueprint("batch_chat_blueprint", __name__)
+        self.chat_cog = chat_cog
+
+        # Batch work queues behind interactive chat in the LLM gateway
+        self.client = chat_cog.client.with_priority("background")
+        self.orchestration_analysis_cog = OrchestrationAnalysisCog(self.client)
+        self.web_search_cog = WebSearchCog(openai_client=self.client)
+
+        self.concurrency = int(os.getenv('BATCH_CHAT_CONCURRENCY', 8))
+        self.max_prompts = int(os.getenv('BATCH_CHAT_MAX_PROMPTS', 500))
+        # Finished prompts are committed in groups of this many
+        self.commit_every = int(os.getenv('BATCH_CHAT_COMMIT_EVERY', 50))
+        self.add_routes()
+
+    def add_routes(self):
+        @self.bp.route("/chat/batch", methods=["POST"])
+        def chat_batch():
+            """
+            Answer many independent prompts in one request.
+
+            JSON body: "prompts" (strings, or objects with "message" and optional
+            "id", "model" and "temperature"), and optional shared "system_prompt",
+            "model", "temperature", "file_id" (an upload of this session given to
+            every prompt as context, in place of routing), "orchestrate" (default
+            true; false skips the routing call and web search) and "title".
+
+            Prompts run concurrently at background priority. Each result is
+            streamed as an NDJSON line as soon as it finishes, in completion
+            order; the last line summarizes the batch. Results are saved to a new
+            conversation in groups of BATCH_CHAT_COMMIT_EVERY.
+            """
+            if 'session_id' not in session:
+                session['session_id'] = str(uuid.uuid4())
+            session_id = session['session_id']
+
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({"error": "Invalid JSON payload"}), 400
+            try:
+                items = self.parse_prompts(data)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            supplemental_information = {}
+            if data.get("file_id"):
+                uploaded_file = UploadedFile.query.filter_by(id=data["file_id"], session_id=session_id).first()
+                if not uploaded_file:
+                    return jsonify({"error": "Uploaded file not found."}), 404
+                supplemental_information, error = self.chat_cog.handle_file_orchestration(
+                    {"file_id": uploaded_file.id}
+                )
+                if error:
+                    return jsonify({"error": error}), 400
+
+            # Committed on its own, so no write transaction stays open while prompts run
+            conversation = Conversation(
+                session_id=session_id,
+                title=str(data.get("title") or f"Batch of {len(items)} prompts")[:255]
+            )
+            db.session.add(conversation)
+            db.session.commit()
+
+            shared = {
+                "session_id": session_id,
+                "system_prompt": data.get("system_prompt") or DEFAULT_SYSTEM_PROMPT,
+                "supplemental_information": supplemental_information,
+                "orchestrate": data.get("orchestrate", True) is not False,
+            }
+            return Response(
+                stream_with_context(self.run_batch(conversation.id, items, shared)),
+                mimetype='application/x-ndjson'
+            )
+
+    def parse_prompts(self, data):
+        """
+        Normalize the request's prompts to dicts with index, id, message, model and temperature.
+
+        :raises ValueError: If the prompts are missing, too many or malformed.
+        """
+        prompts = data.get("prompts")
+        if not isinstance(prompts, list) or not prompts:
+            raise ValueError("'prompts' must be a non-empty list")
+        if len(prompts) > self.max_prompts:
+            raise ValueError(f"At most {self.max_prompts} prompts per batch")
+        default_model = data.get("model", "gpt-4o-mini")
+        default_temperature = data.get("temperature", 0.7)
+        items = []
+        for index, prompt in enumerate(prompts):
+            if isinstance(prompt, str):
+                prompt = {"message": prompt}
+            if not isinstance(prompt, dict) or not str(prompt.get("message") or "").strip():
+                raise ValueError(f"Prompt {index} has no message")
+            try:
+                temperature = float(prompt.get("temperature", default_temperature))
+            except (TypeError, ValueError):
+                raise ValueError(f"Prompt {index} has an invalid temperature")
+            items.append({
+                "index": index,
+                "id": prompt.get("id", index),
+                "message": str(prompt["message"]),
+                "model": prompt.get("model", default_model),
+                "temperature": temperature,
+            })
+        return items
+
+    def run_batch(self, conversation_id, items, shared):
+        """Run the prompts on a thread pool, yielding NDJSON lines and saving results as they finish."""
+        app = current_app._get_current_object()
+        executor = ThreadPoolExecutor(max_workers=min(self.concurrency, len(items)),
+                                      thread_name_prefix="batch-chat")
+        futures = [executor.submit(self.run_prompt, app, item, shared) for item in items]
+        pending, errors, saved = [], 0, 0
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if "error" in result:
+                    errors += 1
+                else:
+                    pending.append(result)
+                    if len(pending) >= self.commit_every:
+                        saved += self.save_results(conversation_id, pending)
+                        pending = []
+                yield json.dumps(result) + "\n"
+        finally:
+            # Also reached when the client disconnects: stop queued prompts, keep finished ones
+            executor.shutdown(wait=False, cancel_futures=True)
+            if pending:
+                saved += self.save_results(conversation_id, pending)
+        yield json.dumps({
+            "done": True,
+            "conversation_id": conversation_id,
+            "count": len(items),
+            "errors": errors,
+            "saved": saved
+        }) + "\n"
+
+    def run_prompt(self, app, item, shared):
+        """Route, gather context for and answer one prompt; errors are returned, not raised."""
+        message, model, temperature = item["message"], item["model"], item["temperature"]
+        result = {"index": item["index"], "id": item["id"], "user_message": message}
+        with app.app_context():
+            try:
+                orchestration = {}
+                if shared["orchestrate"] and not shared["supplemental_information"]:
+                    orchestration = self.orchestration_analysis_cog.analyze_user_orchestration(
+                        user_message=message,
+                        conversation_history=[],
+                        session_id=shared["session_id"]
+                    )
+                if orchestration.get("image_generation") or orchestration.get("code_structure_orchestration"):
+                    result["error"] = "Image and diagram requests are not available in batch requests"
+                    return result
+
+                direct_reply = ""
+                if shared["supplemental_information"]:
+                    supplemental_information = shared["supplemental_information"]
+                else:
+                    search_content = None
+                    if (orchestration.get("internet_search") and not orchestration.get("file_orchestration")
+                            and not orchestration.get("code_orchestration")):
+                        search_content = self.web_search_cog.web_search(
+                            message, [], planned_queries=orchestration.get("search_queries")
+                        )
+                    supplemental_information, direct_reply = self.chat_cog.handle_orchestration(
+                        orchestration, message, search_content=search_content
+                    )
+
+                if direct_reply and not supplemental_information:
+                    # Answered without the model, as /chat does (e.g. random numbers)
+                    result["assistant_reply"] = direct_reply
+                else:
+                    # Batch prompts are independent: no conversation history
+                    messages = self.chat_cog.prepare_messages(
+                        shared["system_prompt"], [], supplemental_information, message, model
+                    )
+                    result["assistant_reply"] = self.chat_cog.complete(messages, model, temperature,
+                                                                       client=self.client)
+                result["orchestration"] = orchestration
+            except Exception as e:
+                app.logger.exception("Batch prompt %s failed", item["index"])
+                result["error"] = str(e)
+            return result
+
+    def save_results(self, conversation_id, results):
+        """
+        Save finished prompts and their replies to the batch conversation in one commit.
+
+        :return: Number of prompts saved.
+        """
+        # Consecutive timestamps keep each prompt next to its reply in the conversation
+        base = datetime.utcnow()
+        messages = []
+        for i, result in enumerate(results):
+            messages.append({"role": "user", "content": result["user_message"],
+                             "timestamp": base + timedelta(microseconds=2 * i)})
+            messages.append({"role": "assistant", "content": result["assistant_reply"],
+                             "timestamp": base + timedelta(microseconds=2 * i + 1)})
+        try:
+            persist_messages(conversation_id, messages)
+            db.session.commit()
+            return len(results)
+        except Exception:
+            current_app.logger.exception("Could not save %d batch results", len(results))
+            db.session.rollback()
+            return 0
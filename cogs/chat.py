@@ -1,29 +1,42 @@
 # cogs/chat.py
-from flask import Blueprint, request, jsonify, session, send_from_directory
+from flask import Blueprint, request, jsonify, session, g
 import os
 import json
 import uuid
-from werkzeug.utils import secure_filename
 from db import db
 from models import Conversation, Message, UploadedFile
 from datetime import datetime
 from utils.file_utils import process_uploaded_file
 from cogs.orchestration_analysis import OrchestrationAnalysisCog
-from utils.response_generation import generate_image, generate_chat_response
+from utils.response_generation import generate_image, generate_chat_response, CHAT_ERROR_REPLY
 from .web_search import WebSearchCog
 from .code_files import CodeFilesCog
 from cogs.code_structure_visualizer import CodeStructureVisualizerCog  # New import
-
-WORD_LIMIT = 50000
+from utils.token_budget import plan_prompt
+from utils.persistence import persist_messages, WriteBehindQueue
+from utils.history_cache import ConversationHistoryCache
+from utils.upload_storage import UploadStorageManager
+from utils.speculation import SpeculativeSearch
+from utils import metrics
+from utils.llm_gateway import LLMGateway
+from utils.hedging import HedgedChat
+from utils.response_cache import ResponseCache
 
 class ChatCog:
     def __init__(self, app_instance, flask_app):
         self.bp = Blueprint("chat_blueprint", __name__)
         
-        # Initialize OpenAI client
+        # Initialize OpenAI client; the gateway does rate limiting and retries in its place
         import openai
         openai.api_key = os.getenv('OPENAI_KEY')
-        self.client = openai
+        openai.max_retries = 0
+        self.client = LLMGateway(openai)
+
+        # Optionally hedge slow chat completions (LLM_HEDGE_FALLBACKS picks the hedge model)
+        self.hedger = None
+        if os.getenv('LLM_HEDGE', '').lower() in ('1', 'true', 'yes'):
+            self.hedger = HedgedChat(self.client)
+            print("Hedged chat completions enabled")
         
         # Initialize other cogs
         self.web_search_cog = WebSearchCog(openai_client=self.client)
@@ -37,14 +50,46 @@ class ChatCog:
         self.upload_folder = os.path.join(flask_app.instance_path, 'uploads')
         os.makedirs(self.upload_folder, exist_ok=True)
         print(f"Uploads directory set at: {self.upload_folder}")
+        # Quota and LRU eviction for the uploads directory (UPLOADS_QUOTA_MB)
+        self.upload_storage = UploadStorageManager(flask_app, self.upload_folder)
+
+        self.code_structure_visualizer_cog = CodeStructureVisualizerCog(self.upload_folder, storage=self.upload_storage)
+
+        # Recent conversation histories, served from memory while still current
+        self.history_cache = ConversationHistoryCache(
+            max_conversations=int(os.getenv('HISTORY_CACHE_SIZE', 256))
+        )
+
+        # Optionally persist messages after the response is sent
+        self.write_behind = None
+        if os.getenv('WRITE_BEHIND_MESSAGES', '').lower() in ('1', 'true', 'yes'):
+            self.write_behind = WriteBehindQueue(flask_app)
+            # The cache already holds messages the queue failed to save
+            self.write_behind.on_give_up.append(self.history_cache.invalidate)
+            print("Write-behind message persistence enabled")
+
+        # Optionally start likely web searches while the routing call runs
+        self.speculative_search = None
+        if os.getenv('SPECULATIVE_SEARCH', '').lower() in ('1', 'true', 'yes'):
+            self.speculative_search = SpeculativeSearch(self.web_search_cog)
+            print("Speculative web search enabled")
+
+        # Optionally reuse replies to repeated low-temperature questions
+        self.response_cache = None
+        if os.getenv('RESPONSE_CACHE', '').lower() in ('1', 'true', 'yes'):
+            self.response_cache = ResponseCache()
+            print("Response cache enabled")
 
-        self.code_structure_visualizer_cog = CodeStructureVisualizerCog(self.upload_folder)
+        metrics.register_gauge("history_cache.hits", lambda: self.history_cache.hits)
+        metrics.register_gauge("history_cache.misses", lambda: self.history_cache.misses)
 
         self.add_routes()
 
     def add_routes(self):
         @self.bp.route("/chat", methods=["POST"])
         def chat():
+            new_conversation = False
+            speculation = None
             try:
                 # Ensure session has a unique session_id
                 if 'session_id' not in session:
@@ -57,8 +102,10 @@ class ChatCog:
 
                 # Retrieve other parameters
                 message, model, temperature, file = self.get_request_parameters()
+                last_seen = self.get_last_seen()
                 print(f"Model: {model}, Temperature: {temperature}")
                 print(f"User Message: {message}")
+                user_timestamp = datetime.utcnow()
 
                 # Handle file upload if present
                 file_content, file_url, file_type, uploaded_file = process_uploaded_file(
@@ -67,14 +114,21 @@ class ChatCog:
                     session_id=session_id,
                     db_session=db
                 )
+                if uploaded_file:
+                    self.upload_storage.record(uploaded_file.filename)
 
                 if not message and not file_url:
                     return jsonify({"error": "No message or file provided"}), 400
 
                 # Manage conversation
+                new_conversation = 'current_conversation_id' not in session
                 conversation_id, conversation = self.manage_conversation(session_id)
                 conversation_history = self.get_conversation_history(conversation_id)
 
+                # Guess at a web search while the routing call runs; used or cancelled below
+                if self.speculative_search:
+                    speculation = self.speculative_search.start(message, conversation_history)
+
                 # Analyze user orchestration
                 orchestration = self.orchestration_analysis_cog.analyze_user_orchestration(
                     user_message=message,
@@ -83,37 +137,44 @@ class ChatCog:
                 )
                 
                 print(f"Orchestration: {orchestration}")
+                search_content = self.resolve_speculation(speculation, orchestration)
+                speculation = None
 
                 # Handle orchestration-specific actions
                 # Check if image generation is requested and handle it immediately
                 if orchestration.get("image_generation", False):
-                    return self.handle_image_generation(orchestration, message, conversation_history, conversation_id)
+                    return self.handle_image_generation(orchestration, message, conversation_history, conversation_id, last_seen)
                 
                 # Similarly, handle code structure visualization if requested
                 if orchestration.get("code_structure_orchestration", False):
-                    return self.handle_code_structure_visualization(orchestration, message, conversation_history, conversation_id)
+                    return self.handle_code_structure_visualization(orchestration, message, conversation_history, conversation_id, last_seen)
                 
                 # Handle other orchestrations
-                supplemental_information, assistant_reply = self.handle_orchestration(orchestration)
-
-                # Prepare messages for OpenAI API
-                messages = self.prepare_messages(system_prompt, conversation_history, supplemental_information, message)
+                supplemental_information, assistant_reply = self.handle_orchestration(
+                    orchestration, message, search_content=search_content
+                )
 
-                # Trim conversation if necessary
-                messages = self.trim_conversation(messages, WORD_LIMIT)
+                # Prepare messages for OpenAI API within the model's token budget
+                messages = self.prepare_messages(system_prompt, conversation_history, supplemental_information, message, model)
 
                 # Generate chat response
-                assistant_reply = generate_chat_response(self.client, messages, model, temperature)
+                assistant_reply = self.complete(messages, model, temperature)
                 print(f"Assistant Reply: {assistant_reply}")
 
-                # Save messages to the database
-                self.save_messages(conversation_id, "user", message)
-                self.save_messages(conversation_id, "assistant", assistant_reply)
+                # Save messages and commit the whole turn at once
+                self.save_messages(conversation_id, [
+                    {"role": "user", "content": message, "timestamp": user_timestamp},
+                    {"role": "assistant", "content": assistant_reply}
+                ])
+                self.commit_turn()
 
                 return jsonify({
                     "user_message": message,
                     "assistant_reply": assistant_reply,
-                    "conversation_history": conversation_history,
+                    **self.history_payload(conversation_id, conversation_history, [
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": assistant_reply}
+                    ], last_seen),
                     "orchestration": orchestration,
                     "fileUrl": uploaded_file.file_url if uploaded_file else None,
                     "fileName": uploaded_file.original_filename if uploaded_file else None,
@@ -123,22 +184,14 @@ class ChatCog:
 
             except Exception as e:
                 print(f"Error in /chat route: {e}")
+                if self.speculative_search:
+                    self.speculative_search.cancel(speculation)
+                self.discard_turn()
+                if new_conversation:
+                    # The conversation row was rolled back with the rest of the turn
+                    session.pop('current_conversation_id', None)
                 return jsonify({"error": str(e)}), 500
 
-        # **New Route to Serve Uploaded Images**
-        @self.bp.route('/uploads/<filename>')
-        def uploaded_file(filename):
-            """
-            Serve uploaded files from the uploads directory.
-            """
-            try:
-                # Security check: Ensure the filename is secure
-                filename = secure_filename(filename)
-                return send_from_directory(self.upload_folder, filename)
-            except Exception as e:
-                print(f"Error serving file {filename}: {e}")
-                return jsonify({"error": "File not found."}), 404
-
         # Other routes can be added here or in separate cogs
 
     def get_system_prompt(self):
@@ -185,6 +238,67 @@ class ChatCog:
             file = None
         return message, model, temperature, file
 
+    def get_last_seen(self):
+        """
+        Read the optional 'last_seen' parameter: how many messages of the current
+        conversation the client already holds, with the optional 'conversation_id'
+        they belong to. When present, /chat answers with only the messages after
+        that point instead of the full history.
+
+        A count rather than a message id, because with write-behind persistence
+        the turn's messages have no ids yet when the response is sent. Messages
+        are only ever appended to a conversation, so a count marks the same
+        point an id would.
+
+        :return: Tuple (count, conversation_id or None), or None if not sent.
+        """
+        if request.content_type.startswith('multipart/form-data'):
+            data = request.form
+        elif request.is_json:
+            data = request.get_json(silent=True) or {}
+        else:
+            return None
+        try:
+            count = max(int(data["last_seen"]), 0)
+        except (KeyError, TypeError, ValueError):
+            return None
+        try:
+            conversation_id = int(data["conversation_id"])
+        except (KeyError, TypeError, ValueError):
+            conversation_id = None
+        return count, conversation_id
+
+    def history_payload(self, conversation_id, conversation_history, new_messages, last_seen):
+        """
+        Build the history part of a /chat response.
+
+        Clients that send last_seen get a delta: "messages" holds what was
+        written to the conversation since then (e.g. from another tab), not
+        this turn's own messages, which the response already carries. If the
+        client's count is past the end of the history or was for another
+        conversation, "messages" is the whole history before this turn and
+        "reset" is true. Clients without last_seen get the full
+        conversation_history. Every response carries the conversation_id and
+        the "message_count" to send back as last_seen next turn.
+
+        :param conversation_history: The history before this turn.
+        :param new_messages: The messages this turn wrote.
+        :param last_seen: What get_last_seen returned.
+        """
+        payload = {
+            "conversation_id": conversation_id,
+            "message_count": len(conversation_history) + len(new_messages)
+        }
+        if last_seen is None:
+            payload["conversation_history"] = conversation_history + new_messages
+            return payload
+        count, seen_conversation_id = last_seen
+        if count > len(conversation_history) or seen_conversation_id not in (None, conversation_id):
+            payload.update(messages=conversation_history, reset=True)
+        else:
+            payload["messages"] = conversation_history[count:]
+        return payload
+
     def manage_conversation(self, session_id):
         if 'current_conversation_id' not in session:
             title = "New Conversation"
@@ -193,7 +307,7 @@ class ChatCog:
                 title=title
             )
             db.session.add(new_convo)
-            db.session.commit()
+            db.session.flush()  # Assigns the id; committed with the rest of the turn
             session['current_conversation_id'] = new_convo.id
             return new_convo.id, new_convo
         conversation_id = session.get('current_conversation_id')
@@ -203,16 +317,48 @@ class ChatCog:
         return conversation_id, conversation
 
     def get_conversation_history(self, conversation_id):
+        # The conversation is normally already in the session's identity map
+        conversation = db.session.get(Conversation, conversation_id)
+        version = (conversation.version or 0) if conversation else 0
+        history = self.history_cache.get(conversation_id, version)
+        if history is not None:
+            return history
         messages_db = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
-        return [{"role": msg.role, "content": msg.content} for msg in messages_db]
+        history = [{"role": msg.role, "content": msg.content} for msg in messages_db]
+        self.history_cache.put(conversation_id, version, history)
+        return history
+
+    def resolve_speculation(self, speculation, orchestration):
+        """
+        Use or discard the speculative search once the route is known.
 
-    def handle_orchestration(self, orchestration):
+        :param speculation: Handle from SpeculativeSearch.start(), or None.
+        :param orchestration: The routing decision.
+        :return: Search content if the turn searches and the speculation succeeded, else None.
+        """
+        if not self.speculative_search:
+            return None
+        # Same precedence as handle_orchestration: file and code routes win over search
+        searches = (
+            orchestration.get("internet_search", False)
+            and not orchestration.get("image_generation", False)
+            and not orchestration.get("code_structure_orchestration", False)
+            and not orchestration.get("file_orchestration", False)
+            and not orchestration.get("code_orchestration", False)
+        )
+        if searches:
+            return self.speculative_search.use(speculation)
+        self.speculative_search.cancel(speculation)
+        return None
+
+    def handle_orchestration(self, orchestration, user_message="", search_content=None):
         supplemental_information = {}
         assistant_reply = ""
         if orchestration.get("file_orchestration", False):
             supplemental_information, assistant_reply = self.handle_file_orchestration(orchestration)
         elif orchestration.get("code_orchestration", False):
-            code_content = self.code_files_cog.get_all_code_files_content()
+            # Only the symbols relevant to the question, not the whole code base
+            code_content = self.code_files_cog.get_relevant_code_content(user_message)
             if code_content:
                 supplemental_information = {
                     "role": "system",
@@ -223,8 +369,12 @@ class ChatCog:
             else:
                 assistant_reply = "No code files found to provide."
         elif orchestration.get("internet_search", False):
-            query = request.json.get("message", "")
-            search_content = self.web_search_cog.web_search(query, self.get_conversation_history(session.get('current_conversation_id')))
+            if search_content is None:
+                search_content = self.web_search_cog.web_search(
+                    user_message,
+                    self.get_conversation_history(session.get('current_conversation_id')),
+                    planned_queries=orchestration.get("search_queries")
+                )
             sys_search_content = (
                 '\nDo not say "I am unable to browse the internet," because you have information directly retrieved from the internet. '
                 'Give a confident answer based on this. Only use the most relevant and accurate information that matches the User Query. '
@@ -283,7 +433,7 @@ class ChatCog:
             assistant_reply = "Uploaded file not found."
         return supplemental_information, assistant_reply
 
-    def handle_image_generation(self, orchestration, user_message, conversation_history, conversation_id):
+    def handle_image_generation(self, orchestration, user_message, conversation_history, conversation_id, last_seen=None):
         """
         Handles image generation and returns a response immediately.
         """
@@ -293,101 +443,127 @@ class ChatCog:
         if prompt:
             image_url = generate_image(prompt, self.client)
             assistant_reply = f"![Generated Image]({image_url})"
-            conversation_history.append({"role": "assistant", "content": assistant_reply})
-            # Save messages
-            self.save_messages(conversation_id, "assistant", assistant_reply)
         else:
             assistant_reply = "No image prompt provided."
-            conversation_history.append({"role": "assistant", "content": assistant_reply})
-            self.save_messages(conversation_id, "assistant", assistant_reply)
+        new_messages = [{"role": "assistant", "content": assistant_reply}]
+        self.save_messages(conversation_id, new_messages)
+        self.commit_turn()
         
         return jsonify({
             "user_message": user_message,
             "assistant_reply": assistant_reply,
-            "conversation_history": conversation_history,
+            **self.history_payload(conversation_id, conversation_history, new_messages, last_seen),
             "orchestration": orchestration,
             "fileUrl": None,         # **ADDED**
             "fileName": None,        # **ADDED**
             "fileType": None         # **ADDED**
         })
 
-    def handle_code_structure_visualization(self, orchestration, user_message, conversation_history, conversation_id):
+    def handle_code_structure_visualization(self, orchestration, user_message, conversation_history, conversation_id, last_seen=None):
         """
         Handles code structure visualization and returns a response immediately.
         """
-        supplemental_information = {}
         assistant_reply = ""
         image_url = self.code_structure_visualizer_cog.generate_codebase_structure_diagram()
         if image_url:
             assistant_reply = f"![Codebase Structure]({image_url})"
-            conversation_history.append({"role": "assistant", "content": assistant_reply})
-            self.save_messages(conversation_id, "assistant", assistant_reply)
         else:
             assistant_reply = "Failed to generate codebase structure diagram."
-            conversation_history.append({"role": "assistant", "content": assistant_reply})
-            self.save_messages(conversation_id, "assistant", assistant_reply)
-        
-        # Optionally, supplement with code files content
-        code_content = self.code_files_cog.get_all_code_files_content()
-        if code_content:
-            supplemental_information = {
-                "role": "system",
-                "content": (
-                    f"\n\nYou have been supplemented with information from your code base to answer this query.\n***{code_content}***"
-                )
-            }
+        new_messages = [{"role": "assistant", "content": assistant_reply}]
+        self.save_messages(conversation_id, new_messages)
+        self.commit_turn()
         
         return jsonify({
             "user_message": user_message,
             "assistant_reply": assistant_reply,
-            "conversation_history": conversation_history,
+            **self.history_payload(conversation_id, conversation_history, new_messages, last_seen),
             "orchestration": orchestration,
             "fileUrl": None,
             "fileName": None,
             "fileType": None
         })
 
-    def prepare_messages(self, system_prompt, conversation_history, supplemental_information, user_message):
+    def complete(self, messages, model, temperature, client=None):
+        """
+        Generate the reply, answering from the response cache when it is enabled and has one.
+
+        :param client: Client to use instead of the interactive one (e.g. a background-priority
+            view of the gateway); such calls are not hedged.
+        """
+        if self.response_cache:
+            cached = self.response_cache.get(messages, model, temperature)
+            if cached is not None:
+                print("Assistant reply served from the response cache")
+                return cached
+        if client is None:
+            assistant_reply = generate_chat_response(self.client, messages, model, temperature, hedger=self.hedger)
+        else:
+            assistant_reply = generate_chat_response(client, messages, model, temperature)
+        if self.response_cache and assistant_reply != CHAT_ERROR_REPLY:
+            self.response_cache.put(messages, model, temperature, assistant_reply)
+        return assistant_reply
+
+    def prepare_messages(self, system_prompt, conversation_history, supplemental_information, user_message, model):
         additional_instructions = (
             "Generate responses as structured and easy-to-read.  \n"
             "Provide responses using correct markdown formatting. It is critical that markdown format is used with nothing additional.  \n"
             "Use headings (e.g., ## Section Title), numbered lists, and bullet points to format output.  \n"
             "Ensure sufficient line breaks between sections to improve readability. Generally, limit responses to no more than 1500 tokens."
         )
-        messages = [
-            {"role": "system", "content": f"Your role is:\n{system_prompt} \n\nStructured response Guidelines:\n{additional_instructions}"}
-        ] + conversation_history
-        if supplemental_information:
-            messages.append(supplemental_information)
-        messages.append({"role": "user", "content": user_message})
-        print('Final messages:', json.dumps(messages, indent=2))
+        system_message = {"role": "system", "content": f"Your role is:\n{system_prompt} \n\nStructured response Guidelines:\n{additional_instructions}"}
+        messages, breakdown = plan_prompt(
+            system_message,
+            conversation_history,
+            supplemental_information,
+            {"role": "user", "content": user_message},
+            model
+        )
+        print('Prompt token breakdown:', json.dumps(breakdown))
         return messages
 
-    def trim_conversation(self, messages, max_tokens=WORD_LIMIT):
-        import tiktoken
-        encoding = tiktoken.encoding_for_model("gpt-4o-mini")
-        total_tokens = 0
-        trimmed = []
-        
-        for message in reversed(messages):
-            message_tokens = len(encoding.encode(json.dumps(message)))
-            if total_tokens + message_tokens > max_tokens:
-                break
-            trimmed.insert(0, message)
-            total_tokens += message_tokens
-        
-        if not trimmed and messages:
-            trimmed.append(messages[-1])
-        
-        print('Trimmed messages:', json.dumps(trimmed, indent=2))
-        return trimmed
-
-    def save_messages(self, conversation_id, role, content):
-        """Save a message to the database."""
-        msg = Message(
-            conversation_id=conversation_id,
-            role=role,
-            content=content
-        )
-        db.session.add(msg)
+    def save_messages(self, conversation_id, messages):
+        """
+        Stage messages for the current turn.
+
+        Messages are added to the turn's transaction, or handed to the
+        write-behind queue when it is enabled. The caller commits; the
+        history cache is only updated once the commit has succeeded.
+        """
+        if self.write_behind:
+            g.setdefault('write_behind_messages', []).append((conversation_id, messages))
+        else:
+            persist_messages(conversation_id, messages)
+
+        conversation = db.session.get(Conversation, conversation_id)
+        if conversation:
+            # The version the messages are written on top of, read before the commit expires it
+            version = conversation.version or 0
+            if self.write_behind:
+                # The database lags behind messages still queued; the cache already has them
+                version = max(version, self.history_cache.version(conversation_id) or 0)
+            g.setdefault('history_appends', []).append((
+                conversation_id,
+                version,
+                [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+            ))
+
+    def commit_turn(self):
+        """
+        Commit everything the turn staged in a single transaction, then hand
+        deferred messages to the write-behind queue now that the rows they
+        reference are committed.
+        """
         db.session.commit()
+        for conversation_id, version, messages in g.pop('history_appends', []):
+            self.history_cache.append(conversation_id, version, messages, version + 1)
+        for conversation_id, messages in g.pop('write_behind_messages', []):
+            self.write_behind.submit(conversation_id, messages)
+
+    def discard_turn(self):
+        """Roll back the turn and drop anything it staged for the history cache or write-behind."""
+        db.session.rollback()
+        for conversation_id, _, _ in g.pop('history_appends', []):
+            self.history_cache.invalidate(conversation_id)
+        g.pop('write_behind_messages', None)
+        if session.get('current_conversation_id') is not None:
+            self.history_cache.invalidate(session['current_conversation_id'])
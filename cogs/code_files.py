@@ -1,5 +1,6 @@
 # cogs/code_files.py
 import os
+from utils.code_index import CodeIndex
 
 class CodeFilesCog:
     def __init__(self, base_dir=''):
@@ -9,51 +10,26 @@ class CodeFilesCog:
         :param base_dir: Base directory to search for code files. Defaults to current working directory.
         """
         self.base_dir = base_dir or os.getcwd()
+        self.code_index = CodeIndex(self.base_dir)
 
-    def get_all_code_files_content(self, allowed_dirs=None):
+    def get_relevant_code_content(self, question, limit=8, max_tokens=6000):
         """
-        Retrieve content from Python files in the base directory and specified subdirectories.
-        
-        :param allowed_dirs: List of allowed subdirectories to include (e.g., ['cogs', 'utils'])
-        :return: Concatenated string of code content.
-        """
-        if allowed_dirs is None:
-            allowed_dirs = ['cogs', 'utils']  # Default to cogs and utils directories
-        
-        code_content = ""
-        
-        
-        # Include Python files from the base directory
-        for file in os.listdir(self.base_dir):
-            if file.endswith('.py') and os.path.isfile(os.path.join(self.base_dir, file)):
-                file_path = os.path.join(self.base_dir, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        code_content += f.read() + "\n\n"
-                    print(f"Included base file: {file_path}")
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-        
-        # Include Python files from allowed subdirectories
-        for allowed_dir in allowed_dirs:
-            dir_path = os.path.join(self.base_dir, allowed_dir)
-            if os.path.isdir(dir_path):
-                for file in os.listdir(dir_path):
-                    if file.endswith('.py'):
-                        file_path = os.path.join(dir_path, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                code_content += f.read() + "\n\n"
-                            print(f"Included file: {file_path}")
-                        except Exception as e:
-                            print(f"Error reading {file_path}: {e}")
+        Retrieve an outline of the code base plus the source of the symbols
+        most relevant to the question.
 
-        file_path = os.path.join(self.base_dir, "my-chat-frontend/src/ChatApp.jsx")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            code_content += f.read() + "\n\n"
-        
-        if not code_content:
-            print("No Python files found in the specified directories.")
-        
-        return code_content
+        :param question: The user's question about the code.
+        :param limit: Maximum number of symbols to include in full.
+        :param max_tokens: Token budget for the included symbol source.
+        :return: Formatted string, or an empty string if no code was found.
+        """
+        outline = self.code_index.outline()
+        if not outline:
+            print("No code files found to index.")
+            return ""
+        symbols = self.code_index.relevant_symbols(question, limit=limit, max_tokens=max_tokens)
+        print(f"Code index: {len(symbols)} relevant symbols: {[s['name'] for s in symbols]}")
+        sections = [f"Code base outline (file: top-level symbols):\n{outline}"]
+        for symbol in symbols:
+            sections.append(f"# {symbol['file']} :: {symbol['name']} ({symbol['kind']})\n{symbol['source']}")
+        return "\n\n".join(sections)
 
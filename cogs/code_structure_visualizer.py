@@ -1,18 +1,29 @@
 # cogs/code_structure_visualizer.py
 import os
-import uuid
 import graphviz
 import hashlib
-from flask import current_app
+from collections import Counter
+from utils.diagram_renderer import get_renderer
 
 class CodeStructureVisualizerCog:
-    def __init__(self, upload_folder):
+    def __init__(self, upload_folder, storage=None, renderer=None):
         """
         Initialize the CodeStructureVisualizerCog.
 
         :param upload_folder: Path to the folder where uploaded files and generated images are stored.
+        :param storage: Optional UploadStorageManager tracking files in upload_folder.
+        :param renderer: DiagramRenderer to use; defaults to the shared process-wide one.
         """
         self.upload_folder = upload_folder
+        self.storage = storage
+        self.renderer = renderer or get_renderer()
+
+        # SVG is a fraction of the size of a 300-dpi PNG and much faster to render
+        self.output_format = os.getenv('DIAGRAM_FORMAT', 'svg').lower()
+        if self.output_format not in ('svg', 'png'):
+            self.output_format = 'svg'
+        # Directories with more files than this are drawn as a single summary node
+        self.max_files_per_dir = int(os.getenv('DIAGRAM_MAX_FILES_PER_DIR', 25))
 
         # Explicitly add Graphviz path
         os.environ["PATH"] += os.pathsep + '/app/.heroku-buildpack-graphviz/usr/bin'
@@ -20,79 +31,80 @@ class CodeStructureVisualizerCog:
         # Define directories and file types to exclude
         self.exclude_dirs = {
             'uploads', '.git', '__pycache__', 'node_modules', 'venv',
-            'migrations', 'tests', 'docs', 'dist', 'build'
+            'migrations', 'tests', 'docs', 'dist', 'build',
+            'flask_session', 'static', 'instance'  # Runtime data and built bundles
+        }
+        self.exclude_file_types = {
+            '.pyc', '.pyo', '.log', '.env',
+            '.db', '.db-journal', '.db-wal', '.db-shm'  # Local SQLite files change on every write
         }
-        self.exclude_file_types = {'.pyc', '.pyo', '.log', '.env'}
 
         # Maximum recursion depth
         self.max_depth = 4
 
-    def generate_codebase_structure_diagram(self):
+        # Project root, drawn when no directory is given
+        self.root_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+        # Directory listings keyed by path, reused while the directory's mtime is unchanged
+        self._listings = {}
+
+    def generate_codebase_structure_diagram(self, root_dir=None):
         """
         Generate a visual representation of the codebase structure using Graphviz.
 
+        Rendering runs in a `dot` subprocess on the renderer's bounded pool
+        with a hard timeout; this call waits for it.
+
+        :param root_dir: Directory to draw; defaults to the project root.
         :return: URL path to the generated image or None if generation fails.
         """
         try:
-            # Define the root directory to scan (project root)
-            current_file_dir = os.path.dirname(os.path.abspath(__file__))  # Directory where this cog is located
-            root_dir = os.path.abspath(os.path.join(current_file_dir, '..'))  # Adjust as needed to point to the project root
+            if root_dir is None:
+                root_dir = self.root_dir
 
             print(f"Scanning root directory: {root_dir}")
 
             # Create a hash of the directory structure to use for caching
             dir_hash = self.hash_directory_structure(root_dir)
             output_filename = f"codebase_structure_{dir_hash}"
-            image_filename = f"{output_filename}.png"
+            image_filename = f"{output_filename}.{self.output_format}"
             image_path = os.path.join(self.upload_folder, image_filename)
             image_url = f"/uploads/{image_filename}"
 
             # Check if the diagram already exists
             if os.path.exists(image_path):
                 print(f"Using cached diagram at: {image_path}")
+                if self.storage:
+                    self.storage.touch(image_filename)
                 return image_url
 
             # Initialize Graphviz Digraph
-            dot = graphviz.Digraph(comment='Codebase Structure', format='png')
-            dot.attr(dpi='300')  # High resolution for clarity
+            dot = graphviz.Digraph(comment='Codebase Structure', format=self.output_format)
+            if self.output_format == 'png':
+                dot.attr(dpi='300')  # High resolution for clarity
 
-            def add_nodes_edges(current_path, parent=None, depth=0):
-                if depth > self.max_depth:
-                    return
-                directory = os.path.basename(current_path)
+            # Same walk as the fingerprint, so the cache key covers exactly what is drawn
+            for current_path, depth, subdirs, files in self.walk_tree(root_dir):
                 node_id = self.create_node_id(current_path)
-
-                if parent:
-                    dot.node(node_id, directory, shape='folder')
-                    dot.edge(parent, node_id)
-                else:
-                    dot.node(node_id, directory, shape='folder')  # Root node
-
-                try:
-                    for entry in sorted(os.listdir(current_path)):
-                        path = os.path.join(current_path, entry)
-                        if os.path.isdir(path):
-                            if entry in self.exclude_dirs:
-                                print(f"Excluding directory: {path}")
-                                continue
-                            add_nodes_edges(path, node_id, depth + 1)
-                        else:
-                            if self.should_exclude_file(entry):
-                                print(f"Excluding file: {path}")
-                                continue
-                            file_node_id = self.create_node_id(path)
-                            dot.node(file_node_id, entry, shape='note')
-                            dot.edge(node_id, file_node_id)
-                except PermissionError:
-                    print(f"Permission denied: {current_path}")
-                except Exception as e:
-                    print(f"Error scanning directory {current_path}: {e}")
-
-            add_nodes_edges(root_dir)
+                dot.node(node_id, os.path.basename(current_path), shape='folder')
+                if depth > 0:
+                    dot.edge(self.create_node_id(os.path.dirname(current_path)), node_id)
+                if len(files) > self.max_files_per_dir:
+                    summary_node_id = self.create_node_id(os.path.join(current_path, '*'))
+                    dot.node(summary_node_id, self.summarize_files(files), shape='note')
+                    dot.edge(node_id, summary_node_id)
+                    continue
+                for entry, _ in files:
+                    file_node_id = self.create_node_id(os.path.join(current_path, entry))
+                    dot.node(file_node_id, entry, shape='note')
+                    dot.edge(node_id, file_node_id)
 
             # Render the diagram
-            dot.render(filename=output_filename, directory=self.upload_folder, cleanup=True)
+            if not self.renderer.render(dot.source, image_path, fmt=self.output_format):
+                return None
             print(f"Codebase structure diagram generated at: {image_path}")
+            if self.storage:
+                self.storage.record(image_filename)
 
             return image_url
 
@@ -100,6 +112,34 @@ class CodeStructureVisualizerCog:
             print(f"Error generating codebase structure diagram: {e}")
             return None
 
+    def regenerate(self, image_filename, root_dir=None):
+        """
+        Render again a diagram that was evicted from the upload folder.
+
+        Only the tree as it is now can be drawn, so this succeeds only while
+        its fingerprint still matches the one in the file name.
+
+        :param image_filename: Name of the missing diagram, e.g. "codebase_structure_<hash>.svg".
+        :param root_dir: Directory the diagram was drawn from; defaults to the project root.
+        :return: True if the diagram is back in the upload folder.
+        """
+        root_dir = root_dir or self.root_dir
+        current = f"codebase_structure_{self.hash_directory_structure(root_dir)}.{self.output_format}"
+        if image_filename != current:
+            return False
+        return self.generate_codebase_structure_diagram(root_dir) is not None
+
+    def summarize_files(self, files):
+        """
+        Label for a collapsed directory: the file count over the most common extensions.
+
+        :param files: List of (file name, stat result) tuples.
+        :return: Node label as a string.
+        """
+        extensions = Counter(os.path.splitext(name)[1] or name for name, _ in files)
+        counts = ', '.join(f"{ext} x{count}" for ext, count in extensions.most_common(4))
+        return f"{len(files)} files\n{counts}"
+
     def create_node_id(self, path):
         """
         Create a unique node ID by hashing the file path.
@@ -109,30 +149,78 @@ class CodeStructureVisualizerCog:
         """
         return hashlib.md5(path.encode()).hexdigest()
 
+    def list_directory(self, path):
+        """
+        List a directory's included subdirectories and files.
+
+        The listing is cached and reused while the directory's own mtime is
+        unchanged (adding, removing or renaming an entry updates it). File
+        sizes and mtimes are always read fresh.
+
+        :param path: Directory to list.
+        :return: Tuple (subdirectory names, list of (file name, stat result)), both sorted.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            cached = self._listings.get(path)
+            if cached and cached[0] == mtime:
+                subdirs, file_names = cached[1], cached[2]
+            else:
+                subdirs, file_names = [], []
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in self.exclude_dirs:
+                                continue
+                            subdirs.append(entry.name)
+                        elif not self.should_exclude_file(entry.name):
+                            file_names.append(entry.name)
+                subdirs.sort()
+                file_names.sort()
+                self._listings[path] = (mtime, subdirs, file_names)
+        except PermissionError:
+            print(f"Permission denied: {path}")
+            return [], []
+        except OSError as e:
+            print(f"Error scanning directory {path}: {e}")
+            return [], []
+
+        files = []
+        for name in file_names:
+            try:
+                files.append((name, os.stat(os.path.join(path, name))))
+            except OSError:
+                continue  # Removed since the listing was cached
+        return subdirs, files
+
+    def walk_tree(self, root_dir):
+        """
+        Yield (path, depth, subdirectory names, files) for each included
+        directory, depth-first in sorted order, down to max_depth.
+        """
+        stack = [(root_dir, 0)]
+        while stack:
+            current_path, depth = stack.pop()
+            subdirs, files = self.list_directory(current_path)
+            yield current_path, depth, subdirs, files
+            if depth < self.max_depth:
+                stack.extend((os.path.join(current_path, d), depth + 1) for d in reversed(subdirs))
+
     def hash_directory_structure(self, root_dir):
         """
-        Create a hash representing the current directory structure.
+        Create a fingerprint of the directory structure from paths, sizes and mtimes.
+
+        Only stat calls are made; file contents are never read.
 
         :param root_dir: Root directory to hash.
         :return: MD5 hash as a string.
         """
         hash_md5 = hashlib.md5()
-        for root, dirs, files in os.walk(root_dir):
-            # Exclude directories
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            for file in sorted(files):
-                if self.should_exclude_file(file):
-                    continue
-                filepath = os.path.join(root, file)
-                try:
-                    with open(filepath, 'rb') as f:
-                        while True:
-                            chunk = f.read(4096)
-                            if not chunk:
-                                break
-                            hash_md5.update(chunk)
-                except Exception as e:
-                    print(f"Error hashing file {filepath}: {e}")
+        for current_path, depth, subdirs, files in self.walk_tree(root_dir):
+            rel_path = os.path.relpath(current_path, root_dir)
+            hash_md5.update(f"d {rel_path}\n".encode())
+            for name, st in files:
+                hash_md5.update(f"f {name} {st.st_size} {st.st_mtime_ns}\n".encode())
         return hash_md5.hexdigest()
 
     def should_exclude_file(self, filename):
@@ -1,8 +1,21 @@
 # cogs/conversations.py
-from flask import Blueprint, jsonify, session, request
+from flask import Blueprint, jsonify, session, request, Response, stream_with_context
+import hashlib
+from sqlalchemy.exc import SQLAlchemyError
 from db import db
 from models import Conversation, Message
 from datetime import datetime
+from utils.pagination import fetch_page, get_page_size
+from utils.conditional import not_modified, with_validators
+from utils.search_index import search_messages
+from utils.archive import export_session, import_ndjson
+
+CONVERSATIONS_PAGE_SIZE = 10
+MAX_CONVERSATIONS_PAGE_SIZE = 100
+MESSAGES_PAGE_SIZE = 50
+MAX_MESSAGES_PAGE_SIZE = 200
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
 
 class ConversationsCog:
     def __init__(self):
@@ -12,28 +25,128 @@ class ConversationsCog:
     def add_routes(self):
         @self.bp.route("/conversations", methods=["GET"])
         def get_conversations():
-            # Fetch recent conversations for the current session
+            # Fetch one page of conversations for the current session, newest first.
+            # Pass ?cursor=<next_cursor> to continue with older conversations.
             session_id = session.get('session_id', 'unknown_session')
-            conversations = Conversation.query.filter_by(session_id=session_id).order_by(Conversation.timestamp.desc()).limit(10).all()
+            limit = get_page_size(CONVERSATIONS_PAGE_SIZE, MAX_CONVERSATIONS_PAGE_SIZE)
+            try:
+                conversations, next_cursor = fetch_page(
+                    Conversation.query.filter_by(session_id=session_id),
+                    Conversation.timestamp, Conversation.id,
+                    limit, request.args.get('cursor')
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Validators come from the page's own rows; the Message table is never read
+            etag = self.make_etag("list", next_cursor, *[
+                (convo.id, convo.title, convo.version) for convo in conversations
+            ])
+            last_modified = max((convo.updated_at or convo.timestamp for convo in conversations), default=None)
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+
             convo_list = [{
                 "id": convo.id,
                 "title": convo.title,
                 "timestamp": convo.timestamp.isoformat()
             } for convo in conversations]
-            return jsonify({"conversations": convo_list})
+            response = jsonify({"conversations": convo_list, "next_cursor": next_cursor})
+            return with_validators(response, etag, last_modified)
+
+        @self.bp.route("/conversations/search", methods=["GET"])
+        def search_conversations():
+            # Full-text search over the current session's messages, best matches first.
+            # Page with ?offset=<next_offset>.
+            session_id = session.get('session_id', 'unknown_session')
+            query = request.args.get('q', '').strip()
+            if not query:
+                return jsonify({"error": "Missing search query"}), 400
+            limit = get_page_size(SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE)
+            try:
+                offset = max(int(request.args.get('offset', 0)), 0)
+            except ValueError:
+                offset = 0
+            try:
+                results = search_messages(session_id, query, limit=limit + 1, offset=offset)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 501
+            next_offset = offset + limit if len(results) > limit else None
+            return jsonify({
+                "results": [{
+                    "message_id": result["message_id"],
+                    "conversation_id": result["conversation_id"],
+                    "conversation_title": result["conversation_title"],
+                    "role": result["role"],
+                    "snippet": result["snippet"],
+                    "timestamp": result["timestamp"].isoformat() if result["timestamp"] else None,
+                    "rank": result["rank"]
+                } for result in results[:limit]],
+                "next_offset": next_offset
+            })
+
+        @self.bp.route("/conversations/export", methods=["GET"])
+        def export_conversations():
+            # Stream every conversation and message in the session as NDJSON
+            session_id = session.get('session_id', 'unknown_session')
+            return Response(
+                stream_with_context(export_session(session_id)),
+                mimetype='application/x-ndjson',
+                headers={"Content-Disposition": "attachment; filename=conversations.ndjson"}
+            )
+
+        @self.bp.route("/conversations/import", methods=["POST"])
+        def import_conversations():
+            # Bulk-import an NDJSON export into the current session, read line by line
+            session_id = session.get('session_id', 'unknown_session')
+            try:
+                counts = import_ndjson(request.stream, session_id)
+                db.session.commit()
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({"error": str(e)}), 400
+            except SQLAlchemyError as e:
+                # Constraints checked only at commit; no single line to blame
+                db.session.rollback()
+                return jsonify({"error": f"Import rejected by the database: {getattr(e, 'orig', None) or e}"}), 400
+            return jsonify({"imported": counts})
 
         @self.bp.route("/conversations/<int:conversation_id>", methods=["GET"])
         def get_conversation(conversation_id):
-            # Fetch a specific conversation's messages
+            # Fetch a page of a conversation's messages: the newest page by default,
+            # older pages with ?before=<next_cursor>. Each page is in chronological order.
             conversation = Conversation.query.get(conversation_id)
             if not conversation:
                 return jsonify({"error": "Conversation not found"}), 404
             session_id = session.get('session_id', 'unknown_session')
             if conversation.session_id != session_id:
                 return jsonify({"error": "Unauthorized access"}), 403
-            messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
-            conversation_history = [{"role": msg.role, "content": msg.content} for msg in messages]
-            return jsonify({"conversation_history": conversation_history})
+            limit = get_page_size(MESSAGES_PAGE_SIZE, MAX_MESSAGES_PAGE_SIZE)
+
+            # Every message write bumps the version, so an unchanged version means an unchanged page
+            etag = self.make_etag("conversation", conversation.id, conversation.version, limit, request.args.get('before'))
+            last_modified = conversation.updated_at or conversation.timestamp
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+
+            try:
+                messages, next_cursor = fetch_page(
+                    Message.query.filter_by(conversation_id=conversation_id),
+                    Message.timestamp, Message.id,
+                    limit, request.args.get('before')
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            conversation_history = [{
+                "id": msg.id,
+                "role": msg.role,
+                "content": msg.content,
+                "timestamp": msg.timestamp.isoformat()
+            } for msg in reversed(messages)]
+            response = jsonify({"conversation_history": conversation_history, "next_cursor": next_cursor})
+            return with_validators(response, etag, last_modified)
 
 
         @self.bp.route("/conversations/new", methods=["POST"])
@@ -53,3 +166,7 @@ class ConversationsCog:
                 "title": new_convo.title,
                 "timestamp": new_convo.timestamp.isoformat()
             })
+
+    def make_etag(self, *parts):
+        """Build an ETag from the values that determine a response."""
+        return hashlib.md5(repr(parts).encode()).hexdigest()
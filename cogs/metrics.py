@@ -0,0 +1,15 @@
+# cogs/metrics.py
+from flask import Blueprint, jsonify
+from utils import metrics
+
+
+class MetricsCog:
+    def __init__(self):
+        self.bp = Blueprint("metrics_blueprint", __name__)
+        self.add_routes()
+
+    def add_routes(self):
+        @self.bp.route("/metrics", methods=["GET"])
+        def get_metrics():
+            """Counters, gauges and rates for this worker process."""
+            return jsonify(metrics.snapshot())
@@ -4,6 +4,35 @@ from models import UploadedFile
 import json
 import re
 import traceback
+from datetime import datetime
+
+# Structured output schema for the routing call. Everything the turn needs
+# (route, image prompt, file id, planned search queries) comes back in one call.
+ORCHESTRATION_SCHEMA = {
+    "name": "orchestration",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "image_generation": {"type": "boolean"},
+            "image_prompt": {"type": "string"},
+            "internet_search": {"type": "boolean"},
+            "search_queries": {"type": "array", "items": {"type": "string"}},
+            "file_orchestration": {"type": "boolean"},
+            "file_id": {"type": "string"},
+            "active_users": {"type": "boolean"},
+            "code_orchestration": {"type": "boolean"},
+            "code_structure_orchestration": {"type": "boolean"},
+            "rand_num": {"type": "array", "items": {"type": "integer"}}
+        },
+        "required": [
+            "image_generation", "image_prompt", "internet_search", "search_queries",
+            "file_orchestration", "file_id", "active_users", "code_orchestration",
+            "code_structure_orchestration", "rand_num"
+        ],
+        "additionalProperties": False
+    }
+}
 
 class OrchestrationAnalysisCog:
     def __init__(self, openai_client):
@@ -26,6 +55,7 @@ class OrchestrationAnalysisCog:
                         '- "image_generation": (boolean)\n'
                         '- "image_prompt": (string)\n'
                         '- "internet_search": (boolean)\n'
+                        '- "search_queries": (list of strings)\n'
                         '- "file_orchestration": (boolean)\n'
                         '- "file_id": (string)\n'
                         '- "active_users": (boolean)\n'
@@ -42,7 +72,11 @@ class OrchestrationAnalysisCog:
                         '6. **active_users** should be True if there is a question about the most active users.\n'
                         '7. **code_orchestration** should be True when the user is asking about code-related queries. Anytime "your code" is in the User Input, this should be True.\n'
                         '8. **code_structure_orchestration** should be True when the user asks about visualizing the code base architecture or structure. Return False if only asked to explain.\n'  # New guideline
-                        '9. **rand_num** should contain [lowest_num, highest_num] if the user requests a random number within a range.\n\n'
+                        '9. **rand_num** should contain [lowest_num, highest_num] if the user requests a random number within a range.\n'
+                        '10. **search_queries** should contain 1 to 3 concise Google search queries if **internet_search** is True, most specific first, '
+                        'with the last one broader in case the others find nothing. Use no quotation marks, prefer .mil domains when applicable, '
+                        f'and use the current date ({datetime.now().strftime("%Y-%m-%d")}) when relevant. A URL the user gave may be used as a query as-is. '
+                        'Otherwise return an empty list.\n\n'
                         'Respond in JSON format.\nIMPORTANT: Boolean values only: True or False.'
                     )
                 },
@@ -57,8 +91,9 @@ class OrchestrationAnalysisCog:
             response = self.client.chat.completions.create(
                 model="gpt-4o",
                 messages=analysis_prompt,
-                max_tokens=300,
-                temperature=0
+                max_tokens=400,
+                temperature=0,
+                response_format={"type": "json_schema", "json_schema": ORCHESTRATION_SCHEMA}
             )
 
             orchestration_json = response.choices[0].message.content.strip()
@@ -87,6 +122,7 @@ class OrchestrationAnalysisCog:
                 "image_generation": False,
                 "image_prompt": "",
                 "internet_search": False,
+                "search_queries": [],
                 "file_orchestration": False,
                 "file_id": "",
                 "active_users": False,
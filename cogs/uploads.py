@@ -1,28 +1,101 @@
 # cogs/uploads.py
-from flask import Blueprint, send_from_directory, jsonify, session
+from flask import Blueprint, Response, send_file, jsonify, session
+from werkzeug.utils import secure_filename
 from db import db
 from models import UploadedFile
+from utils.ttl_cache import TTLCache
+import mimetypes
 import os
 
+# Diagrams rendered by the code structure visualizer are not tied to a session
+PUBLIC_PREFIXES = ("codebase_structure_",)
+
+
 class UploadsCog:
-    def __init__(self, upload_folder):
+    def __init__(self, upload_folder, storage=None, visualizer=None):
         self.bp = Blueprint("uploads_blueprint", __name__)
         self.upload_folder = upload_folder
+
+        # Optional UploadStorageManager: serving a file marks it recently used
+        self.storage = storage
+        if storage:
+            storage.on_evict.append(self.forget)
+        # Optional CodeStructureVisualizerCog, to re-render evicted diagrams
+        self.visualizer = visualizer
+
+        # filename -> owning session_id. Stored names are unique per upload, and
+        # only positive results are cached, so a new upload is never refused.
+        self.owners = TTLCache(
+            max_entries=int(os.getenv('UPLOADS_AUTH_CACHE_SIZE', 4096)),
+            ttl=int(os.getenv('UPLOADS_AUTH_CACHE_TTL', 300))
+        )
+        # Uploaded files get unique names and never change, so browsers may reuse them
+        self.max_age = int(os.getenv('UPLOADS_MAX_AGE', 3600))
+        # e.g. "/protected-uploads/": nginx serves the bytes from an internal location
+        self.accel_redirect_prefix = os.getenv('UPLOADS_ACCEL_REDIRECT_PREFIX')
         self.add_routes()
 
+    def is_authorized(self, session_id, filename):
+        """Check that the file was uploaded in this session, caching hits."""
+        if self.owners.get(filename) == session_id:
+            return True
+        exists = db.session.query(
+            UploadedFile.query.filter_by(session_id=session_id, filename=filename).exists()
+        ).scalar()
+        if exists:
+            self.owners.put(filename, session_id)
+        return exists
+
+    def forget(self, filename):
+        """Drop the cached authorization for a file that was deleted."""
+        self.owners.invalidate(filename)
+
+    def serve(self, filename, private=True):
+        """
+        Send a file from the upload folder.
+
+        Range, If-None-Match and If-Modified-Since are handled by send_file.
+        With UPLOADS_ACCEL_REDIRECT_PREFIX set, nginx sends the file instead;
+        with USE_X_SENDFILE set, send_file emits X-Sendfile for Apache/lighttpd.
+        """
+        path = os.path.join(self.upload_folder, filename)
+        if not os.path.isfile(path):
+            return jsonify({"error": "File not found"}), 404
+        if self.storage:
+            self.storage.touch(filename)
+
+        if self.accel_redirect_prefix:
+            response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = self.accel_redirect_prefix.rstrip('/') + '/' + filename
+        else:
+            response = send_file(path, conditional=True, etag=True, max_age=self.max_age)
+        response.cache_control.public = not private
+        response.cache_control.private = private
+        response.cache_control.max_age = self.max_age
+        return response
+
     def add_routes(self):
         @self.bp.route("/uploads/<path:filename>", methods=["GET"])
         def uploaded_file(filename):
+            # Stored names are always secure_filename output, which rules out traversal
+            if secure_filename(filename) != filename:
+                return jsonify({"error": "File not found"}), 404
+
+            if filename.startswith(PUBLIC_PREFIXES):
+                path = os.path.join(self.upload_folder, filename)
+                if self.visualizer and not os.path.isfile(path):
+                    # Evicted under the storage quota; old messages still link to it
+                    self.visualizer.regenerate(filename)
+                return self.serve(filename, private=False)
+
             # Ensure the request is part of the current session
             session_id = session.get('session_id', None)
             if not session_id:
                 return jsonify({"error": "Unauthorized access"}), 403
-            
+
             # Verify that the requested file belongs to the current session
-            file_entry = UploadedFile.query.filter_by(session_id=session_id, filename=filename).first()
-            if not file_entry:
+            if not self.is_authorized(session_id, filename):
                 return jsonify({"error": "File not found"}), 404
-            
-            # Serve the file
-            return send_from_directory(self.upload_folder, filename)
 
+            # Serve the file
+            return self.serve(filename)
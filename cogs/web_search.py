@@ -11,8 +11,12 @@ from datetime import time as dt_time
 # from utils.fetch_page_content import fetch_page_content  # Ensure this is synchronous
 
 from utils.fetch_page_content import fetch_page_content  # Ensure this is synchronous
+from utils.single_flight import SingleFlight
 
 est = pytz.timezone('America/New_York')
+
+# Identical Custom Search queries in flight at once share one request
+_searches = SingleFlight("search")
 current_date = datetime.now(est).strftime("%Y-%m-%d")
 current_time = datetime.now(est)
 
@@ -67,63 +71,104 @@ class WebSearchCog:
             # Fallback to original query if LLM fails
             return user_input
 
-    def web_search(self, query, history):
-        """Perform a web search using the Google Custom Search API."""
-        # First, generate optimized search terms using the LLM
-        optimized_query = self.generate_search_terms(query, history)
+    def run_search(self, search_query):
+        """
+        Call the Google Custom Search API.
+
+        Identical queries in flight at the same time share one request.
+
+        :return: Parsed JSON results, or None if the request failed.
+        """
+        key = " ".join(search_query.lower().split())
+        return _searches.do(key, lambda: self._run_search(search_query))
+
+    def _run_search(self, search_query):
+        params = {
+            "key": self.search_api_key,
+            "cx": self.search_engine_id,
+            "q": search_query,
+        }
+        try:
+            response = requests.get(self.search_url, params=params, timeout=10)
+            if response.status_code != 200:
+                print(f"Error fetching search results: {response.status_code}")
+                print(f"Error details: {response.text}")
+                return None
+            return response.json()
+        except Exception as e:
+            print(f"Exception during web search: {e}")
+            return None
+
+    def web_search(self, query, history, planned_queries=None, cancel_event=None, stats=None):
+        """
+        Perform a web search using the Google Custom Search API.
+
+        :param query: The user's message.
+        :param history: Conversation history, used to generate search terms.
+        :param planned_queries: Queries already planned by the orchestration call.
+            When given, no LLM call is made here: the first query is searched
+            and the rest are fallbacks if it finds nothing.
+        :param cancel_event: Optional threading.Event; once set, the search stops
+            before its next request and returns None.
+        :param stats: Optional dict that receives counts of llm_calls, search_calls
+            and page_fetches, and "ok" when page content was found.
+        :return: Page content from the top results, or an error message.
+        """
+        stats = stats if stats is not None else {}
+        cancelled = lambda: cancel_event is not None and cancel_event.is_set()
+
+        def count(key):
+            stats[key] = stats.get(key, 0) + 1
+
+        planned_queries = [q.strip() for q in (planned_queries or []) if q and q.strip()]
+        if planned_queries:
+            optimized_query = planned_queries[0]
+            fallback_queries = planned_queries[1:]
+        else:
+            # First, generate optimized search terms using the LLM
+            count("llm_calls")
+            optimized_query = self.generate_search_terms(query, history)
+            fallback_queries = None
         print(f"Query: {query}\n")
         print(f"Optimized Query: {optimized_query}")
+        if cancelled():
+            return None
 
         if validators.url(optimized_query):
+            count("page_fetches")
             content = fetch_page_content(optimized_query)
             if content:
+                stats["ok"] = True
                 return content[:3000]  # Limit content length
             else:
                 return "Couldn't fetch information from the provided URL."
-        else:
-            params = {
-                "key": self.search_api_key,
-                "cx": self.search_engine_id,
-                "q": optimized_query,
-            }
-
-            try:
-                response = requests.get(self.search_url, params=params, timeout=10)
-                if response.status_code == 200:
-                    search_results = response.json()
-                    items = search_results.get('items', [])
-                    if not items:
-                        query += f'This is what you provided last time and resulted in no search results. Try again, but be more general to allow a broader search:\n{optimized_query}'
-                        optimized_query = self.generate_search_terms(query, history)
-                        print(f"Second Optimized Query: {optimized_query}")
-                        params = {
-                            "key": self.search_api_key,
-                            "cx": self.search_engine_id,
-                            "q": optimized_query,
-                        }
-                        try:
-                            response = requests.get(self.search_url, params=params, timeout=10)
-                            if response.status_code != 200:
-                                error_content = response.text
-                                print(f"Error fetching search results: {response.status_code}")
-                                print(f"Error details: {error_content}")
-                                return "An error occurred while performing the web search."
-                        except Exception as e:
-                            print(f"Exception during web search: {e}")
-                            return "An error occurred while performing the web search."
-                    print()
-                    print('search_results', search_results)
-                    return self.fetch_search_content(search_results)
-                else:
-                    error_content = response.text
-                    print(f"Error fetching search results: {response.status_code}")
-                    print(f"Error details: {error_content}")
+
+        count("search_calls")
+        search_results = self.run_search(optimized_query)
+        if search_results is None:
+            return "An error occurred while performing the web search."
+        if not search_results.get('items'):
+            if fallback_queries is None:
+                if cancelled():
+                    return None
+                query += f'This is what you provided last time and resulted in no search results. Try again, but be more general to allow a broader search:\n{optimized_query}'
+                count("llm_calls")
+                fallback_queries = [self.generate_search_terms(query, history)]
+            for fallback_query in fallback_queries:
+                if cancelled():
+                    return None
+                print(f"Fallback Query: {fallback_query}")
+                count("search_calls")
+                search_results = self.run_search(fallback_query)
+                if search_results is None:
                     return "An error occurred while performing the web search."
-            except Exception as e:
-                print(f"Exception during web search: {e}")
-                return "An error occurred while performing the web search."
+                if search_results.get('items'):
+                    break
+        print()
+        print('search_results', search_results)
+        return self.fetch_search_content(search_results, cancel_event=cancel_event, stats=stats)
 
-    def fetch_search_content(self, search_results):
+    def fetch_search_content(self, search_results, cancel_event=None, stats=None):
         """Fetch content from search results."""
         if not search_results:
             return "Couldn't fetch information from the internet."
@@ -136,9 +181,13 @@ class WebSearchCog:
         if not urls:
             return "No valid URLs found in search results."
 
+        stats = stats if stats is not None else {}
         contents = []
         for url in urls:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
             print(f"Fetching content from {url}")
+            stats["page_fetches"] = stats.get("page_fetches", 0) + 1
             content = fetch_page_content(url)
             # print('og content', content)
             if content:
@@ -147,5 +196,6 @@ class WebSearchCog:
             if content:
                 contents.append(content[:3000])  # Limit content length
 
+        if contents:
+            stats["ok"] = True
         return '\n'.join(contents) if contents else "No detailed information found."
-
@@ -0,0 +1,29 @@
+"""Add updated_at to Conversation
+
+Revision ID: 3580c77801f7
+Revises: 765b4b28ae1e
+Create Date: 2026-10-19 11:26:05.914733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3580c77801f7'
+down_revision = '765b4b28ae1e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing conversations were last modified no earlier than they were created
+    op.execute('UPDATE conversation SET updated_at = timestamp WHERE updated_at IS NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,38 @@
+"""Add indexes for hot query paths
+
+Revision ID: 765b4b28ae1e
+Revises: 2dd801e1ec53
+Create Date: 2026-10-19 10:03:17.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '765b4b28ae1e'
+down_revision = '2dd801e1ec53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_session_id_timestamp', ['session_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_conversation_id_timestamp', ['conversation_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('uploaded_file', schema=None) as batch_op:
+        batch_op.create_index('ix_uploaded_file_session_id_filename', ['session_id', 'filename'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_file', schema=None) as batch_op:
+        batch_op.drop_index('ix_uploaded_file_session_id_filename')
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_timestamp')
+
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_session_id_timestamp')
@@ -0,0 +1,67 @@
+"""Recompress existing message content
+
+Revision ID: 965daf1e5851
+Revises: f73a5125d8a5
+Create Date: 2026-10-19 14:07:33.618204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.compressed_text import compress_text, decompress_text, is_compressed, settings
+
+
+# revision identifiers, used by Alembic.
+revision = '965daf1e5851'
+down_revision = 'f73a5125d8a5'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+message = sa.table(
+    'message',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+)
+
+
+def _rewrite(transform):
+    # Content is stored as Text either way, so this is a data-only migration
+    bind = op.get_bind()
+    last_id = 0
+    rewritten = 0
+    while True:
+        rows = bind.execute(
+            sa.select(message.c.id, message.c.content)
+            .where(message.c.id > last_id)
+            .order_by(message.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            new_content = transform(row.content)
+            if new_content != row.content:
+                updates.append({'row_id': row.id, 'new_content': new_content})
+        if updates:
+            bind.execute(
+                message.update().where(message.c.id == sa.bindparam('row_id'))
+                .values(content=sa.bindparam('new_content')),
+                updates
+            )
+            rewritten += len(updates)
+        last_id = rows[-1].id
+    print(f"Rewrote {rewritten} message rows")
+
+
+def upgrade():
+    if not settings['codec']:
+        print("MESSAGE_COMPRESSION is not set; leaving message content uncompressed")
+        return
+    _rewrite(compress_text)
+
+
+def downgrade():
+    _rewrite(lambda content: decompress_text(content) if is_compressed(content) else content)
@@ -0,0 +1,57 @@
+"""Add full-text search index over messages
+
+Revision ID: f73a5125d8a5
+Revises: 3580c77801f7
+Create Date: 2026-10-19 12:48:52.310967
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f73a5125d8a5'
+down_revision = '3580c77801f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+            "content, conversation_id UNINDEXED, session_id, "
+            "tokenize='porter unicode61')"
+        )
+        op.execute(
+            "INSERT INTO message_fts (rowid, content, conversation_id, session_id) "
+            "SELECT message.id, message.content, message.conversation_id, conversation.session_id "
+            "FROM message JOIN conversation ON conversation.id = message.conversation_id "
+            "WHERE message.id NOT IN (SELECT rowid FROM message_fts)"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS message_search ("
+            "message_id INTEGER PRIMARY KEY REFERENCES message (id) ON DELETE CASCADE, "
+            "conversation_id INTEGER NOT NULL, "
+            "session_id VARCHAR(100) NOT NULL, "
+            "tsv TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "INSERT INTO message_search (message_id, conversation_id, session_id, tsv) "
+            "SELECT message.id, message.conversation_id, conversation.session_id, "
+            "to_tsvector('english', message.content) "
+            "FROM message JOIN conversation ON conversation.id = message.conversation_id "
+            "ON CONFLICT (message_id) DO NOTHING"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_message_search_tsv ON message_search USING GIN (tsv)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_message_search_session_id ON message_search (session_id)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS message_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP TABLE IF EXISTS message_search")
@@ -1,22 +1,40 @@
 # models.py
 from db import db
 from datetime import datetime
+from utils.compressed_text import CompressedText
 
 class Conversation(db.Model):
+    __table_args__ = (
+        # Conversation lists: filter by session, newest first
+        db.Index('ix_conversation_session_id_timestamp', 'session_id', 'timestamp'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped on every message write
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)  # Last message write, for Last-Modified
     messages = db.relationship('Message', backref='conversation', lazy=True)
 
 class Message(db.Model):
+    __table_args__ = (
+        # Conversation history: filter by conversation, oldest first
+        db.Index('ix_message_conversation_id_timestamp', 'conversation_id', 'timestamp'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
     role = db.Column(db.String(50), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.Column(CompressedText, nullable=False)  # Large values compressed when MESSAGE_COMPRESSION is set
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class UploadedFile(db.Model):
+    __table_args__ = (
+        # Session file lists (orchestration) and session + filename lookups (uploads)
+        db.Index('ix_uploaded_file_session_id_filename', 'session_id', 'filename'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), nullable=False)
     filename = db.Column(db.String(255), nullable=False)             # Unique filename with UUID
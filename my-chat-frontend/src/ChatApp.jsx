@@ -209,6 +209,13 @@ Feel free to type your question below!`,
   const [loading, setLoading] = useState(false);
   const [drawerOpen, setDrawerOpen] = useState(false);
   const [conversationsList, setConversationsList] = useState([]);
+  // Keyset cursors for the next page of conversations and of older messages
+  const [conversationsCursor, setConversationsCursor] = useState(null);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [historyConversationId, setHistoryConversationId] = useState(null);
+  // Server's current conversation and how many of its messages we hold; sent as
+  // last_seen so /chat returns only what we are missing, not the whole history
+  const [syncedHistory, setSyncedHistory] = useState(null);
   const [selectedFile, setSelectedFile] = useState(null); // **ADDED**
 
   // Ref for auto-scroll
@@ -228,9 +235,10 @@ Feel free to type your question below!`,
     fetchConversations();
   }, []);
 
-  const fetchConversations = async () => {
+  const fetchConversations = async (cursor = null) => {
     try {
-      const res = await fetch("/conversations", {
+      const url = cursor ? `/conversations?cursor=${encodeURIComponent(cursor)}` : "/conversations";
+      const res = await fetch(url, {
         method: "GET",
         headers: {
           "Content-Type": "application/json"
@@ -239,7 +247,9 @@ Feel free to type your question below!`,
       });
       if (res.ok) {
         const data = await res.json();
-        setConversationsList(data.conversations);
+        // A cursor continues the list with older conversations; otherwise start over
+        setConversationsList((prev) => (cursor ? [...prev, ...data.conversations] : data.conversations));
+        setConversationsCursor(data.next_cursor);
       } else {
         console.error("Failed to fetch conversations.");
       }
@@ -261,6 +271,8 @@ Feel free to type your question below!`,
       if (res.ok) {
         const data = await res.json();
         setConversation(data.conversation_history);
+        setHistoryCursor(data.next_cursor);
+        setHistoryConversationId(convo.id);
         setDrawerOpen(false);
       } else {
         console.error("Failed to fetch conversation.");
@@ -270,6 +282,32 @@ Feel free to type your question below!`,
     }
   };
 
+  // Prepend the page of messages before the oldest one shown
+  const loadOlderMessages = async () => {
+    if (!historyCursor || !historyConversationId) return;
+    try {
+      const res = await fetch(
+        `/conversations/${historyConversationId}?before=${encodeURIComponent(historyCursor)}`,
+        {
+          method: "GET",
+          headers: {
+            "Content-Type": "application/json"
+          },
+          credentials: "include"
+        }
+      );
+      if (res.ok) {
+        const data = await res.json();
+        setConversation((prev) => [...data.conversation_history, ...prev]);
+        setHistoryCursor(data.next_cursor);
+      } else {
+        console.error("Failed to fetch older messages.");
+      }
+    } catch (err) {
+      console.error("Error fetching older messages:", err);
+    }
+  };
+
   // Handle starting a new conversation
   const startNewConversation = async () => {
     try {
@@ -283,6 +321,8 @@ Feel free to type your question below!`,
       });
       if (res.ok) {
         const data = await res.json();
+        setHistoryCursor(null);
+        setSyncedHistory({ conversationId: data.conversation_id, count: 0 });
         // Reset conversation to include the welcome message
         setConversation([
           {
@@ -379,6 +419,10 @@ Feel free to type your question below!`,
       payload.append("system_prompt", systemPrompt.trim());
       payload.append("temperature", temperature);
       payload.append("file", selectedFile); // **ADDED**
+      if (syncedHistory) {
+        payload.append("last_seen", syncedHistory.count);
+        payload.append("conversation_id", syncedHistory.conversationId);
+      }
 
       fetchOptions = {
         method: "POST",
@@ -392,6 +436,10 @@ Feel free to type your question below!`,
         model,
         system_prompt: systemPrompt.trim(),
         temperature,
+        ...(syncedHistory && {
+          last_seen: syncedHistory.count,
+          conversation_id: syncedHistory.conversationId,
+        }),
       };
 
       fetchOptions = {
@@ -425,6 +473,25 @@ Feel free to type your question below!`,
           )
         );
       } else {
+        // Messages written elsewhere (e.g. another tab) go before this turn;
+        // a reset means our count was stale, so the server sent everything
+        if (data.messages && (data.reset || data.messages.length > 0)) {
+          const missed = data.messages.map((msg, index) => ({
+            ...msg,
+            id: `synced-${data.message_count}-${index}`,
+          }));
+          setConversation((prev) => {
+            const turn = prev.filter((msg) => msg.id === userMessage.id || msg.id === placeholderId);
+            const before = data.reset
+              ? []
+              : prev.filter((msg) => msg.id !== userMessage.id && msg.id !== placeholderId);
+            return [...before, ...missed, ...turn];
+          });
+        }
+        if (data.conversation_id != null) {
+          setSyncedHistory({ conversationId: data.conversation_id, count: data.message_count });
+        }
+
         // If a file was uploaded, include its URL in the user message
         if (fileUrl && fileName && fileType) { // **ADDED**
           setConversation((prev) =>
@@ -566,6 +633,13 @@ Feel free to type your question below!`,
                 </ListItem>
               ))}
             </List>
+            {conversationsCursor && (
+              <Box sx={{ px: 2, pb: 1 }}>
+                <Button fullWidth onClick={() => fetchConversations(conversationsCursor)}>
+                  Load more
+                </Button>
+              </Box>
+            )}
             <Divider />
             <Box sx={{ p: 2 }}>
               <Button variant="contained" color="secondary" fullWidth onClick={startNewConversation}>
@@ -665,6 +739,13 @@ Feel free to type your question below!`,
                   pr: { xs: 0, sm: 1 },
                 }}
               >
+                {historyCursor && (
+                  <Box sx={{ display: 'flex', justifyContent: 'center', mb: 1 }}>
+                    <Button size="small" onClick={loadOlderMessages}>
+                      Load earlier messages
+                    </Button>
+                  </Box>
+                )}
                 {/* Removed Virtualized Chat Messages for Debugging */}
                 {/* Use standard mapping to render messages */}
                 {conversation.map((msg) => (
@@ -724,7 +805,10 @@ Feel free to type your question below!`,
               </IconButton>
               <IconButton
                 color="secondary"
-                onClick={() => setConversation([])}
+                onClick={() => {
+                  setConversation([]);
+                  setHistoryCursor(null);
+                }}
                 disabled={loading}
                 sx={{ p: 1 }}
                 aria-label="clear"
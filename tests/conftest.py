@@ -0,0 +1,104 @@
+# tests/conftest.py
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+import utils.token_budget as token_budget
+
+
+class WordEncoding:
+    """Stand-in tokenizer, one token per space-separated word, so tests need no tiktoken download."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split(' ')
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    monkeypatch.setattr(token_budget, "get_encoding", lambda model="gpt-4o-mini": WordEncoding())
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A bare Flask app with the models on a throwaway SQLite database."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        import models  # noqa: F401 (registers the tables)
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+class FakeLLM:
+    """
+    Stands in for openai.chat.completions. Routing calls (those with a
+    response_format) answer with `routing`; others reply "reply to <message>".
+    """
+
+    def __init__(self):
+        self.routing = {"image_generation": False}
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("response_format"):
+            content = json.dumps(self.routing)
+        else:
+            content = "reply to " + (kwargs["messages"][-1].get("content") or "")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def chat_calls(self):
+        """Calls that generated a reply, not routing decisions."""
+        return [call for call in self.calls if not call.get("response_format")]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    import openai
+
+    fake = FakeLLM()
+    monkeypatch.setattr(openai, "chat", SimpleNamespace(completions=SimpleNamespace(create=fake.create)),
+                        raising=False)
+    return fake
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch, llm):
+    """
+    Build the full application on a temporary database and instance folder,
+    with the OpenAI client faked by `llm`. Keyword arguments set environment
+    variables first, e.g. make_app(WRITE_BEHIND_MESSAGES="1").
+    """
+    monkeypatch.setattr(Flask, "auto_find_instance_path", lambda self: str(tmp_path / "instance"))
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv("SESSION_BACKEND", "cookie")
+    monkeypatch.chdir(tmp_path)
+    # Flask-Session fixes its default file store to the working directory at import
+    monkeypatch.setattr("flask_session.defaults.Defaults.SESSION_FILE_DIR", str(tmp_path / "flask_session"))
+
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        # app.py builds its module-level app on import, with the environment set above
+        from app import create_app
+        return create_app()
+
+    return make
+
+
+@pytest.fixture
+def client(make_app):
+    return make_app().test_client()
@@ -0,0 +1,61 @@
+# tests/test_archive.py
+import json
+
+
+def export(client):
+    response = client.get("/conversations/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_export_import_round_trip(make_app):
+    app = make_app()
+    source = app.test_client()
+    for message in ("one", "two"):
+        source.post("/chat", json={"message": message})
+    source.post("/conversations/new", json={"title": "Second"})
+    source.post("/chat", json={"message": "three"})
+    records = export(source)
+
+    assert [r["type"] for r in records] == ["conversation"] * 2 + ["message"] * 6
+    body = "".join(json.dumps(r) + "\n" for r in records)
+
+    target = app.test_client()  # A fresh session
+    response = target.post("/conversations/import", data=body, content_type="application/x-ndjson")
+    assert response.get_json() == {"imported": {"conversations": 2, "messages": 6}}
+
+    imported = export(target)
+    strip = lambda r: {k: v for k, v in r.items() if k not in ("id", "conversation_id")}
+    assert [strip(r) for r in imported] == [strip(r) for r in records]
+    # Message references follow the new conversation ids
+    ids = [r["id"] for r in imported if r["type"] == "conversation"]
+    assert {r["conversation_id"] for r in imported if r["type"] == "message"} == set(ids)
+
+
+def post_import(client, records):
+    body = "".join(json.dumps(r) + "\n" for r in records)
+    return client.post("/conversations/import", data=body, content_type="application/x-ndjson")
+
+
+def test_malformed_lines_are_rejected_with_their_line_number(client):
+    response = post_import(client, [{"type": "conversation", "id": 1}, {"type": "message", "conversation_id": 2,
+                                                                       "role": "user", "content": "x"}])
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Line 2:")
+
+
+def test_constraint_violations_are_a_400_and_leave_nothing_behind(client):
+    records = [
+        {"type": "conversation", "id": 1, "title": "t"},
+        {"type": "message", "conversation_id": 1, "role": "user", "content": "fine"},
+        {"type": "message", "conversation_id": 1, "role": None, "content": "no role"},
+    ]
+    response = post_import(client, records)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Lines 2-3: rejected by the database")
+    assert export(client) == []
+
+    # The session is usable again afterwards
+    response = post_import(client, records[:2])
+    assert response.get_json() == {"imported": {"conversations": 1, "messages": 1}}
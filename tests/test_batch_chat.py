@@ -0,0 +1,55 @@
+# tests/test_batch_chat.py
+import json
+import re
+
+
+def run_batch(client, **body):
+    response = client.post("/chat/batch", json=body)
+    assert response.status_code == 200, response.data
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_results_stream_as_ndjson_and_are_saved(client):
+    lines = run_batch(client, prompts=["one", {"message": "two", "id": "b"}, "three"])
+    results, summary = lines[:-1], lines[-1]
+
+    assert sorted(r["assistant_reply"] for r in results) == ["reply to one", "reply to three", "reply to two"]
+    assert {r["id"] for r in results} == {0, "b", 2}
+    assert summary["done"] is True
+    assert (summary["count"], summary["errors"], summary["saved"]) == (3, 0, 3)
+
+    history = client.get(f"/conversations/{summary['conversation_id']}").get_json()["conversation_history"]
+    # Each prompt stays next to its reply
+    pairs = [(history[i]["content"], history[i + 1]["content"]) for i in range(0, len(history), 2)]
+    assert sorted(pairs) == [("one", "reply to one"), ("three", "reply to three"), ("two", "reply to two")]
+
+
+def test_direct_orchestration_replies_skip_the_model(client, llm):
+    llm.routing = {"image_generation": False, "rand_num": [1, 6]}
+    lines = run_batch(client, prompts=["roll a die"])
+    assert re.fullmatch(r"Your random number between 1 and 6 is [1-6]\.", lines[0]["assistant_reply"])
+    assert llm.chat_calls() == []
+
+
+def test_image_requests_are_reported_as_errors(client, llm):
+    llm.routing = {"image_generation": True, "image_prompt": "a ship"}
+    lines = run_batch(client, prompts=["draw a ship"])
+    assert "error" in lines[0]
+    assert lines[-1]["errors"] == 1
+    assert lines[-1]["saved"] == 0
+
+
+def test_invalid_batches_are_rejected(client):
+    assert client.post("/chat/batch", json={"prompts": []}).status_code == 400
+    assert client.post("/chat/batch", json={"prompts": [""]}).status_code == 400
+    assert client.post("/chat/batch", json={"prompts": [{"message": "x", "temperature": "hot"}]}).status_code == 400
+    assert client.post("/chat/batch", data="not json").status_code == 400
+
+
+def test_interactive_chat_still_asks_the_model(client, llm):
+    # The direct-reply shortcut is batch-only; /chat keeps its behavior
+    llm.routing = {"image_generation": False, "rand_num": [1, 6]}
+    data = client.post("/chat", json={"message": "roll a die"}).get_json()
+    assert data["assistant_reply"] == "reply to roll a die"
+    assert len(llm.chat_calls()) == 1
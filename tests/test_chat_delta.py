@@ -0,0 +1,57 @@
+# tests/test_chat_delta.py
+
+
+def chat(client, message, **fields):
+    response = client.post("/chat", json={"message": message, **fields})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_without_last_seen_the_full_history_is_returned(client):
+    chat(client, "one")
+    data = chat(client, "two")
+    assert [m["content"] for m in data["conversation_history"]] == [
+        "one", "reply to one", "two", "reply to two"]
+    assert data["message_count"] == 4
+    assert "messages" not in data
+
+
+def test_delta_returns_only_missed_messages(client):
+    first = chat(client, "one")
+    conversation_id = first["conversation_id"]
+
+    data = chat(client, "two", last_seen=first["message_count"], conversation_id=conversation_id)
+    assert data["messages"] == []
+    assert "conversation_history" not in data
+    assert data["message_count"] == 4
+
+    # A client that last synced after "one" missed turn "two" (e.g. another tab)
+    data = chat(client, "three", last_seen=2, conversation_id=conversation_id)
+    assert [m["content"] for m in data["messages"]] == ["two", "reply to two"]
+    assert data["message_count"] == 6
+    assert data["assistant_reply"] == "reply to three"
+    assert "reset" not in data
+
+
+def test_stale_count_or_conversation_resets(client):
+    first = chat(client, "one")
+    conversation_id = first["conversation_id"]
+
+    data = chat(client, "two", last_seen=50, conversation_id=conversation_id)
+    assert data["reset"] is True
+    assert [m["content"] for m in data["messages"]] == ["one", "reply to one"]
+
+    data = chat(client, "three", last_seen=0, conversation_id=conversation_id + 1)
+    assert data["reset"] is True
+    assert len(data["messages"]) == 4
+
+
+def test_delta_payload_does_not_grow_with_the_conversation(client):
+    data = chat(client, "hello")
+    sizes = []
+    for _ in range(5):
+        response = client.post("/chat", json={"message": "hello", "last_seen": data["message_count"],
+                                              "conversation_id": data["conversation_id"]})
+        data = response.get_json()
+        sizes.append(len(response.data) - len(str(data["message_count"])))
+    assert len(set(sizes)) == 1
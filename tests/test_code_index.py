@@ -0,0 +1,113 @@
+# tests/test_code_index.py
+import os
+
+import pytest
+
+from utils.code_index import CodeIndex, split_identifier, stem, terms_of
+
+COG = '''
+class UploadsCog:
+    """Serve uploaded files."""
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+
+    def add_routes(self):
+        @self.bp.route("/uploads/<path:filename>")
+        def uploaded_file(filename):
+            return send(filename)
+
+    def is_authorized(self, session_id, filename):
+        """Check that the file was uploaded in this session."""
+        return lookup(session_id, filename)
+'''
+
+UTIL = '''
+def count_tokens(text):
+    """Count tokens in text."""
+    return len(text.split())
+'''
+
+JSX = '''import React from 'react';
+
+function ChatApp() {
+  const sendMessage = async () => {
+    await fetch('/chat');
+  };
+  return null;
+}
+
+export default ChatApp;
+'''
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "cogs").mkdir()
+    (tmp_path / "utils").mkdir()
+    (tmp_path / "frontend").mkdir()
+    (tmp_path / "cogs" / "uploads.py").write_text(COG)
+    (tmp_path / "utils" / "token_budget.py").write_text(UTIL)
+    (tmp_path / "utils" / "broken.py").write_text("def broken(:\n")
+    (tmp_path / "frontend" / "ChatApp.jsx").write_text(JSX)
+    return tmp_path
+
+
+@pytest.fixture
+def index(project):
+    return CodeIndex(str(project), extra_files=("frontend/ChatApp.jsx",))
+
+
+def test_terms():
+    assert split_identifier("uploadFolder is_authorized HTTPServer") == [
+        "upload", "folder", "is", "authorized", "http", "server"]
+    assert stem("uploaded") == stem("uploads") == stem("upload")
+    assert terms_of("How does the upload work?") == ["upload"]
+
+
+def test_symbols(index):
+    by_name = {symbol["name"]: symbol for symbol in index.symbols()}
+    assert by_name["UploadsCog"]["kind"] == "class"
+    # The class outline carries method signatures, not their bodies
+    assert "def is_authorized(self, session_id, filename): ..." in by_name["UploadsCog"]["source"]
+    assert "lookup" not in by_name["UploadsCog"]["source"]
+    assert by_name["UploadsCog.uploaded_file"]["kind"] == "route"
+    assert by_name["UploadsCog.uploaded_file"]["signature"].startswith('@self.bp.route("/uploads/<path:filename>")')
+    assert by_name["UploadsCog.is_authorized"]["doc"] == "Check that the file was uploaded in this session."
+    assert by_name["count_tokens"]["kind"] == "function"
+    assert by_name["ChatApp"]["kind"] == "component"
+    assert by_name["sendMessage"]["kind"] == "function"
+    assert "broken" not in by_name
+
+
+def test_only_changed_files_are_parsed_again(index, project):
+    index.symbols()
+    parsed = index.parses
+    index.symbols()
+    assert index.parses == parsed
+
+    (project / "utils" / "token_budget.py").write_text(UTIL + "\ndef truncate(text):\n    return text\n")
+    assert "truncate" in {symbol["name"] for symbol in index.symbols()}
+    assert index.parses == parsed + 1
+
+    os.remove(project / "utils" / "token_budget.py")
+    assert "count_tokens" not in {symbol["name"] for symbol in index.symbols()}
+
+
+def test_relevant_symbols_rank_names_first(index):
+    names = [symbol["name"] for symbol in index.relevant_symbols("how are uploads authorized?")]
+    assert names[0] == "UploadsCog.is_authorized"
+    assert "count_tokens" not in names
+    assert index.relevant_symbols("the and of") == []
+
+
+def test_relevant_symbols_respect_the_limit_and_budget(index):
+    assert len(index.relevant_symbols("upload", limit=1)) == 1
+    assert index.relevant_symbols("upload", max_tokens=1) == []
+
+
+def test_outline(index):
+    outline = index.outline()
+    assert "cogs/uploads.py: UploadsCog, UploadsCog.uploaded_file" in outline
+    assert "is_authorized" not in outline
+    assert "frontend/ChatApp.jsx: ChatApp, sendMessage" in outline
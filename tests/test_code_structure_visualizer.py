@@ -0,0 +1,113 @@
+# tests/test_code_structure_visualizer.py
+import os
+
+import pytest
+
+from cogs.code_structure_visualizer import CodeStructureVisualizerCog
+
+
+class FakeRenderer:
+    """Writes the DOT source to the output path instead of running dot."""
+
+    def __init__(self):
+        self.rendered = []
+
+    def render(self, source, output_path, fmt='svg', wait=None):
+        self.rendered.append(output_path)
+        with open(output_path, "w") as f:
+            f.write(source)
+        return output_path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "project"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "module.py").write_text("x = 1\n")
+    (root / "app.py").write_text("print()\n")
+    return root
+
+
+@pytest.fixture
+def cog(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    return CodeStructureVisualizerCog(str(uploads), renderer=FakeRenderer())
+
+
+def test_fingerprint_follows_files_not_contents(cog, tree):
+    before = cog.hash_directory_structure(str(tree))
+    assert cog.hash_directory_structure(str(tree)) == before
+
+    module = tree / "pkg" / "module.py"
+    stat = module.stat()
+    module.write_text("y = 2\n")  # Same size
+    os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cog.hash_directory_structure(str(tree)) == before
+
+    module.write_text("y = 22\n")
+    changed = cog.hash_directory_structure(str(tree))
+    assert changed != before
+
+    (tree / "pkg" / "new.py").write_text("")
+    assert cog.hash_directory_structure(str(tree)) != changed
+
+
+def test_excluded_files_and_directories_do_not_change_fingerprint(cog, tree):
+    before = cog.hash_directory_structure(str(tree))
+    (tree / "app.db").write_text("data")
+    (tree / "__pycache__").mkdir()
+    (tree / "__pycache__" / "app.cpython-312.pyc").write_text("")
+    assert cog.hash_directory_structure(str(tree)) == before
+
+
+def test_diagram_is_cached_by_fingerprint(cog, tree):
+    url = cog.generate_codebase_structure_diagram(str(tree))
+    assert url.startswith("/uploads/codebase_structure_") and url.endswith(".svg")
+    assert cog.generate_codebase_structure_diagram(str(tree)) == url
+    assert len(cog.renderer.rendered) == 1
+
+    (tree / "pkg" / "other.py").write_text("")
+    assert cog.generate_codebase_structure_diagram(str(tree)) != url
+    assert len(cog.renderer.rendered) == 2
+
+
+def test_large_directories_are_summarized(cog, tree):
+    cog.max_files_per_dir = 2
+    for i in range(3):
+        (tree / "pkg" / f"extra_{i}.py").write_text("")
+    url = cog.generate_codebase_structure_diagram(str(tree))
+    with open(os.path.join(cog.upload_folder, os.path.basename(url))) as f:
+        source = f.read()
+    assert "4 files" in source
+    assert "extra_0.py" not in source
+
+
+def test_regenerate_only_draws_the_current_tree(cog, tree):
+    url = cog.generate_codebase_structure_diagram(str(tree))
+    name = os.path.basename(url)
+    os.remove(os.path.join(cog.upload_folder, name))  # Evicted
+    assert cog.regenerate(name, str(tree))
+    assert os.path.exists(os.path.join(cog.upload_folder, name))
+
+    os.remove(os.path.join(cog.upload_folder, name))
+    (tree / "pkg" / "other.py").write_text("")
+    assert not cog.regenerate(name, str(tree))
+    assert not os.path.exists(os.path.join(cog.upload_folder, name))
+    assert len(cog.renderer.rendered) == 2
+
+
+def test_uploads_route_rerenders_evicted_diagrams(app, cog, tree):
+    from cogs.uploads import UploadsCog
+
+    cog.root_dir = str(tree)
+    app.register_blueprint(UploadsCog(cog.upload_folder, visualizer=cog).bp)
+    client = app.test_client()
+    url = cog.generate_codebase_structure_diagram()
+    os.remove(os.path.join(cog.upload_folder, os.path.basename(url)))
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b"digraph" in response.data
+    response.close()
+    assert client.get("/uploads/codebase_structure_0.svg").status_code == 404
@@ -0,0 +1,78 @@
+# tests/test_compressed_text.py
+import base64
+import zlib
+
+import pytest
+
+from utils import compressed_text
+from utils.compressed_text import HEADER, compress_text, decompress_text, is_compressed
+
+
+@pytest.fixture(autouse=True)
+def zlib_compression(monkeypatch):
+    monkeypatch.setitem(compressed_text.settings, "codec", "zlib")
+    monkeypatch.setitem(compressed_text.settings, "threshold", 64)
+
+
+def test_round_trip():
+    text = "The quick brown fox jumps over the lazy dog. " * 50
+    stored = compress_text(text)
+    assert is_compressed(stored)
+    assert len(stored) < len(text)
+    assert decompress_text(stored) == text
+
+
+def test_non_ascii_round_trip_saves_bytes():
+    text = "Семпер Фиделис — всегда верен. " * 40
+    stored = compress_text(text)
+    assert is_compressed(stored)
+    assert len(stored.encode("utf-8")) < len(text.encode("utf-8"))
+    assert decompress_text(stored) == text
+
+
+def test_small_or_incompressible_values_are_stored_as_is():
+    assert compress_text("short") == "short"
+    # Random-looking text does not shrink enough to pay for base64
+    noise = base64.b64encode(bytes(range(256)) * 2).decode()
+    assert compress_text(noise) == noise
+    assert compress_text(None) is None
+
+
+def test_plain_text_reads_back_unchanged():
+    assert decompress_text("plain old row") == "plain old row"
+    assert decompress_text(None) is None
+
+
+def test_corrupt_values_are_returned_as_stored():
+    for stored in (HEADER + "z:bm90IHpsaWI=", HEADER + "q:aGVsbG8=", HEADER + "z:%%%"):
+        assert decompress_text(stored) == stored
+
+
+def test_zstd_values_without_zstandard_fail_clearly(monkeypatch):
+    monkeypatch.setattr(compressed_text, "zstandard", None)
+    with pytest.raises(RuntimeError, match="install zstandard"):
+        decompress_text(HEADER + "s:AAAA")
+
+
+def test_zstd_setting_falls_back_to_zlib(monkeypatch):
+    monkeypatch.setattr(compressed_text, "zstandard", None)
+    monkeypatch.setitem(compressed_text.settings, "codec", "zstd")
+    stored = compress_text("abc " * 100)
+    assert stored.startswith(HEADER + "z:")
+    assert zlib.decompress(base64.b64decode(stored[len(HEADER) + 2:])).decode() == "abc " * 100
+
+
+def test_column_round_trip(app):
+    from db import db
+    from models import Conversation, Message
+
+    conversation = Conversation(session_id="s", title="t")
+    db.session.add(conversation)
+    db.session.flush()
+    text = "Large message body. " * 100
+    db.session.add(Message(conversation_id=conversation.id, role="user", content=text))
+    db.session.commit()
+    stored = db.session.execute(db.text("SELECT content FROM message")).scalar()
+    assert is_compressed(stored)
+    db.session.expire_all()
+    assert Message.query.one().content == text
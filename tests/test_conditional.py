@@ -0,0 +1,68 @@
+# tests/test_conditional.py
+import gzip
+
+
+def chat(client, message):
+    response = client.post("/chat", json={"message": message})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def revalidate(client, url, etag, **headers):
+    return client.get(url, headers={"If-None-Match": etag, **headers})
+
+
+def test_conversation_list_revalidates_until_a_conversation_changes(client):
+    chat(client, "one")
+    first = client.get("/conversations")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+
+    cached = revalidate(client, "/conversations", etag)
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    # A new message bumps the conversation's version
+    chat(client, "two")
+    changed = revalidate(client, "/conversations", etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_conversation_page_revalidates_per_version_and_page(client):
+    conversation_id = chat(client, "one")["conversation_id"]
+    url = f"/conversations/{conversation_id}"
+    etag = client.get(url).headers["ETag"]
+    assert revalidate(client, url, etag).status_code == 304
+
+    # Another page size is another representation
+    assert revalidate(client, f"{url}?limit=1", etag).status_code == 200
+
+    chat(client, "two")
+    response = revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert len(response.get_json()["conversation_history"]) == 4
+
+
+def test_if_modified_since(client):
+    conversation_id = chat(client, "one")["conversation_id"]
+    url = f"/conversations/{conversation_id}"
+    last_modified = client.get(url).headers["Last-Modified"]
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+
+
+def test_compressed_etag_revalidates(client):
+    conversation_id = None
+    for i in range(10):
+        conversation_id = chat(client, f"message number {i} " + "padding " * 20)["conversation_id"]
+    url = f"/conversations/{conversation_id}"
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert gzip.decompress(response.data)
+
+    cached = revalidate(client, url, response.headers["ETag"], **{"Accept-Encoding": "gzip"})
+    assert cached.status_code == 304
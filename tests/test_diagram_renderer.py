@@ -0,0 +1,72 @@
+# tests/test_diagram_renderer.py
+import os
+import subprocess
+import threading
+
+from utils.diagram_renderer import DiagramRenderer
+
+
+class FakeDot:
+    """Stands in for subprocess.run(['dot', ...]): writes the source to the -o path."""
+
+    def __init__(self, error=None, gate=None):
+        self.error = error
+        self.gate = gate
+        self.calls = 0
+
+    def __call__(self, args, input, capture_output, timeout, check):
+        self.calls += 1
+        if self.gate:
+            self.gate.wait(timeout=5)
+        output = args[args.index('-o') + 1]
+        with open(output, 'wb') as f:
+            f.write(input)
+        if self.error:
+            raise self.error
+
+
+def test_render_writes_output_and_no_temporary_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(subprocess, "run", FakeDot())
+    target = str(tmp_path / "diagram.svg")
+    assert DiagramRenderer(max_workers=1, timeout=5).render("digraph {}", target) == target
+    assert os.listdir(tmp_path) == ["diagram.svg"]
+
+
+def test_concurrent_renders_of_one_output_share_a_process(tmp_path, monkeypatch):
+    gate = threading.Event()
+    dot = FakeDot(gate=gate)
+    monkeypatch.setattr(subprocess, "run", dot)
+    renderer = DiagramRenderer(max_workers=2, timeout=5)
+    target = str(tmp_path / "diagram.svg")
+
+    futures = [renderer.submit("digraph {}", target) for _ in range(3)]
+    assert futures[0] is futures[1] is futures[2]
+    gate.set()
+    assert futures[0].result(timeout=5) == target
+    assert dot.calls == 1
+    # Finished renders are forgotten, so a later request renders again
+    renderer.render("digraph {}", target)
+    assert dot.calls == 2
+
+
+def test_failures_return_none_and_leave_nothing_behind(tmp_path, monkeypatch):
+    renderer = DiagramRenderer(max_workers=1, timeout=5)
+    target = str(tmp_path / "diagram.svg")
+    for error in (subprocess.TimeoutExpired("dot", 5),
+                  subprocess.CalledProcessError(1, "dot", stderr=b"syntax error"),
+                  FileNotFoundError("dot")):
+        monkeypatch.setattr(subprocess, "run", FakeDot(error=error))
+        assert renderer.render("digraph {", target) is None
+        assert os.listdir(tmp_path) == []
+
+
+def test_render_stops_waiting_for_a_queued_render(tmp_path, monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(subprocess, "run", FakeDot(gate=gate))
+    renderer = DiagramRenderer(max_workers=1, timeout=5)
+    target = str(tmp_path / "diagram.svg")
+    future = renderer.submit("digraph {}", target)
+    assert renderer.render("digraph {}", target, wait=0.05) is None
+    gate.set()
+    # The render itself carries on in the background
+    assert future.result(timeout=5) == target
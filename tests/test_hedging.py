@@ -0,0 +1,135 @@
+# tests/test_hedging.py
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.hedging import HedgedChat, LatencyHistogram
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    """Waits `delay` seconds, then yields `parts`; close() stops it early."""
+
+    def __init__(self, delay, parts, error=None):
+        self.delay = delay
+        self.parts = parts
+        self.error = error
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        if self.closed.wait(self.delay):
+            return
+        if self.error:
+            raise self.error
+        for part in self.parts:
+            if self.closed.is_set():
+                return
+            yield chunk(part)
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeClient:
+    """Streaming OpenAI-shaped client; `plans` is a queue of (delay, parts, error) per call."""
+
+    def __init__(self, *plans):
+        self.plans = list(plans)
+        self.streams = []
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, stream, **kwargs):
+        assert stream
+        self.models.append(model)
+        delay, parts, error = self.plans.pop(0)
+        self.streams.append(FakeStream(delay, parts, error))
+        return self.streams[-1]
+
+
+@pytest.fixture
+def hedge_env(monkeypatch):
+    monkeypatch.delenv("LLM_HEDGE_FALLBACKS", raising=False)
+    monkeypatch.setenv("LLM_HEDGE_DELAY", "0.1")
+    monkeypatch.setenv("LLM_HEDGE_MIN_DELAY", "0.05")
+    monkeypatch.setenv("LLM_HEDGE_MIN_SAMPLES", "3")
+
+
+def ask(chat, model="gpt-4o"):
+    return chat.create([{"role": "user", "content": "hi"}], model=model, temperature=0)
+
+
+def test_fast_primary_is_not_hedged(hedge_env):
+    client = FakeClient((0, ["hel", "lo"], None))
+    assert ask(HedgedChat(client)) == "hello"
+    assert client.models == ["gpt-4o"]
+
+
+def test_slow_primary_is_hedged_on_the_same_model(hedge_env):
+    client = FakeClient((5, ["slow"], None), (0, ["fast"], None))
+    start = time.monotonic()
+    assert ask(HedgedChat(client)) == "fast"
+    assert time.monotonic() - start < 2
+    assert client.models == ["gpt-4o", "gpt-4o"]
+    assert client.streams[0].closed.is_set()
+
+
+def test_configured_fallback_model(hedge_env, monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_FALLBACKS", "gpt-4o=gpt-4o-mini, other=x")
+    chat = HedgedChat(FakeClient((5, ["slow"], None), (0, ["mini"], None)))
+    assert chat.fallbacks == {"gpt-4o": "gpt-4o-mini", "other": "x"}
+    assert ask(chat) == "mini"
+    assert chat.client.models == ["gpt-4o", "gpt-4o-mini"]
+
+
+def test_primary_can_still_win_after_hedging(hedge_env):
+    client = FakeClient((0.2, ["primary"], None), (5, ["hedge"], None))
+    assert ask(HedgedChat(client)) == "primary"
+    assert client.streams[1].closed.wait(timeout=1)
+
+
+def test_failed_primary_hedges_at_once(hedge_env, monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_DELAY", "5")
+    client = FakeClient((0, [], RuntimeError("down")), (0, ["ok"], None))
+    start = time.monotonic()
+    assert ask(HedgedChat(client)) == "ok"
+    assert time.monotonic() - start < 2
+
+
+def test_every_attempt_failing_raises_the_last_error(hedge_env):
+    client = FakeClient((0, [], RuntimeError("first")), (0, [], RuntimeError("second")))
+    with pytest.raises(RuntimeError, match="second"):
+        ask(HedgedChat(client))
+
+
+def test_timeout(hedge_env):
+    client = FakeClient((5, ["a"], None), (5, ["b"], None))
+    with pytest.raises(TimeoutError):
+        HedgedChat(client, timeout=0.3).create([], model="m", temperature=0)
+    assert all(stream.closed.is_set() for stream in client.streams)
+
+
+def test_hedge_delay_follows_recent_latency(hedge_env, monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_MAX_DELAY", "1")
+    chat = HedgedChat(FakeClient())
+    assert chat.hedge_delay("m") == 0.1  # Too few samples: LLM_HEDGE_DELAY
+    for seconds in (0.2, 0.3, 0.4):
+        chat.histogram("m").record(seconds)
+    assert chat.hedge_delay("m") == 0.4
+    chat.histogram("m").record(30)
+    assert chat.hedge_delay("m") == 1  # Clamped to LLM_HEDGE_MAX_DELAY
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram(window=4)
+    assert histogram.percentile(50) is None
+    for seconds in (9, 1, 2, 3, 4):  # The oldest sample falls out of the window
+        histogram.record(seconds)
+    assert len(histogram) == 4
+    assert histogram.percentile(50) == 3
+    assert histogram.percentile(100) == 4
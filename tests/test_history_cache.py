@@ -0,0 +1,93 @@
+# tests/test_history_cache.py
+import threading
+import time
+
+from utils.history_cache import ConversationHistoryCache
+from utils.persistence import WriteBehindQueue
+
+A = {"role": "user", "content": "a"}
+B = {"role": "assistant", "content": "b"}
+
+
+def test_get_serves_current_or_newer_versions():
+    cache = ConversationHistoryCache()
+    assert cache.get(1, 0) is None
+    cache.put(1, 3, [A])
+    assert cache.get(1, 3) == [A]
+    assert cache.get(1, 2) == [A]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_stale_entry_is_dropped():
+    cache = ConversationHistoryCache()
+    cache.put(1, 3, [A])
+    assert cache.get(1, 4) is None
+    # Dropped, so even the old version no longer hits
+    assert cache.get(1, 3) is None
+
+
+def test_get_returns_a_copy():
+    cache = ConversationHistoryCache()
+    cache.put(1, 0, [A])
+    cache.get(1, 0).append(B)
+    assert cache.get(1, 0) == [A]
+
+
+def test_append_on_matching_version():
+    cache = ConversationHistoryCache()
+    cache.put(1, 3, [A])
+    cache.append(1, 3, [B], 4)
+    assert cache.get(1, 4) == [A, B]
+
+
+def test_append_on_other_version_drops_entry():
+    cache = ConversationHistoryCache()
+    cache.put(1, 3, [A])
+    cache.append(1, 2, [B], 3)  # Another worker wrote in between
+    assert cache.get(1, 3) is None
+    cache.append(2, 0, [B], 1)  # Not cached: nothing to patch
+    assert cache.get(2, 1) is None
+
+
+def test_invalidate_and_lru_eviction():
+    cache = ConversationHistoryCache(max_conversations=2)
+    cache.put(1, 0, [A])
+    cache.put(2, 0, [A])
+    cache.get(1, 0)  # 2 is now least recently used
+    cache.put(3, 0, [A])
+    assert cache.get(2, 0) is None
+    assert cache.get(1, 0) == [A]
+    cache.invalidate(1)
+    assert cache.get(1, 0) is None
+
+
+def test_cache_version():
+    cache = ConversationHistoryCache()
+    assert cache.version(1) is None
+    cache.put(1, 3, [A])
+    assert cache.version(1) == 3
+
+
+def test_write_behind_turns_keep_queued_history(make_app, llm, monkeypatch):
+    # Hold every write-behind batch, so the database lags the conversation
+    release = threading.Event()
+    write_batch = WriteBehindQueue._write_batch
+    monkeypatch.setattr(WriteBehindQueue, "_write_batch",
+                        lambda self, batch: (release.wait(timeout=10), write_batch(self, batch)))
+    app = make_app(WRITE_BEHIND_MESSAGES="1")
+    client = app.test_client()
+
+    for message in ("one", "two", "three"):
+        assert client.post("/chat", json={"message": message}).status_code == 200
+
+    prompts = [[m["content"] for m in call["messages"][1:]] for call in llm.chat_calls()]
+    assert prompts[1] == ["one", "reply to one", "two"]
+    assert prompts[2] == ["one", "reply to one", "two", "reply to two", "three"]
+
+    release.set()
+    with app.app_context():
+        from models import Message
+        deadline = time.monotonic() + 10
+        while Message.query.count() < 6 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert Message.query.count() == 6
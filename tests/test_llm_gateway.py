@@ -0,0 +1,113 @@
+# tests/test_llm_gateway.py
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.llm_gateway import LLMGateway, RateLimitTimeout, TokenBucket, parse_rate_limits, retry_after_seconds
+
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class FakeClient:
+    """OpenAI-shaped client that raises the queued errors, then replies with the last message."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.sent.append(kwargs["messages"][-1]["content"])
+        if self.errors:
+            raise self.errors.pop(0)
+        return kwargs["messages"][-1]["content"]
+
+
+def request(content, **kwargs):
+    return {"model": "m", "messages": [{"role": "user", "content": content}], **kwargs}
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("gpt-4o=250:15000, dall-e-3=5,bad") == {
+        "gpt-4o": (250, 15000),
+        "dall-e-3": (5, None),
+    }
+    assert parse_rate_limits(None) == {}
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(APIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(APIError(429, {"retry-after": "3"})) == 3
+    assert retry_after_seconds(APIError(429)) is None
+    assert retry_after_seconds(ValueError()) is None
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(10, 5)
+    now = bucket.updated
+    assert bucket.wait_time(10, now) == 0
+    bucket.take(10, now)
+    assert bucket.wait_time(5, now) == pytest.approx(1.0)
+    assert bucket.wait_time(5, now + 1) == 0
+    # More than capacity waits for a full bucket, not forever
+    assert bucket.wait_time(50, now + 1) == pytest.approx(1.0)
+
+
+def test_server_errors_are_retried():
+    client = FakeClient([APIError(500), APIError(503)])
+    gateway = LLMGateway(client, limits={}, max_retries=3, backoff_base=0.001, backoff_cap=0.001)
+    assert gateway.chat.completions.create(**request("hi")) == "hi"
+    assert client.sent == ["hi"] * 3
+
+
+def test_client_errors_and_exhausted_retries_raise():
+    client = FakeClient([APIError(400)])
+    gateway = LLMGateway(client, limits={}, max_retries=3, backoff_base=0.001, backoff_cap=0.001)
+    with pytest.raises(APIError):
+        gateway.chat.completions.create(**request("bad"))
+    assert client.sent == ["bad"]
+
+    client = FakeClient([APIError(500)] * 3)
+    gateway = LLMGateway(client, limits={}, max_retries=2, backoff_base=0.001, backoff_cap=0.001)
+    with pytest.raises(APIError):
+        gateway.chat.completions.create(**request("down"))
+    assert len(client.sent) == 3
+
+
+def test_rate_limit_pauses_for_retry_after():
+    client = FakeClient([APIError(429, {"retry-after-ms": "200"})])
+    gateway = LLMGateway(client, limits={}, max_retries=1, backoff_base=0.001, backoff_cap=0.001)
+    start = time.monotonic()
+    assert gateway.chat.completions.create(**request("hi")) == "hi"
+    assert time.monotonic() - start >= 0.2
+
+
+def test_interactive_requests_jump_the_queue():
+    client = FakeClient()
+    # One request per 0.5s, with room for a single request at a time
+    gateway = LLMGateway(client, limits={"m": (120, None)}, burst_seconds=0.5)
+    gateway.chat.completions.create(**request("first"))
+
+    background = threading.Thread(
+        target=lambda: gateway.chat.completions.create(priority="background", **request("background"))
+    )
+    background.start()
+    time.sleep(0.1)  # Queued, waiting for the bucket to refill
+    assert gateway.queued() == 1
+    gateway.chat.completions.create(**request("interactive"))
+    background.join(timeout=5)
+    assert client.sent == ["first", "interactive", "background"]
+
+
+def test_queue_timeout():
+    gateway = LLMGateway(FakeClient(), limits={"m": (1, None)}, burst_seconds=1, queue_timeout=0.1)
+    gateway.chat.completions.create(**request("first"))
+    with pytest.raises(RateLimitTimeout):
+        gateway.chat.completions.create(**request("second"))
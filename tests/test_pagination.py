@@ -0,0 +1,54 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import db
+from models import Conversation, Message
+from utils.pagination import decode_cursor, encode_cursor, fetch_page
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(timestamp, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(None, 1)[:-3] + "!!!"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_fetch_page_walks_all_rows_newest_first(app):
+    conversation = Conversation(session_id="s", title="t")
+    db.session.add(conversation)
+    db.session.flush()
+    base = datetime(2024, 1, 1)
+    # Pairs share a timestamp, so pages must break ties on id
+    for i in range(7):
+        db.session.add(Message(conversation_id=conversation.id, role="user", content=str(i),
+                               timestamp=base + timedelta(seconds=i // 2)))
+    db.session.commit()
+
+    query = Message.query.filter_by(conversation_id=conversation.id)
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch_page(query, Message.timestamp, Message.id, 3, cursor)
+        seen.extend(row.content for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == [str(i) for i in reversed(range(7))]
+    assert pages == 3
+
+
+def test_fetch_page_without_more_rows_has_no_cursor(app):
+    conversation = Conversation(session_id="s", title="t")
+    db.session.add(conversation)
+    db.session.commit()
+    rows, cursor = fetch_page(Conversation.query, Conversation.timestamp, Conversation.id, 1)
+    assert [row.id for row in rows] == [conversation.id]
+    assert cursor is None
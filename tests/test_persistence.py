@@ -0,0 +1,106 @@
+# tests/test_persistence.py
+import pytest
+
+from db import db
+from models import Conversation, Message
+from utils.persistence import WriteBehindQueue, persist_messages
+from utils.search_index import ensure_search_index
+
+ONE = [{"role": "user", "content": "one"}]
+
+
+@pytest.fixture
+def conversation(app):
+    ensure_search_index()
+    conversation = Conversation(session_id="s", title="t")
+    db.session.add(conversation)
+    db.session.commit()
+    return conversation
+
+
+@pytest.fixture
+def queue(app):
+    queue = WriteBehindQueue(app, batch_size=50, max_retries=3)
+    yield queue
+    queue.shutdown(timeout=5)
+
+
+def test_persist_messages_stages_without_committing(conversation):
+    persist_messages(conversation.id, ONE + [{"role": "assistant", "content": "two"}])
+    db.session.flush()
+    assert Message.query.count() == 2
+    db.session.rollback()
+    assert Message.query.count() == 0
+    assert db.session.get(Conversation, conversation.id).version == 0
+
+
+def test_persist_messages_bumps_version(conversation):
+    persist_messages(conversation.id, ONE)
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Conversation, conversation.id).version == 1
+    assert db.session.get(Conversation, conversation.id).updated_at is not None
+
+
+def test_write_behind_commits_submitted_messages(app, conversation, queue):
+    for i in range(5):
+        queue.submit(conversation.id, [{"role": "user", "content": str(i)}])
+    assert queue.flush(timeout=5)
+    db.session.expire_all()
+    assert [m.content for m in Message.query.order_by(Message.id)] == ["0", "1", "2", "3", "4"]
+
+
+def test_failed_batches_are_retried(app, conversation, queue, monkeypatch):
+    monkeypatch.setattr("utils.persistence.time.sleep", lambda seconds: None)
+    failures = iter([RuntimeError("locked")])
+
+    def flaky(conversation_id, messages):
+        error = next(failures, None)
+        if error:
+            raise error
+        return persist_messages(conversation_id, messages)
+
+    monkeypatch.setattr("utils.persistence.persist_messages", flaky)
+    queue.submit(conversation.id, ONE)
+    assert queue.flush(timeout=5)
+    assert Message.query.count() == 1
+
+
+def test_give_up_callbacks_get_the_conversation(app, conversation, queue, monkeypatch):
+    monkeypatch.setattr("utils.persistence.time.sleep", lambda seconds: None)
+    monkeypatch.setattr("utils.persistence.persist_messages",
+                        lambda *args: (_ for _ in ()).throw(RuntimeError("down")))
+    gave_up = []
+    queue.on_give_up.append(gave_up.append)
+    queue.submit(conversation.id, ONE)
+    assert queue.flush(timeout=5)
+    assert gave_up == [conversation.id]
+
+
+def test_shutdown_flushes_and_refuses_new_work(app, conversation):
+    queue = WriteBehindQueue(app)
+    queue.submit(conversation.id, ONE)
+    queue.shutdown(timeout=5)
+    assert Message.query.count() == 1
+    with pytest.raises(RuntimeError):
+        queue.submit(conversation.id, ONE)
+
+
+def test_failed_turn_is_rolled_back(make_app, monkeypatch):
+    from cogs.chat import ChatCog
+
+    app = make_app()
+    client = app.test_client()
+    complete = ChatCog.complete
+    monkeypatch.setattr(ChatCog, "complete", lambda *args: (_ for _ in ()).throw(RuntimeError("model down")))
+    assert client.post("/chat", json={"message": "one"}).status_code == 500
+    with app.app_context():
+        # Not even the conversation the turn created is left behind
+        assert Conversation.query.count() == 0
+        assert Message.query.count() == 0
+
+    monkeypatch.setattr(ChatCog, "complete", complete)
+    data = client.post("/chat", json={"message": "two"}).get_json()
+    assert [m["content"] for m in data["conversation_history"]] == ["two", "reply to two"]
+    with app.app_context():
+        assert Conversation.query.count() == 1
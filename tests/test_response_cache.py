@@ -0,0 +1,92 @@
+# tests/test_response_cache.py
+import time
+
+from utils.response_cache import ResponseCache, cosine, embed, normalize_message, pinned_terms
+
+SYSTEM = {"role": "system", "content": "You are helpful."}
+
+
+def prompt(message, history=(), supplemental=None):
+    messages = [SYSTEM, *history]
+    if supplemental:
+        messages.append({"role": "system", "content": supplemental})
+    return messages + [{"role": "user", "content": message}]
+
+
+def test_normalized_repeats_hit():
+    cache = ResponseCache()
+    cache.put(prompt("What is a monad?"), "m", 0, "a burrito")
+    assert cache.get(prompt("  what is a   MONAD "), "m", 0) == "a burrito"
+    assert normalize_message("Ｈｉ!!") == "hi"
+
+
+def test_only_low_temperatures_are_cached():
+    cache = ResponseCache(max_temperature=0.3)
+    cache.put(prompt("hi"), "m", 0.7, "creative")
+    assert cache.get(prompt("hi"), "m", 0.7) is None
+    cache.put(prompt("hi"), "m", 0.2, "steady")
+    assert cache.get(prompt("hi"), "m", 0.7) is None
+    assert cache.get(prompt("hi"), "m", None) is None
+    assert cache.get(prompt("hi"), "m", 0.3) == "steady"
+
+
+def test_model_history_and_supplemental_content_are_part_of_the_key():
+    cache = ResponseCache()
+    cache.put(prompt("and then?"), "m", 0, "reply")
+    assert cache.get(prompt("and then?"), "other", 0) is None
+    assert cache.get(prompt("and then?", history=[{"role": "user", "content": "x"}]), "m", 0) is None
+    assert cache.get(prompt("and then?", supplemental="search results"), "m", 0) is None
+
+
+def test_near_duplicates_need_the_similarity_threshold():
+    question = "how do I reverse a list in python"
+    reworded = "how can I reverse a list in python"
+    score = cosine(embed(normalize_message(question)), embed(normalize_message(reworded)))
+    assert 0.5 < score < 1
+
+    strict = ResponseCache(similarity=score + 0.01)
+    strict.put(prompt(question), "m", 0, "reversed()")
+    assert strict.get(prompt(reworded), "m", 0) is None
+
+    loose = ResponseCache(similarity=score - 0.01)
+    loose.put(prompt(question), "m", 0, "reversed()")
+    assert loose.get(prompt(reworded), "m", 0) == "reversed()"
+    assert loose.get(prompt("what is the capital of france"), "m", 0) is None
+    # Same words in another context never match
+    assert loose.get(prompt(reworded, supplemental="docs"), "m", 0) is None
+
+
+def test_near_duplicates_must_agree_on_numbers_and_negations():
+    cache = ResponseCache(similarity=0.5)
+    cache.put(prompt("list the first 10 primes"), "m", 0, "2, 3, 5, ...")
+    assert cache.get(prompt("list the first 20 primes"), "m", 0) is None
+    cache.put(prompt("should I use a lock here"), "m", 0, "yes")
+    assert cache.get(prompt("should I not use a lock here"), "m", 0) is None
+    assert pinned_terms("don't use 2 locks") == {"don't", "2"}
+
+
+def test_near_duplicates_off_by_default(monkeypatch):
+    monkeypatch.delenv("RESPONSE_CACHE_SIMILARITY", raising=False)
+    cache = ResponseCache()
+    cache.put(prompt("how do I reverse a list in python"), "m", 0, "reversed()")
+    assert cache.get(prompt("how can I reverse a list in python"), "m", 0) is None
+
+
+def test_entries_expire():
+    cache = ResponseCache(ttl=0.05, similarity=0.5)
+    cache.put(prompt("hi there"), "m", 0, "hello")
+    time.sleep(0.1)
+    assert cache.get(prompt("hi there"), "m", 0) is None
+    assert cache.get(prompt("hi there friend"), "m", 0) is None
+    assert cache._by_context == {}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put(prompt("a"), "m", 0, "A")
+    cache.put(prompt("b"), "m", 0, "B")
+    cache.get(prompt("a"), "m", 0)  # b is now least recently used
+    cache.put(prompt("c"), "m", 0, "C")
+    assert cache.get(prompt("b"), "m", 0) is None
+    assert cache.get(prompt("a"), "m", 0) == "A"
+    assert cache.get(prompt("c"), "m", 0) == "C"
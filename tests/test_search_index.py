@@ -0,0 +1,75 @@
+# tests/test_search_index.py
+from sqlalchemy import text
+
+from db import db
+from models import Conversation, Message
+from utils.persistence import persist_messages
+from utils.search_index import SQLITE_TRIGGERS, ensure_search_index, search_messages
+
+
+def add_conversation(session_id, *contents):
+    conversation = Conversation(session_id=session_id, title=f"About {contents[0]}")
+    db.session.add(conversation)
+    db.session.flush()
+    rows = persist_messages(conversation.id, [{"role": "user", "content": c} for c in contents])
+    db.session.commit()
+    return conversation, rows
+
+
+def hits(session_id, query):
+    return [(hit["conversation_id"], hit["message_id"]) for hit in search_messages(session_id, query)]
+
+
+def test_search_is_scoped_to_the_session(app):
+    ensure_search_index()
+    mine, rows = add_conversation("me", "amphibious landing craft", "weather report")
+    add_conversation("you", "amphibious assault vehicle")
+    assert hits("me", "amphibious") == [(mine.id, rows[0].id)]
+    # The last term matches as a prefix
+    assert hits("me", "amphib") == [(mine.id, rows[0].id)]
+    result = search_messages("me", "landing")[0]
+    assert result["conversation_title"] == "About amphibious landing craft"
+    assert "**landing**" in result["snippet"]
+
+
+def test_deleted_messages_and_conversations_are_not_found(app):
+    ensure_search_index()
+    conversation, rows = add_conversation("me", "tactical vehicle", "tactical radio")
+    db.session.delete(rows[1])
+    db.session.commit()
+    assert hits("me", "tactical") == [(conversation.id, rows[0].id)]
+
+    Message.query.filter_by(conversation_id=conversation.id).delete()
+    db.session.delete(conversation)
+    db.session.commit()
+    assert hits("me", "tactical") == []
+    assert db.session.execute(text("SELECT count(*) FROM message_fts")).scalar() == 0
+
+
+def test_reused_message_ids_index_cleanly(app):
+    ensure_search_index()
+    conversation, rows = add_conversation("me", "first draft")
+    old_id = rows[0].id
+    db.session.delete(rows[0])
+    db.session.commit()
+
+    # SQLite hands the freed id to the next message
+    new = persist_messages(conversation.id, [{"role": "user", "content": "second draft"}])[0]
+    db.session.commit()
+    assert new.id == old_id
+    assert hits("me", "first") == []
+    assert hits("me", "second") == [(conversation.id, new.id)]
+
+
+def test_existing_index_gets_triggers_and_loses_stale_rows(app):
+    ensure_search_index()
+    _, rows = add_conversation("me", "stale text", "live text")
+    for name in SQLITE_TRIGGERS:
+        db.session.execute(text(f"DROP TRIGGER {name}"))
+    db.session.delete(rows[0])
+    db.session.commit()
+    assert db.session.execute(text("SELECT count(*) FROM message_fts")).scalar() == 2
+
+    ensure_search_index()
+    assert db.session.execute(text("SELECT count(*) FROM message_fts")).scalar() == 1
+    assert hits("me", "text") == [(rows[1].conversation_id, rows[1].id)]
@@ -0,0 +1,47 @@
+# tests/test_session_backend.py
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+
+from db import db
+from utils.session_backend import configure_sessions
+
+
+def chat(client, message):
+    response = client.post("/chat", json={"message": message})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize("backend", ["filesystem", "sqlalchemy", "cookie"])
+def test_conversation_survives_between_requests(make_app, backend):
+    app = make_app(SESSION_BACKEND=backend)
+    client = app.test_client()
+    first = chat(client, "one")
+    second = chat(client, "two")
+    assert second["conversation_id"] == first["conversation_id"]
+    assert second["message_count"] == 4
+
+    # Another browser gets its own session and conversation
+    assert chat(app.test_client(), "three")["conversation_id"] != first["conversation_id"]
+
+    if backend == "sqlalchemy":
+        # Flask-Session can define its table only once per process, so this is checked here
+        with app.app_context():
+            assert "sessions" in inspect(db.engine).get_table_names()
+            assert db.session.execute(db.text("SELECT count(*) FROM sessions")).scalar() == 2
+
+
+def test_cookie_sessions_need_no_server_store(make_app):
+    app = make_app(SESSION_BACKEND="cookie")
+    assert "SESSION_TYPE" not in app.config
+    assert app.config["SESSION_COOKIE_HTTPONLY"]
+
+
+def test_unknown_backend_falls_back_to_filesystem(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["SESSION_FILE_DIR"] = str(tmp_path / "flask_session")
+    db.init_app(app)
+    assert configure_sessions(app, db, backend="Redis") == "filesystem"
+    assert app.config["SESSION_TYPE"] == "filesystem"
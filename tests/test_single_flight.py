@@ -0,0 +1,77 @@
+# tests/test_single_flight.py
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def run_together(flight, key, fn, count):
+    """Start `count` callers of flight.do(key, fn); return their threads and results."""
+    results = []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_followers(started):
+    started.wait(timeout=5)
+    # The leader is blocked; give the other callers time to join its call
+    time.sleep(0.1)
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "result"
+
+    threads, results = run_together(flight, "k", work, 5)
+    wait_for_followers(started)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+    assert flight._calls == {}
+
+
+def test_error_reaches_every_caller():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("boom")
+
+    threads, results = run_together(flight, "k", work, 3)
+    wait_for_followers(started)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert [str(r) for r in results] == ["boom"] * 3
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight("test")
+    values = iter([1, 2])
+    assert flight.do("k", lambda: next(values)) == 1
+    assert flight.do("k", lambda: next(values)) == 2
+    with pytest.raises(ValueError):
+        flight.do("other", lambda: int("x"))
@@ -0,0 +1,112 @@
+# tests/test_speculation.py
+import threading
+
+import pytest
+
+from cogs.web_search import WebSearchCog
+from utils import metrics
+from utils.speculation import SpeculativeSearch, search_likelihood
+
+
+class FakeSearchCog:
+    """web_search that waits for `release`, honours cancellation and records its stats."""
+
+    def __init__(self, content="From https://example.mil: page", ok=True):
+        self.content = content
+        self.ok = ok
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = []
+
+    def web_search(self, query, history, cancel_event=None, stats=None):
+        self.calls.append(query)
+        stats["llm_calls"] = 1
+        self.release.wait(timeout=5)
+        if cancel_event.is_set():
+            return None
+        stats["search_calls"] = 1
+        if self.ok:
+            stats["ok"] = True
+        return self.content
+
+
+def counted(name):
+    return metrics.get(f"speculation.{name}")
+
+
+@pytest.mark.parametrize("message, likely", [
+    ("What is the latest news about Camp Lejeune?", True),
+    ("Summarize https://www.marines.mil/News/", True),
+    ("What is the weather today?", True),
+    ("hello there", False),
+    ("Explain your code base", False),
+    ("What is the latest in FILE:3?", False),
+    ("", False),
+])
+def test_search_likelihood(message, likely):
+    assert (search_likelihood(message) >= 0.4) == likely
+
+
+def test_unlikely_messages_start_nothing():
+    cog = FakeSearchCog()
+    speculation = SpeculativeSearch(cog, threshold=0.4)
+    assert speculation.start("hello there", []) is None
+    assert cog.calls == []
+
+
+def test_confirmed_search_uses_the_result():
+    speculation = SpeculativeSearch(FakeSearchCog(), threshold=0)
+    hits = counted("hit")
+    handle = speculation.start("latest news", [])
+    assert speculation.use(handle) == "From https://example.mil: page"
+    assert counted("hit") == hits + 1
+
+
+def test_failed_search_leaves_the_caller_to_search():
+    speculation = SpeculativeSearch(FakeSearchCog("An error occurred while performing the web search.", ok=False),
+                                    threshold=0)
+    assert speculation.use(speculation.start("latest news", [])) is None
+    assert speculation.use(None) is None
+
+
+def test_cancelled_search_stops_and_counts_wasted_calls():
+    cog = FakeSearchCog()
+    cog.release.clear()
+    speculation = SpeculativeSearch(cog, threshold=0)
+    wasted = metrics.get("speculation.wasted_llm_calls")
+    handle = speculation.start("latest news", [])
+    speculation.cancel(handle)
+    cog.release.set()
+    assert handle["future"].result(timeout=5) is None
+    assert metrics.get("speculation.wasted_llm_calls") == wasted + 1
+    assert "search_calls" not in handle["stats"]
+
+
+def test_busy_pool_skips_instead_of_queueing():
+    cog = FakeSearchCog()
+    cog.release.clear()
+    speculation = SpeculativeSearch(cog, max_workers=1, threshold=0)
+    first = speculation.start("one", [])
+    assert speculation.start("two", []) is None
+    cog.release.set()
+    first["future"].result(timeout=5)
+    assert cog.calls == ["one"]
+
+
+def test_chat_uses_the_speculative_search(make_app, llm, monkeypatch):
+    queries = []
+    monkeypatch.setattr(WebSearchCog, "web_search",
+                        lambda self, query, history, planned_queries=None, cancel_event=None, stats=None:
+                        queries.append(query) or stats.update(ok=True) or "From https://example.mil: page")
+    client = make_app(SPECULATIVE_SEARCH="1").test_client()
+
+    llm.routing = {"internet_search": True, "search_queries": ["news"]}
+    assert client.post("/chat", json={"message": "What is the latest news today?"}).status_code == 200
+    # Searched once, in the background, and not again once the route was known
+    assert queries == ["What is the latest news today?"]
+    assert "From https://example.mil: page" in llm.chat_calls()[0]["messages"][-2]["content"]
+
+    cancelled = counted("cancelled")
+    llm.routing = {"image_generation": False}
+    assert client.post("/chat", json={"message": "What is the latest news now?"}).status_code == 200
+    assert counted("cancelled") == cancelled + 1
@@ -0,0 +1,95 @@
+# tests/test_static_assets.py
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from utils.static_assets import init_static_assets, precompress_folder
+
+BUNDLE = b"console.log('hello');\n" * 200
+
+
+@pytest.fixture
+def build(tmp_path):
+    folder = tmp_path / "static"
+    (folder / "static" / "js").mkdir(parents=True)
+    (folder / "index.html").write_bytes(b"<!doctype html><div id=root></div>")
+    (folder / "favicon.ico").write_bytes(b"icon")
+    (folder / "static" / "js" / "main.f0348447.js").write_bytes(BUNDLE)
+    (folder / "asset-manifest.json").write_text(json.dumps({
+        "files": {"main.js": "/static/js/main.f0348447.js", "index.html": "/index.html"}
+    }))
+    return folder
+
+
+def make_client(folder):
+    app = Flask(__name__, static_folder=None)
+    assets = init_static_assets(app, str(folder))
+    return app, assets, app.test_client()
+
+
+def test_unknown_paths_fall_back_to_index(build):
+    _, _, client = make_client(build)
+    for path in ("/", "/conversations/3", "/../asset-manifest.json"):
+        response = client.get(path)
+        assert response.status_code == 200, path
+        assert b"id=root" in response.data
+        assert response.cache_control.no_cache
+        response.close()
+
+
+def test_hashed_assets_are_immutable(build):
+    _, _, client = make_client(build)
+    response = client.get("/static/js/main.f0348447.js")
+    assert response.data == BUNDLE
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 3600
+    response.close()
+
+    response = client.get("/favicon.ico")
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    response.close()
+
+
+def test_precompressed_variants_are_served_to_clients_that_accept_them(build):
+    assert precompress_folder(str(build)) >= 1
+    assert (build / "static" / "js" / "main.f0348447.js.gz").exists()
+    # Small files are not worth compressing
+    assert not (build / "favicon.ico.gz").exists()
+
+    _, _, client = make_client(build)
+    response = client.get("/static/js/main.f0348447.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == BUNDLE
+    response.close()
+
+    response = client.get("/static/js/main.f0348447.js")
+    assert "Content-Encoding" not in response.headers
+    assert response.data == BUNDLE
+    response.close()
+    # Variants are not listed as files of their own
+    assert client.get("/static/js/main.f0348447.js.gz").data.startswith(b"<!doctype")
+
+
+def test_precompress_skips_up_to_date_variants(build):
+    first = precompress_folder(str(build))
+    assert precompress_folder(str(build)) == 0
+    assert first >= 1
+
+
+def test_precompress_command(build):
+    app, _, _ = make_client(build)
+    result = app.test_cli_runner().invoke(args=["precompress-static", "--min-size", "10"])
+    assert result.exit_code == 0
+    assert "precompressed files" in result.output
+    assert (build / "static" / "js" / "main.f0348447.js.gz").exists()
+    # Gzip would make the tiny index.html bigger
+    assert not (build / "index.html.gz").exists()
+
+
+def test_missing_build(tmp_path):
+    _, _, client = make_client(tmp_path / "missing")
+    assert client.get("/").status_code == 404
@@ -0,0 +1,60 @@
+# tests/test_token_budget.py
+from utils.token_budget import MESSAGE_OVERHEAD_TOKENS, get_budget, plan_prompt
+
+
+def words(n, word="w"):
+    return " ".join([word] * n)
+
+
+def history(count, size):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": words(size, f"h{i}")}
+            for i in range(count)]
+
+
+SYSTEM = {"role": "system", "content": "You are helpful."}
+USER = {"role": "user", "content": "What changed?"}
+
+
+def test_everything_fits_unchanged():
+    conversation = history(4, 10)
+    supplemental = {"role": "system", "content": words(100)}
+    messages, breakdown = plan_prompt(SYSTEM, conversation, supplemental, USER, "gpt-4o-mini")
+    assert messages == [SYSTEM] + conversation + [supplemental, USER]
+    assert breakdown["truncated"] == []
+    assert breakdown["history_messages_dropped"] == 0
+    assert breakdown["history"] == 4 * (10 + MESSAGE_OVERHEAD_TOKENS)
+
+
+def test_supplemental_is_truncated_to_keep_the_history_share():
+    budget = get_budget("gpt-4")
+    conversation = history(10, 300)
+    supplemental = {"role": "system", "content": words(10000)}
+    messages, breakdown = plan_prompt(SYSTEM, conversation, supplemental, USER, "gpt-4")
+
+    assert "supplemental" in breakdown["truncated"]
+    assert breakdown["prompt_total"] <= budget["context"] - budget["response"]
+    # History keeps about its guaranteed share, newest messages first
+    assert budget["history"] - 304 < breakdown["history"] <= budget["history"]
+    kept = messages[1:-2]
+    assert kept == conversation[-len(kept):]
+    assert breakdown["history_messages_dropped"] == len(conversation) - len(kept)
+    assert messages[-2]["content"].endswith("[Truncated to fit the token budget.]")
+    assert messages[-1] == USER
+
+
+def test_history_uses_space_supplemental_leaves():
+    budget = get_budget("gpt-4")
+    conversation = history(10, 300)  # More than the history share alone
+    messages, breakdown = plan_prompt(SYSTEM, conversation, {}, USER, "gpt-4")
+    assert breakdown["history"] > budget["history"]
+    assert messages == [SYSTEM] + conversation + [USER]
+    assert breakdown["truncated"] == []
+
+
+def test_oversized_user_message_is_cut():
+    budget = get_budget("gpt-4")
+    user = {"role": "user", "content": words(20000)}
+    messages, breakdown = plan_prompt(SYSTEM, history(2, 10), {}, user, "gpt-4")
+    assert "user" in breakdown["truncated"]
+    assert breakdown["user"] <= (budget["context"] - budget["response"]) // 2
+    assert breakdown["prompt_total"] <= budget["context"] - budget["response"]
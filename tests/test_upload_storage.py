@@ -0,0 +1,95 @@
+# tests/test_upload_storage.py
+import os
+
+import pytest
+
+from db import db
+from models import UploadedFile
+from utils.upload_storage import UploadStorageManager
+
+
+@pytest.fixture
+def folder(tmp_path):
+    path = tmp_path / "uploads"
+    path.mkdir()
+    return path
+
+
+def write(folder, name, size, age=None):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if age is not None:
+        os.utime(path, (age, age))
+
+
+def reference(name):
+    db.session.add(UploadedFile(session_id="s", filename=name, original_filename=name,
+                                file_url=f"/uploads/{name}", file_type="txt"))
+    db.session.commit()
+
+
+def manager(app, folder, quota, **kwargs):
+    # No quota at construction, so no background thread races the test's evict()
+    storage = UploadStorageManager(app, str(folder), quota_bytes=0, orphan_grace_seconds=0, **kwargs)
+    storage.quota_bytes = quota
+    return storage
+
+
+def test_under_quota_evicts_nothing(app, folder):
+    write(folder, "a", 100)
+    storage = manager(app, folder, 1000)
+    assert storage.evict() == []
+    assert storage.total_bytes == 100
+
+
+def test_derived_then_orphans_least_recently_used_first(app, folder):
+    write(folder, "codebase_structure_1.png", 100, age=300)
+    write(folder, "orphan_old", 100, age=100)
+    write(folder, "orphan_new", 100, age=200)
+    write(folder, "kept", 100, age=50)
+    reference("kept")
+    storage = manager(app, folder, 300, low_watermark=0.5)
+
+    # 400 bytes, down to 150: the diagram goes first even though it is newest
+    assert storage.evict() == ["codebase_structure_1.png", "orphan_old", "orphan_new"]
+    assert sorted(os.listdir(folder)) == ["kept"]
+    assert storage.total_bytes == 100
+    assert not storage.quota_unmet
+
+
+def test_referenced_uploads_kept_unless_opted_in(app, folder):
+    write(folder, "a", 100, age=100)
+    write(folder, "b", 100, age=200)
+    reference("a")
+    reference("b")
+
+    storage = manager(app, folder, 150)
+    assert storage.evict() == []
+    assert storage.quota_unmet
+    assert UploadedFile.query.count() == 2
+
+    storage = manager(app, folder, 150, evict_referenced=True)
+    assert storage.evict() == ["a"]
+    assert [row.filename for row in UploadedFile.query] == ["b"]
+    assert os.listdir(folder) == ["b"]
+
+
+def test_recent_uploads_are_not_orphans(app, folder):
+    # Their UploadedFile row may not be committed yet
+    write(folder, "fresh", 100)
+    storage = UploadStorageManager(app, str(folder), quota_bytes=0, orphan_grace_seconds=3600)
+    storage.quota_bytes = 50
+    assert storage.evict() == []
+    assert storage.quota_unmet
+
+
+def test_record_tracks_new_files_without_rescanning(app, folder):
+    storage = manager(app, folder, 1000)
+    write(folder, "a", 100)
+    storage.record("a")
+    write(folder, "a", 300)
+    storage.record("a")
+    assert storage.total_bytes == 300
+    storage.record("missing")
+    assert storage.total_bytes == 300
@@ -0,0 +1,87 @@
+# tests/test_uploads.py
+import pytest
+
+from cogs.uploads import UploadsCog
+from db import db
+from models import UploadedFile
+
+
+@pytest.fixture
+def uploads(app, tmp_path):
+    folder = tmp_path / "uploads"
+    folder.mkdir()
+    (folder / "mine.txt").write_bytes(b"0123456789")
+    (folder / "theirs.txt").write_bytes(b"secret")
+    (folder / "codebase_structure_abc.svg").write_bytes(b"<svg/>")
+    (tmp_path / "outside.txt").write_bytes(b"outside")
+    for name, session_id in (("mine.txt", "me"), ("theirs.txt", "them")):
+        db.session.add(UploadedFile(session_id=session_id, filename=name, original_filename=name,
+                                    file_url=f"/uploads/{name}", file_type="txt"))
+    db.session.commit()
+
+    app.secret_key = "test"
+    cog = UploadsCog(str(folder))
+    app.register_blueprint(cog.bp)
+    return cog
+
+
+def client_for(app, session_id):
+    client = app.test_client()
+    if session_id:
+        with client.session_transaction() as session:
+            session["session_id"] = session_id
+    return client
+
+
+def test_files_are_served_only_to_their_session(app, uploads):
+    response = client_for(app, "me").get("/uploads/mine.txt")
+    assert response.status_code == 200
+    assert response.data == b"0123456789"
+    assert response.cache_control.private and response.cache_control.max_age == 3600
+    response.close()
+
+    assert client_for(app, "me").get("/uploads/theirs.txt").status_code == 404
+    assert client_for(app, None).get("/uploads/mine.txt").status_code == 403
+    assert client_for(app, "me").get("/uploads/missing.txt").status_code == 404
+
+
+def test_authorization_is_cached_and_forgotten(app, uploads):
+    assert client_for(app, "me").get("/uploads/mine.txt").status_code == 200
+    assert uploads.owners.get("mine.txt") == "me"
+    uploads.forget("mine.txt")
+    assert uploads.owners.get("mine.txt") is None
+
+
+def test_path_traversal_is_rejected(app, uploads):
+    client = client_for(app, "me")
+    for path in ("/uploads/../outside.txt", "/uploads/%2e%2e/outside.txt",
+                 "/uploads/sub/../mine.txt", "/uploads/..%2Foutside.txt"):
+        response = client.get(path)
+        assert response.status_code == 404, path
+        assert b"outside" not in response.data
+
+
+def test_diagrams_are_public(app, uploads):
+    response = client_for(app, None).get("/uploads/codebase_structure_abc.svg")
+    assert response.status_code == 200
+    assert response.cache_control.public and not response.cache_control.private
+    response.close()
+
+
+def test_range_and_etag(app, uploads):
+    client = client_for(app, "me")
+    response = client.get("/uploads/mine.txt", headers={"Range": "bytes=2-4"})
+    assert response.status_code == 206
+    assert response.data == b"234"
+    response.close()
+
+    etag = client.get("/uploads/mine.txt").headers["ETag"]
+    assert client.get("/uploads/mine.txt", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_accel_redirect(app, uploads):
+    uploads.accel_redirect_prefix = "/protected-uploads/"
+    response = client_for(app, "me").get("/uploads/mine.txt")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/protected-uploads/mine.txt"
+    assert response.data == b""
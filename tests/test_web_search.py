@@ -0,0 +1,87 @@
+# tests/test_web_search.py
+import threading
+
+import openai
+import pytest
+
+import cogs.web_search as web_search
+from cogs.orchestration_analysis import ORCHESTRATION_SCHEMA, OrchestrationAnalysisCog
+from cogs.web_search import WebSearchCog
+
+RESULTS = {"items": [{"link": "https://example.mil/a"}, {"link": "https://example.mil/b"}]}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Fake Custom Search: queries containing "nothing" find nothing. Returns the queries run."""
+    queries = []
+
+    def run_search(self, query):
+        queries.append(query)
+        return {"items": []} if "nothing" in query else RESULTS
+
+    monkeypatch.setattr(WebSearchCog, "run_search", run_search)
+    monkeypatch.setattr(web_search, "fetch_page_content", lambda url: f" page at {url}")
+    return queries
+
+
+def test_planned_queries_skip_the_search_terms_call(llm, searches):
+    cog = WebSearchCog(openai)
+    stats = {}
+    content = cog.web_search("latest news", [], planned_queries=["marine news 2026"], stats=stats)
+    assert content.startswith("From https://example.mil/a: page at")
+    assert searches == ["marine news 2026"]
+    assert llm.calls == []
+    assert stats == {"search_calls": 1, "page_fetches": 2, "ok": True}
+
+
+def test_planned_fallbacks_are_tried_in_order(llm, searches):
+    cog = WebSearchCog(openai)
+    cog.web_search("q", [], planned_queries=["nothing specific", " ", "nothing either", "broad"])
+    assert searches == ["nothing specific", "nothing either", "broad"]
+    assert llm.calls == []
+
+
+def test_without_planned_queries_terms_are_generated(llm, searches):
+    stats = {}
+    WebSearchCog(openai).web_search("what happened", [], stats=stats)
+    assert searches == ["reply to User Input: what happened"]
+    assert stats["llm_calls"] == 1
+
+
+def test_cancelled_search_stops_before_searching(llm, searches):
+    cancel = threading.Event()
+    cancel.set()
+    assert WebSearchCog(openai).web_search("q", [], planned_queries=["a"], cancel_event=cancel) is None
+    assert searches == []
+
+
+def test_routing_call_plans_the_queries(app, llm):
+    llm.routing = {"internet_search": True, "search_queries": ["a", "b"]}
+    orchestration = OrchestrationAnalysisCog(openai).analyze_user_orchestration("news?", [], "s")
+    assert orchestration["search_queries"] == ["a", "b"]
+    schema = llm.calls[0]["response_format"]["json_schema"]
+    assert schema is ORCHESTRATION_SCHEMA
+    assert "search_queries" in schema["schema"]["required"]
+
+
+def test_failed_routing_call_defaults_to_no_search(app):
+    class Broken:
+        class chat:
+            class completions:
+                @staticmethod
+                def create(**kwargs):
+                    raise RuntimeError("down")
+
+    orchestration = OrchestrationAnalysisCog(Broken).analyze_user_orchestration("news?", [], "s")
+    assert orchestration["internet_search"] is False
+    assert orchestration["search_queries"] == []
+
+
+def test_chat_turn_searches_with_the_routing_queries(client, llm, searches):
+    llm.routing = {"internet_search": True, "search_queries": ["marine news 2026"]}
+    assert client.post("/chat", json={"message": "latest marine news?"}).status_code == 200
+    assert searches == ["marine news 2026"]
+    # One routing call and the reply: no separate search-terms call
+    assert len(llm.calls) == 2
+    assert "page at https://example.mil/a" in llm.chat_calls()[0]["messages"][-2]["content"]
@@ -0,0 +1,168 @@
+# utils/archive.py
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from db import db
+from models import Conversation, Message
+from utils.search_index import index_rows
+
+EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 1000
+
+
+class RejectedRows(ValueError):
+    """The database refused a batch of imported rows."""
+
+
+def export_session(session_id):
+    """
+    Yield a session's conversations and messages as NDJSON lines.
+
+    All conversation records come first, then every message in conversation
+    and time order. Rows are streamed with yield_per, so memory use does not
+    depend on how many messages the session has.
+    """
+    conversations = (
+        db.session.query(Conversation.id, Conversation.title, Conversation.timestamp)
+        .filter(Conversation.session_id == session_id)
+        .order_by(Conversation.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for convo in conversations:
+        yield json.dumps({
+            "type": "conversation",
+            "id": convo.id,
+            "title": convo.title,
+            "timestamp": convo.timestamp.isoformat() if convo.timestamp else None
+        }) + "\n"
+
+    messages = (
+        db.session.query(Message.conversation_id, Message.role, Message.content, Message.timestamp)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .filter(Conversation.session_id == session_id)
+        .order_by(Message.conversation_id, Message.timestamp, Message.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for msg in messages:
+        yield json.dumps({
+            "type": "message",
+            "conversation_id": msg.conversation_id,
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.timestamp.isoformat() if msg.timestamp else None
+        }) + "\n"
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+
+def import_ndjson(lines, session_id):
+    """
+    Import NDJSON produced by export_session into the given session.
+
+    Conversations get new ids; messages are remapped onto them. Rows are
+    bulk-inserted in batches within the caller's transaction, and the
+    caller commits.
+
+    :param lines: Iterable of NDJSON lines (str or bytes).
+    :param session_id: Session the imported conversations will belong to.
+    :return: Dict with the number of conversations and messages imported.
+    :raises ValueError: On a malformed line, an unknown conversation reference,
+        or rows the database rejects (naming the lines of the failed batch).
+    """
+    id_map = {}
+    pending_conversations = []
+    pending_messages = []
+    pending_lines = {"conversations": [], "messages": []}
+    counts = {"conversations": 0, "messages": 0}
+
+    def rejected(kind, error):
+        # Rows go in by batch, so the bad one is somewhere in the batch's lines
+        lines = pending_lines[kind]
+        where = f"Line {lines[0]}" if len(lines) == 1 else f"Lines {lines[0]}-{lines[-1]}"
+        return RejectedRows(f"{where}: rejected by the database: {getattr(error, 'orig', None) or error}")
+
+    def flush_conversations():
+        if not pending_conversations:
+            return
+        now = datetime.utcnow()
+        try:
+            result = db.session.execute(
+                insert(Conversation).returning(Conversation.id, sort_by_parameter_order=True),
+                [{
+                    "session_id": session_id,
+                    "title": convo["title"],
+                    "timestamp": convo["timestamp"],
+                    "version": 0,
+                    "updated_at": now
+                } for convo in pending_conversations]
+            )
+            new_ids = result.scalars().all()
+        except SQLAlchemyError as e:
+            raise rejected("conversations", e) from e
+        for convo, new_id in zip(pending_conversations, new_ids):
+            id_map[convo["old_id"]] = new_id
+        counts["conversations"] += len(pending_conversations)
+        pending_conversations.clear()
+        pending_lines["conversations"].clear()
+
+    def flush_messages():
+        if not pending_messages:
+            return
+        try:
+            result = db.session.execute(
+                insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                pending_messages
+            )
+            index_rows([
+                {"message_id": new_id, "conversation_id": msg["conversation_id"], "content": msg["content"]}
+                for msg, new_id in zip(pending_messages, result.scalars())
+            ])
+        except SQLAlchemyError as e:
+            raise rejected("messages", e) from e
+        counts["messages"] += len(pending_messages)
+        pending_messages.clear()
+        pending_lines["messages"].clear()
+
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if record["type"] == "conversation":
+                pending_conversations.append({
+                    "old_id": record["id"],
+                    "title": record.get("title") or "Imported Conversation",
+                    "timestamp": _parse_timestamp(record.get("timestamp"))
+                })
+                pending_lines["conversations"].append(line_number)
+                if len(pending_conversations) >= IMPORT_BATCH_SIZE:
+                    flush_conversations()
+            elif record["type"] == "message":
+                # Messages refer to conversations, which must be inserted first
+                flush_conversations()
+                if record["conversation_id"] not in id_map:
+                    raise ValueError(f"unknown conversation {record['conversation_id']}")
+                pending_messages.append({
+                    "conversation_id": id_map[record["conversation_id"]],
+                    "role": record["role"],
+                    "content": record["content"],
+                    "timestamp": _parse_timestamp(record.get("timestamp"))
+                })
+                pending_lines["messages"].append(line_number)
+                if len(pending_messages) >= IMPORT_BATCH_SIZE:
+                    flush_messages()
+            else:
+                raise ValueError(f"unknown record type {record['type']!r}")
+        except RejectedRows:
+            raise
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Line {line_number}: {e}") from e
+
+    flush_conversations()
+    flush_messages()
+    return counts
@@ -0,0 +1,243 @@
+# utils/code_index.py
+import ast
+import math
+import os
+import re
+import textwrap
+import threading
+from collections import Counter
+from utils.token_budget import count_tokens
+
+# Words that say nothing about which part of the code a question is about
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'code', 'codebase', 'do', 'does',
+    'explain', 'for', 'from', 'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or',
+    'please', 'self', 'show', 'tell', 'that', 'the', 'this', 'to', 'what', 'when', 'where',
+    'which', 'why', 'with', 'work', 'works', 'you', 'your'
+}
+# Top-level and component-level declarations in the React frontend
+JSX_SYMBOL = re.compile(
+    r'^(?P<indent>\s{0,2})(?:export\s+)?(?:'
+    r'function\s+(?P<func>[A-Za-z_$][\w$]*)\s*\('
+    r'|const\s+(?P<const>[A-Za-z_$][\w$]*)\s*=\s*(?:memo\()?(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>'
+    r')',
+    re.MULTILINE
+)
+JSX_MAX_LINES = 120
+
+
+def split_identifier(text):
+    """Lower-case word tokens, splitting snake_case and camelCase identifiers."""
+    words = re.findall(r'[A-Z]+(?![a-z])|[A-Za-z][a-z]*|\d+', text.replace('_', ' '))
+    return [w.lower() for w in words if len(w) > 1]
+
+
+def stem(word):
+    """Very small suffix stripper so "uploaded", "uploads" and "upload" match."""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def terms_of(text):
+    return [stem(word) for word in split_identifier(text or '') if word not in STOPWORDS]
+
+
+class CodeIndex:
+    """
+    Symbol-level index of the project's source code.
+
+    Python modules are parsed with `ast` into classes, methods and functions
+    with their signatures and docstrings; the React ChatApp.jsx is split into
+    its components and handlers with a regex. Parsed files are cached by
+    mtime and size, so only changed files are parsed again.
+    """
+
+    def __init__(self, base_dir, allowed_dirs=('cogs', 'utils'),
+                 extra_files=('my-chat-frontend/src/ChatApp.jsx',)):
+        self.base_dir = base_dir
+        self.allowed_dirs = allowed_dirs
+        self.extra_files = extra_files
+        self._files = {}  # path -> (mtime_ns, size, symbols)
+        self._lock = threading.Lock()
+        self.parses = 0
+
+    def source_files(self):
+        paths = []
+        for directory in ('',) + tuple(self.allowed_dirs):
+            dir_path = os.path.join(self.base_dir, directory)
+            try:
+                with os.scandir(dir_path) as entries:
+                    paths.extend(e.path for e in entries if e.name.endswith('.py') and e.is_file())
+            except OSError:
+                continue
+        paths.extend(os.path.join(self.base_dir, f) for f in self.extra_files)
+        return sorted(paths)
+
+    def symbols(self):
+        """All symbols, reparsing only files whose mtime or size changed."""
+        result = []
+        with self._lock:
+            seen = set()
+            for path in self.source_files():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+                cached = self._files.get(path)
+                if not cached or cached[0] != st.st_mtime_ns or cached[1] != st.st_size:
+                    cached = (st.st_mtime_ns, st.st_size, self._parse(path))
+                    self._files[path] = cached
+                    self.parses += 1
+                result.extend(cached[2])
+            for path in set(self._files) - seen:
+                del self._files[path]
+        return result
+
+    def _parse(self, path):
+        rel_path = os.path.relpath(path, self.base_dir)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            return []
+        if path.endswith('.py'):
+            return self._parse_python(rel_path, source)
+        return self._parse_jsx(rel_path, source)
+
+    def _symbol(self, rel_path, name, kind, signature, doc, source):
+        terms = Counter()
+        for term in terms_of(name):
+            terms[term] += 3
+        for term in terms_of(rel_path):
+            terms[term] += 2
+        for term in terms_of(doc):
+            terms[term] += 1
+        for term in terms_of(source):
+            terms[term] += 0.25
+        return {
+            "file": rel_path,
+            "name": name,
+            "kind": kind,
+            "signature": signature,
+            "doc": (doc or '').strip().split('\n')[0],
+            "source": source,
+            "terms": terms,
+        }
+
+    def _parse_python(self, rel_path, source):
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            print(f"Could not parse {rel_path}: {e}")
+            return []
+        lines = source.splitlines()
+        symbols = []
+
+        def signature(node):
+            return lines[node.lineno - 1].strip().rstrip(':')
+
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append(self._symbol(
+                    rel_path, node.name, "function", signature(node),
+                    ast.get_docstring(node), ast.get_source_segment(source, node) or ''
+                ))
+            elif isinstance(node, ast.ClassDef):
+                methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+                # The class itself: header, docstring and method signatures, not the bodies
+                outline = "\n".join([signature(node) + ":"] + [f"    {signature(m)}: ..." for m in methods])
+                symbols.append(self._symbol(
+                    rel_path, node.name, "class", signature(node), ast.get_docstring(node), outline
+                ))
+                for method in methods:
+                    # Cogs define their Flask views inside add_routes; each view is its own symbol
+                    views = [n for n in method.body
+                             if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.decorator_list]
+                    view_signatures = []
+                    for view in views:
+                        start = view.decorator_list[0].lineno
+                        view_signature = " ".join(l.strip() for l in lines[start - 1:view.lineno]).rstrip(':')
+                        view_signatures.append(view_signature)
+                        symbols.append(self._symbol(
+                            rel_path, f"{node.name}.{view.name}", "route", view_signature,
+                            ast.get_docstring(view),
+                            textwrap.dedent("\n".join(lines[start - 1:view.end_lineno]))
+                        ))
+                    method_source = (
+                        "\n".join([signature(method) + ":"] + [f"    {v}: ..." for v in view_signatures])
+                        if views else ast.get_source_segment(source, method) or ''
+                    )
+                    symbols.append(self._symbol(
+                        rel_path, f"{node.name}.{method.name}", "method", signature(method),
+                        ast.get_docstring(method), method_source
+                    ))
+        return symbols
+
+    def _parse_jsx(self, rel_path, source):
+        lines = source.splitlines()
+        matches = list(JSX_SYMBOL.finditer(source))
+        symbols = []
+        for i, match in enumerate(matches):
+            start = source.count('\n', 0, match.start())
+            end = source.count('\n', 0, matches[i + 1].start()) if i + 1 < len(matches) else len(lines)
+            end = min(end, start + JSX_MAX_LINES)
+            name = match.group('func') or match.group('const')
+            symbols.append(self._symbol(
+                rel_path, name, "component" if name[0].isupper() else "function",
+                lines[start].strip(), None, "\n".join(lines[start:end]).rstrip()
+            ))
+        return symbols
+
+    def relevant_symbols(self, question, limit=8, max_tokens=6000):
+        """
+        Rank symbols by how well they match the question.
+
+        Scoring is TF-IDF over identifier words, weighting symbol names over
+        file paths, docstrings and body identifiers.
+
+        :param question: The user's question.
+        :param limit: Maximum number of symbols to return.
+        :param max_tokens: Token budget for the returned symbols' source.
+        :return: List of symbol dicts, best match first.
+        """
+        symbols = self.symbols()
+        terms = terms_of(question)
+        if not symbols or not terms:
+            return []
+        document_frequency = Counter()
+        for symbol in symbols:
+            document_frequency.update(set(symbol["terms"]))
+        idf = {t: math.log(1 + len(symbols) / (1 + document_frequency[t])) for t in set(terms)}
+
+        scored = []
+        for symbol in symbols:
+            score = sum(math.log(1 + symbol["terms"][t]) * idf[t] for t in terms if t in symbol["terms"])
+            if score > 0:
+                scored.append((score, symbol))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        chosen, used = [], 0
+        for _, symbol in scored:
+            tokens = count_tokens(symbol["source"])
+            if used + tokens > max_tokens:
+                continue
+            chosen.append(symbol)
+            used += tokens
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+    def outline(self):
+        """One line per file listing its top-level symbols, for orientation."""
+        by_file = {}
+        for symbol in self.symbols():
+            if symbol["kind"] != "method":
+                by_file.setdefault(symbol["file"], []).append(symbol["name"])
+        return "\n".join(f"{path}: {', '.join(names)}" for path, names in by_file.items())
@@ -0,0 +1,103 @@
+# utils/compressed_text.py
+import base64
+import os
+import zlib
+from sqlalchemy.types import Text, TypeDecorator
+
+try:
+    import zstandard  # Optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+# Corrupt payloads raise one of these; they are logged and the value returned as stored
+DECODE_ERRORS = (ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+# Stored values look like "\x1bZ" + codec + ":" + base64(payload). Plain text
+# never starts with an escape character, so old rows read back unchanged.
+HEADER = "\x1bZ"
+CODECS = {"zlib": "z", "zstd": "s"}
+
+settings = {
+    # Codec for new writes: "zlib", "zstd", or "" to store plain text
+    "codec": os.getenv("MESSAGE_COMPRESSION", "").lower(),
+    # Only values at least this many UTF-8 bytes long are compressed
+    "threshold": int(os.getenv("MESSAGE_COMPRESSION_THRESHOLD", 1024)),
+    "zlib_level": 6,
+    "zstd_level": 3,
+}
+
+
+def configure(**overrides):
+    """Change compression settings at runtime (e.g. from a migration or benchmark)."""
+    settings.update(overrides)
+
+
+def _active_codec():
+    codec = settings["codec"]
+    if codec == "zstd" and zstandard is None:
+        print("zstandard is not installed; falling back to zlib compression")
+        settings["codec"] = codec = "zlib"
+    return codec if codec in CODECS else None
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(HEADER)
+
+
+def compress_text(value, codec=None):
+    """Compress a string if compression is enabled and the value is large enough."""
+    codec = codec or _active_codec()
+    if value is None or not codec or is_compressed(value):
+        return value
+    raw = value.encode("utf-8")
+    if len(raw) < settings["threshold"]:
+        return value
+    if codec == "zstd":
+        payload = zstandard.ZstdCompressor(level=settings["zstd_level"]).compress(raw)
+    else:
+        payload = zlib.compress(raw, settings["zlib_level"])
+    encoded = f"{HEADER}{CODECS[codec]}:{base64.b64encode(payload).decode('ascii')}"
+    # Base64 adds a third; keep the original when compression doesn't pay for
+    # that. Compare stored UTF-8 bytes, not characters, for non-ASCII text.
+    return encoded if len(encoded.encode("utf-8")) < len(value.encode("utf-8")) else value
+
+
+def decompress_text(value):
+    """
+    Return the original string for a value written by compress_text.
+
+    :raises RuntimeError: If the value is zstd-compressed and zstandard is not installed.
+    """
+    if not is_compressed(value):
+        return value
+    codec = value[len(HEADER):len(HEADER) + 1]
+    if codec == CODECS["zstd"] and zstandard is None:
+        raise RuntimeError("This value was stored with zstd compression; "
+                           "install zstandard (pip install zstandard) to read it")
+    try:
+        payload = base64.b64decode(value[len(HEADER) + 2:])
+        if codec == CODECS["zstd"]:
+            return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+        if codec == CODECS["zlib"]:
+            return zlib.decompress(payload).decode("utf-8")
+        raise ValueError(f"unknown codec {codec!r}")
+    except DECODE_ERRORS as e:
+        print(f"Could not decompress stored text, returning it as-is: {e}")
+        return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column that transparently compresses large values.
+
+    Compression is opt-in via MESSAGE_COMPRESSION; reads always decompress,
+    so turning it off later leaves existing rows readable.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
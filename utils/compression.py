@@ -0,0 +1,69 @@
+# utils/compression.py
+import gzip
+from flask import request
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json'}
+
+
+def choose_encoding():
+    """Pick the best response encoding the client accepts, or None."""
+    accepted = request.accept_encodings
+    if brotli and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(body, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+def init_compression(app):
+    """
+    Compress JSON API responses with brotli or gzip.
+
+    Streamed responses, file responses and small bodies are left alone.
+    Tunable with COMPRESS_MIN_SIZE, COMPRESS_GZIP_LEVEL and COMPRESS_BROTLI_QUALITY.
+    """
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not 200 <= response.status_code < 300
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = choose_encoding()
+        if not encoding:
+            return response
+
+        response.set_data(compress_body(
+            body, encoding,
+            gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+            brotli_quality=app.config['COMPRESS_BROTLI_QUALITY']
+        ))
+        response.headers['Content-Encoding'] = encoding
+        # A compressed body is a different representation, so it needs its own ETag
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
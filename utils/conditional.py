@@ -0,0 +1,35 @@
+# utils/conditional.py
+from flask import request, Response
+
+ENCODING_SUFFIXES = ('', '-gzip', '-br')
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Return a 304 response if the client's cached copy is still current, else None.
+
+    Call this before loading anything expensive: the validators should come
+    from cheap metadata such as a version column.
+    """
+    if request.if_none_match:
+        # Compressed responses carry the encoding in their ETag (see utils.compression)
+        if any(request.if_none_match.contains_weak(etag + suffix) for suffix in ENCODING_SUFFIXES):
+            return _not_modified_response(etag, last_modified)
+        return None
+    if last_modified and request.if_modified_since:
+        if last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None):
+            return _not_modified_response(etag, last_modified)
+    return None
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and require revalidation on every use."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _not_modified_response(etag, last_modified):
+    return with_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,56 @@
+# utils/db_tuning.py
+import os
+from sqlalchemy import event
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def engine_options(uri):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    Postgres gets an explicit connection pool (DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE) with pre-ping so connections the server
+    dropped are replaced instead of failing a request. SQLite gets a driver
+    level busy timeout; its pragmas are applied per connection by
+    apply_sqlite_pragmas.
+    """
+    if uri.startswith("sqlite"):
+        return {"connect_args": {"timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}}
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+
+def apply_sqlite_pragmas(engine, wal=None):
+    """
+    Configure every new SQLite connection for concurrent workers: WAL lets
+    readers run alongside the single writer, synchronous=NORMAL skips the
+    fsync on every commit (still safe in WAL mode), and busy_timeout makes
+    writers wait for the lock instead of failing with "database is locked".
+
+    Does nothing for other databases. WAL can be disabled with SQLITE_WAL=0.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    if wal is None:
+        wal = os.getenv("SQLITE_WAL", "1").lower() not in ("0", "false", "no")
+    busy_timeout_ms = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
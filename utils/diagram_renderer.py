@@ -0,0 +1,97 @@
+# utils/diagram_renderer.py
+import os
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class DiagramRenderer:
+    """
+    Render Graphviz sources with the `dot` executable outside the request.
+
+    At most `max_workers` dot processes run at once; further renders queue.
+    Each process is killed after `timeout` seconds. Concurrent requests for
+    the same output share one render instead of starting their own, and
+    output is written to a temporary file and renamed into place, so a
+    partially written diagram is never served.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        self.max_workers = max_workers or int(os.getenv('DIAGRAM_RENDER_WORKERS', 2))
+        self.timeout = timeout or float(os.getenv('DIAGRAM_RENDER_TIMEOUT', 30))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="diagram-render")
+        self._pending = {}  # output_path -> Future
+        self._lock = threading.Lock()
+
+    def _render(self, source, output_path, fmt):
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            subprocess.run(
+                ['dot', f'-T{fmt}', '-o', tmp_path],
+                input=source.encode('utf-8'),
+                capture_output=True,
+                timeout=self.timeout,
+                check=True
+            )
+            os.replace(tmp_path, output_path)
+            return output_path
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"dot timed out after {self.timeout:.0f}s")
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"dot failed: {e.stderr.decode('utf-8', 'replace').strip()}")
+        except FileNotFoundError:
+            raise RuntimeError("Graphviz `dot` executable not found on PATH")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def submit(self, source, output_path, fmt='svg'):
+        """Start rendering, or join a render of the same output already in progress."""
+        with self._lock:
+            future = self._pending.get(output_path)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._render, source, output_path, fmt)
+            self._pending[output_path] = future
+        # Outside the lock: a render that already finished runs the callback right here
+        future.add_done_callback(lambda done: self._forget(output_path, done))
+        return future
+
+    def _forget(self, output_path, future):
+        with self._lock:
+            if self._pending.get(output_path) is future:
+                del self._pending[output_path]
+
+    def render(self, source, output_path, fmt='svg', wait=None):
+        """
+        Render and wait for the result.
+
+        :param source: Graphviz DOT source.
+        :param output_path: Where the rendered file should end up.
+        :param fmt: dot output format, e.g. "svg" or "png".
+        :param wait: Seconds to wait, including time queued behind other renders.
+            Defaults to twice the render timeout.
+        :return: output_path on success, None if rendering failed or is still queued.
+        """
+        future = self.submit(source, output_path, fmt)
+        try:
+            return future.result(timeout=wait if wait is not None else self.timeout * 2)
+        except FutureTimeoutError:
+            print(f"Diagram render for {output_path} is still queued or running")
+        except RuntimeError as e:
+            print(f"Error rendering diagram: {e}")
+        return None
+
+
+_default_renderer = None
+_default_lock = threading.Lock()
+
+
+def get_renderer():
+    """Process-wide renderer, created on first use."""
+    global _default_renderer
+    with _default_lock:
+        if _default_renderer is None:
+            _default_renderer = DiagramRenderer()
+        return _default_renderer
@@ -5,8 +5,21 @@ from io import BytesIO
 from PyPDF2 import PdfReader, PdfWriter
 from pdf2image import convert_from_bytes
 import pytesseract
+from urllib.parse import urlsplit, urlunsplit
+from utils.single_flight import SingleFlight
+
+# Users asking the same thing at once get their pages from one fetch
+_page_fetches = SingleFlight("page_fetch")
+
 
 def fetch_page_content(url):
+    """Fetch and extract text content from a webpage or PDF, sharing a fetch of the same URL already in flight."""
+    parts = urlsplit(url.strip())
+    key = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+    return _page_fetches.do(key, lambda: _fetch_page_content(url))
+
+
+def _fetch_page_content(url):
     """Fetch and extract text content from a webpage or PDF."""
     try:
         response = requests.get(url, timeout=10)
@@ -42,7 +42,7 @@ def process_uploaded_file(file=None, upload_folder=None, session_id=None, db_ses
         file_type=file.content_type
     )
     db_session.session.add(uploaded_file)
-    db_session.session.commit()
+    db_session.session.flush()  # Assigns the id; the caller commits the turn
 
     if file.content_type == 'application/pdf':
         file_content = extract_text_from_pdf(file_path)
@@ -0,0 +1,205 @@
+# utils/hedging.py
+import os
+import threading
+import time
+from collections import deque
+from utils import metrics
+
+# Model the hedge request goes to when the primary is slow. Empty by default,
+# so a slow request is retried on the same model and a hedge never costs more
+# per token than the primary; set e.g. LLM_HEDGE_FALLBACKS="gpt-4o=gpt-4o-mini".
+DEFAULT_FALLBACKS = {}
+
+
+class LatencyHistogram:
+    """Time-to-first-token samples for one model, over its most recent `window` requests."""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        """The q-th percentile (0-100) in seconds, or None with no samples."""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class _Attempt:
+    def __init__(self, model):
+        self.model = model
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.parts = []
+        self.error = None
+        self.stream = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+
+class HedgedChat:
+    """
+    Chat completions that hedge against a slow primary model.
+
+    The primary request is streamed. If it has not produced its first token
+    within the hedge delay, or fails before then, the same request goes to
+    the fallback model (LLM_HEDGE_FALLBACKS; the primary model itself when
+    none is configured). Whichever streams a token first wins. The other is
+    cancelled by closing its stream, which stops generation on OpenAI's side.
+
+    The hedge delay is a percentile (LLM_HEDGE_PERCENTILE, default 95) of
+    the model's recent time-to-first-token. Until LLM_HEDGE_MIN_SAMPLES
+    requests have been seen, LLM_HEDGE_DELAY is used instead. Either way it
+    is clamped to LLM_HEDGE_MIN_DELAY..LLM_HEDGE_MAX_DELAY.
+    """
+
+    def __init__(self, client, fallbacks=None, percentile=None, timeout=None):
+        self.client = client
+        self.fallbacks = dict(DEFAULT_FALLBACKS)
+        for item in os.getenv('LLM_HEDGE_FALLBACKS', '').split(','):
+            if '=' in item:
+                primary, fallback = item.split('=', 1)
+                self.fallbacks[primary.strip()] = fallback.strip()
+        self.fallbacks.update(fallbacks or {})
+        self.percentile = percentile or float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+        self.timeout = timeout or float(os.getenv('LLM_HEDGE_TIMEOUT', 120))
+        self.default_delay = float(os.getenv('LLM_HEDGE_DELAY', 2.0))
+        self.min_delay = float(os.getenv('LLM_HEDGE_MIN_DELAY', 0.25))
+        self.max_delay = float(os.getenv('LLM_HEDGE_MAX_DELAY', 10))
+        self.min_samples = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+        self.histograms = {}
+        self._lock = threading.Lock()
+        metrics.register_gauge("hedge.first_token_ms", self.latency_summary)
+
+    def histogram(self, model):
+        with self._lock:
+            if model not in self.histograms:
+                self.histograms[model] = LatencyHistogram()
+            return self.histograms[model]
+
+    def hedge_delay(self, model):
+        """Seconds to wait for the primary's first token before hedging."""
+        histogram = self.histogram(model)
+        delay = self.default_delay
+        if len(histogram) >= self.min_samples:
+            delay = histogram.percentile(self.percentile)
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def latency_summary(self):
+        summary = {}
+        for model, histogram in list(self.histograms.items()):
+            if len(histogram):
+                summary[model] = {
+                    f"p{q}": round(histogram.percentile(q) * 1000) for q in (50, 95, 99)
+                }
+                summary[model]["hedge_delay"] = round(self.hedge_delay(model) * 1000)
+        return summary
+
+    def _run(self, attempt, kwargs, signal):
+        try:
+            stream = self.client.chat.completions.create(model=attempt.model, stream=True, **kwargs)
+            attempt.stream = stream
+            for chunk in stream:
+                if attempt.cancelled.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if attempt.first_token_at is None:
+                    attempt.first_token_at = time.monotonic()
+                    self.histogram(attempt.model).record(attempt.first_token_at - attempt.started)
+                    signal.set()
+                attempt.parts.append(content)
+        except Exception as e:
+            if not attempt.cancelled.is_set():
+                attempt.error = e
+                print(f"Chat completion on {attempt.model} failed: {e}")
+        finally:
+            if attempt.cancelled.is_set():
+                self._close(attempt)
+            attempt.done.set()
+            signal.set()
+
+    def _start(self, model, kwargs, signal):
+        attempt = _Attempt(model)
+        threading.Thread(target=self._run, args=(attempt, kwargs, signal), daemon=True,
+                         name=f"hedge-{model}").start()
+        return attempt
+
+    def _close(self, attempt):
+        stream = attempt.stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _cancel(self, attempt):
+        if attempt.first_token_at is None and not attempt.done.is_set():
+            # Censored sample: it was at least this slow, keeping the tail visible
+            self.histogram(attempt.model).record(time.monotonic() - attempt.started)
+        attempt.cancelled.set()
+        self._close(attempt)
+
+    def create(self, messages, model, temperature, max_tokens=2000, priority="interactive"):
+        """
+        Generate a completion, hedging to the fallback model if the primary is slow.
+
+        :return: The reply text.
+        :raises: The last error if every attempt failed, TimeoutError if none finished in time.
+        """
+        kwargs = {"messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        if priority != "interactive":
+            kwargs["priority"] = priority
+        signal = threading.Event()
+        metrics.increment("hedge.requests")
+        attempts = [self._start(model, kwargs, signal)]
+        hedge_at = attempts[0].started + self.hedge_delay(model)
+        deadline = attempts[0].started + self.timeout
+
+        while True:
+            signal.clear()
+            winner = next((a for a in attempts if a.first_token_at is not None), None)
+            if winner:
+                break
+            now = time.monotonic()
+            failed = all(a.done.is_set() for a in attempts)
+            if len(attempts) == 1 and (now >= hedge_at or failed):
+                fallback = self.fallbacks.get(model, model)
+                print(f"Hedging {model} after {now - attempts[0].started:.2f}s with {fallback}")
+                metrics.increment("hedge.hedged")
+                attempts.append(self._start(fallback, kwargs, signal))
+                continue
+            if failed:
+                # Both finished without a token: an error, or an empty reply
+                error = next((a.error for a in reversed(attempts) if a.error), None)
+                if error:
+                    raise error
+                return ""
+            if now >= deadline:
+                for attempt in attempts:
+                    self._cancel(attempt)
+                raise TimeoutError(f"No completion from {model} within {self.timeout:.0f}s")
+            signal.wait(timeout=(hedge_at if len(attempts) == 1 else deadline) - now)
+
+        for attempt in attempts:
+            if attempt is not winner:
+                self._cancel(attempt)
+        metrics.increment("hedge.primary_won" if winner is attempts[0] else "hedge.fallback_won")
+        if not winner.done.wait(timeout=max(deadline - time.monotonic(), 0)):
+            self._cancel(winner)
+            raise TimeoutError(f"Completion from {winner.model} did not finish within {self.timeout:.0f}s")
+        if winner.error:
+            raise winner.error
+        return "".join(winner.parts)
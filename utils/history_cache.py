@@ -0,0 +1,68 @@
+# utils/history_cache.py
+import threading
+from collections import OrderedDict
+
+
+class ConversationHistoryCache:
+    """
+    Per-worker LRU cache of conversation histories.
+
+    Entries are tagged with the Conversation.version they reflect. A cached
+    history is served as long as it is at least as new as the version in the
+    database; anything older is discarded and reloaded. Writes from this
+    worker append to the cached history instead of invalidating it.
+    """
+
+    def __init__(self, max_conversations=256):
+        self.max_conversations = max_conversations
+        self._entries = OrderedDict()  # conversation_id -> (version, messages)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id, version):
+        """Return a copy of the cached history, or None if missing or stale."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry[0] < version:
+                if entry is not None:
+                    del self._entries[conversation_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def version(self, conversation_id):
+        """The version of the cached history, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            return entry[0] if entry else None
+
+    def put(self, conversation_id, version, messages):
+        with self._lock:
+            self._entries[conversation_id] = (version, list(messages))
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def append(self, conversation_id, version, messages, new_version):
+        """
+        Append messages written on top of `version`.
+
+        If the cache does not hold exactly that version, the entry is dropped
+        rather than patched, and the next read reloads it from the database.
+        """
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return
+            if entry[0] != version:
+                del self._entries[conversation_id]
+                return
+            self._entries[conversation_id] = (new_version, entry[1] + list(messages))
+            self._entries.move_to_end(conversation_id)
+
+    def invalidate(self, conversation_id):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
@@ -0,0 +1,279 @@
+# utils/llm_gateway.py
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+import openai
+from utils import metrics
+from utils.single_flight import SingleFlight
+from utils.token_budget import message_tokens
+
+# Lower runs first. Interactive: a user is waiting on the reply; background:
+# work nobody is watching (batch jobs, summaries).
+PRIORITIES = {"interactive": 0, "default": 1, "background": 2}
+
+# Per-process (requests per minute, tokens per minute) for each model. These
+# are OpenAI's usage tier 1 limits; with several workers, give each its share
+# through LLM_RATE_LIMITS, e.g. "gpt-4o=250:15000,gpt-4o-mini=250:100000".
+# Image models count images per minute and have no token limit.
+MODEL_RATE_LIMITS = {
+    "gpt-4o-mini": (500, 200000),
+    "gpt-4o": (500, 30000),
+    "gpt-4": (500, 10000),
+    "gpt-3.5-turbo": (3500, 200000),
+    "dall-e-3": (5, None),
+}
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RateLimitTimeout(Exception):
+    """The request waited longer than the queue timeout for rate-limit capacity."""
+
+
+def parse_rate_limits(spec):
+    """
+    Parse "model=rpm:tpm,model=rpm" into {model: (rpm, tpm)}; a missing or 0 tpm means no token limit.
+    """
+    limits = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        model, values = item.split("=", 1)
+        rpm, _, tpm = values.partition(":")
+        limits[model.strip()] = (int(rpm) or None, int(tpm) if tpm and int(tpm) else None)
+    return limits
+
+
+def retry_after_seconds(error):
+    """Seconds the server asked us to wait (retry-after-ms or retry-after), or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def estimate_tokens(kwargs):
+    """
+    Tokens a chat request counts against the TPM limit: the prompt plus max_tokens,
+    which is how OpenAI accounts for a request when admitting it.
+    """
+    prompt = sum(message_tokens(m, kwargs.get("model") or "gpt-4o-mini") for m in kwargs.get("messages") or [])
+    return prompt + (kwargs.get("max_tokens") or 1000) * (kwargs.get("n") or 1)
+
+
+class TokenBucket:
+    """A bucket of `capacity` units refilled continuously at `per_second`. Not thread-safe on its own."""
+
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (amounts over capacity wait for a full bucket)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0 if self.level >= amount else (amount - self.level) / self.per_second
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+class ModelLane:
+    """
+    Rate-limit state and the waiting requests for one model.
+
+    Buckets hold `burst_seconds` worth of the per-minute limit: OpenAI
+    enforces limits over periods shorter than a minute, so a full minute's
+    requests sent at once would still be rejected.
+    """
+
+    def __init__(self, rpm, tpm, burst_seconds=10):
+        self.requests = TokenBucket(max(rpm * burst_seconds / 60, 1), rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm * burst_seconds / 60, tpm / 60) if tpm else None
+        self.waiters = []  # heap of (priority, seq)
+        self.paused_until = 0
+
+    def wait_time(self, tokens, now, requests=1):
+        wait = max(self.paused_until - now, 0)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(requests, now))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def take(self, tokens, now, requests=1):
+        if self.requests:
+            self.requests.take(requests, now)
+        if self.tokens and tokens:
+            self.tokens.take(tokens, now)
+
+
+class LLMGateway:
+    """
+    Rate-limited, retrying front for the OpenAI client.
+
+    Exposes the same `chat.completions.create` and `images.generate` calls,
+    plus a `priority=` keyword ("interactive", "default" or "background";
+    default "interactive"). Each model has token buckets for its requests
+    and tokens per minute, charged with an estimate before the call is sent.
+    Requests that do not fit wait in a per-model priority queue, so an
+    interactive completion is admitted before queued background work.
+    429s pause the model for the server's Retry-After; 5xx and connection
+    errors are retried with jittered exponential backoff. Identical
+    non-streaming chat requests in flight together are sent once.
+
+    Limits are enforced per process; the server's own limits still apply.
+    """
+
+    def __init__(self, client, limits=None, max_retries=None, queue_timeout=None,
+                 backoff_base=None, backoff_cap=None, burst_seconds=None):
+        self.client = client
+        self.limits = dict(MODEL_RATE_LIMITS)
+        self.limits.update(limits if limits is not None else parse_rate_limits(os.getenv('LLM_RATE_LIMITS')))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 4))
+        self.queue_timeout = queue_timeout or float(os.getenv('LLM_QUEUE_TIMEOUT', 60))
+        self.backoff_base = backoff_base or float(os.getenv('LLM_BACKOFF_BASE', 0.5))
+        self.backoff_cap = backoff_cap or float(os.getenv('LLM_BACKOFF_CAP', 20))
+        self.burst_seconds = burst_seconds or float(os.getenv('LLM_RATE_BURST_SECONDS', 10))
+        self._lanes = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._flights = SingleFlight("llm")
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_completion))
+        self.images = SimpleNamespace(generate=self._image)
+        metrics.register_gauge("llm.queued", self.queued)
+
+    def __getattr__(self, name):
+        # Anything not rate limited here (models.list, embeddings, ...) goes straight through
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def with_priority(self, priority):
+        """A client whose calls go through this gateway at `priority` unless told otherwise."""
+        return SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(
+                create=lambda **kwargs: self._chat_completion(**{"priority": priority, **kwargs})
+            )),
+            images=SimpleNamespace(
+                generate=lambda **kwargs: self._image(**{"priority": priority, **kwargs})
+            ),
+        )
+
+    def queued(self):
+        with self._cond:
+            return sum(len(lane.waiters) for lane in self._lanes.values())
+
+    def _lane(self, model):
+        with self._cond:
+            lane = self._lanes.get(model)
+            if lane is None:
+                rpm, tpm = self.limits.get(model, (None, None))
+                lane = self._lanes[model] = ModelLane(rpm, tpm, self.burst_seconds)
+            return lane
+
+    def _chat_completion(self, priority="interactive", **kwargs):
+        # Looked up per call, so a replaced client attribute is picked up
+        send = lambda: self._call(lambda: self.client.chat.completions.create(**kwargs),
+                                  kwargs.get("model"), estimate_tokens(kwargs), priority)
+        if kwargs.get("stream"):
+            return send()  # A stream can only be read once
+        # Identical requests in flight together share one call and its response
+        key = hashlib.sha256(json.dumps([priority, kwargs], sort_keys=True, default=str).encode()).hexdigest()
+        return self._flights.do(key, send)
+
+    def _image(self, priority="interactive", **kwargs):
+        # Image models are limited in images per minute
+        return self._call(lambda: self.client.images.generate(**kwargs),
+                          kwargs.get("model"), 0, priority, requests=kwargs.get("n") or 1)
+
+    def _acquire(self, lane, priority, seq, tokens, requests, deadline):
+        entry = (priority, seq)
+        with self._cond:
+            heapq.heappush(lane.waiters, entry)
+            self._cond.notify_all()  # A new head may need to re-evaluate
+            try:
+                while True:
+                    now = time.monotonic()
+                    remaining = deadline - now
+                    wait = None
+                    if lane.waiters[0] == entry:
+                        wait = lane.wait_time(tokens, now, requests)
+                        if wait <= 0:
+                            lane.take(tokens, now, requests)
+                            return
+                    if remaining <= 0:
+                        metrics.increment("llm.queue_timeouts")
+                        raise RateLimitTimeout(f"Waited {self.queue_timeout:.0f}s for rate-limit capacity")
+                    self._cond.wait(timeout=min(wait, remaining) if wait is not None else remaining)
+            finally:
+                lane.waiters.remove(entry)
+                heapq.heapify(lane.waiters)
+                self._cond.notify_all()
+
+    def _call(self, send, model, tokens, priority, requests=1):
+        priority = PRIORITIES.get(priority, PRIORITIES["default"])
+        lane = self._lane(model)
+        seq = next(self._seq)  # Kept across retries, so a retry keeps its place in line
+        deadline = time.monotonic() + self.queue_timeout
+        metrics.increment("llm.requests")
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+            self._acquire(lane, priority, seq, tokens, requests, deadline)
+            metrics.increment("llm.queue_wait_ms", int((time.monotonic() - queued_at) * 1000))
+            try:
+                return send()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    metrics.increment("llm.failures")
+                    raise
+                metrics.increment("llm.retries")
+                print(f"LLM call to {model} failed ({e.__class__.__name__}); retrying in {delay:.2f}s")
+                if getattr(e, "status_code", None) == 429:
+                    # Hold every queued request for this model, not just this one
+                    metrics.increment("llm.rate_limited")
+                    with self._cond:
+                        lane.paused_until = max(lane.paused_until, time.monotonic() + delay)
+                        self._cond.notify_all()
+                else:
+                    time.sleep(delay)
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying `error`, or None if it should not be retried."""
+        status = getattr(error, "status_code", None)
+        if not (status in RETRY_STATUSES or isinstance(error, openai.APIConnectionError)):
+            return None
+        # Full jitter, so requests that failed together do not retry together
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
@@ -0,0 +1,63 @@
+# utils/metrics.py
+import threading
+import time
+from collections import Counter
+
+# Process-wide counters, e.g. metrics.increment("speculation.hit").
+# Each gunicorn worker keeps its own; /metrics reports the serving worker's.
+_counters = Counter()
+_gauges = {}
+_lock = threading.Lock()
+_started = time.time()
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    with _lock:
+        return _counters[name]
+
+
+def register_gauge(name, read):
+    """Report `read()` under `name` in every snapshot (e.g. a cache's size)."""
+    with _lock:
+        _gauges[name] = read
+
+
+def ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def snapshot():
+    """Counters, gauges and derived rates as a JSON-serializable dict."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    values = {}
+    for name, read in gauges.items():
+        try:
+            values[name] = read()
+        except Exception as e:
+            values[name] = f"error: {e}"
+    started = counters.get("speculation.started", 0)
+    search_turns = sum(counters.get(f"speculation.{outcome}", 0) for outcome in ("hit", "failed", "not_started"))
+    cache_lookups = sum(counters.get(f"response_cache.{outcome}", 0) for outcome in ("hits", "near_hits", "misses"))
+    return {
+        "uptime_seconds": round(time.time() - _started),
+        "counters": counters,
+        "gauges": values,
+        "rates": {
+            # Share of speculative searches whose result was used
+            "speculation.precision": ratio(counters.get("speculation.hit", 0), started),
+            # Share of search turns that had a speculative result ready to use
+            "speculation.hit_rate": ratio(counters.get("speculation.hit", 0), search_turns),
+            # Share of cacheable completions answered from the response cache
+            "response_cache.hit_rate": ratio(
+                counters.get("response_cache.hits", 0) + counters.get("response_cache.near_hits", 0),
+                cache_lookups
+            ),
+        },
+    }
@@ -0,0 +1,64 @@
+# utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe string."""
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def get_page_size(default, maximum):
+    """Read the 'limit' query parameter, clamped to [1, maximum]."""
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def keyset_before(timestamp_column, id_column, cursor):
+    """Filter for rows strictly before a cursor in (timestamp, id) order."""
+    timestamp, row_id = decode_cursor(cursor)
+    return or_(
+        timestamp_column < timestamp,
+        and_(timestamp_column == timestamp, id_column < row_id)
+    )
+
+
+def fetch_page(query, timestamp_column, id_column, limit, cursor=None):
+    """
+    Load one page of rows, newest first, using keyset pagination.
+
+    Only limit + 1 rows are read; the extra row just tells us whether
+    another page exists.
+
+    :return: Tuple (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    if cursor:
+        query = query.filter(keyset_before(timestamp_column, id_column, cursor))
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,141 @@
+# utils/persistence.py
+import atexit
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from db import db
+from models import Conversation, Message
+from utils.search_index import index_messages
+
+
+def persist_messages(conversation_id, messages):
+    """
+    Stage messages on the current database session without committing.
+
+    The caller owns the transaction, so everything a chat turn writes goes
+    out in a single commit. The conversation's version counter and updated_at
+    are bumped in the same transaction so other workers' history caches and
+    HTTP validators see the change, and the messages are added to the
+    full-text index.
+
+    :param conversation_id: Conversation the messages belong to.
+    :param messages: List of dicts with "role", "content" and optional "timestamp".
+    :return: List of the staged Message objects.
+    """
+    rows = [
+        Message(
+            conversation_id=conversation_id,
+            role=msg["role"],
+            content=msg["content"],
+            timestamp=msg.get("timestamp") or datetime.utcnow()
+        )
+        for msg in messages
+    ]
+    db.session.add_all(rows)
+    Conversation.query.filter_by(id=conversation_id).update(
+        {Conversation.version: Conversation.version + 1, Conversation.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    index_messages(rows)
+    return rows
+
+
+class WriteBehindQueue:
+    """
+    Persist chat messages on a background thread after the response is sent.
+
+    Submissions are batched into one transaction per drain. The queue is
+    bounded: when it is full, submit blocks instead of dropping messages.
+    Failed batches are retried with backoff, and pending messages are flushed
+    when the worker process exits, so messages are lost only if the process
+    is killed outright.
+    """
+
+    def __init__(self, app, max_pending=1000, batch_size=200, max_retries=5):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Called with each conversation_id in a batch that could not be saved
+        self.on_give_up = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="message-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, conversation_id, messages):
+        """Queue messages for persistence. Timestamps are fixed at submit time."""
+        if self._stopped.is_set():
+            raise RuntimeError("Write-behind queue has been shut down")
+        stamped = [{**msg, "timestamp": msg.get("timestamp") or datetime.utcnow()} for msg in messages]
+        self._queue.put((conversation_id, stamped))
+
+    def flush(self, timeout=None):
+        """Block until every submitted message has been committed."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout=30):
+        """Stop accepting work and flush what is pending."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"Write-behind queue did not flush within {timeout}s; {self._queue.qsize()} batches pending")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stop = item is None
+            if not stop:
+                batch.append(item)
+            # Drain whatever else is already waiting into the same transaction
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        for attempt in range(1, self.max_retries + 1):
+            with self.app.app_context():
+                try:
+                    for conversation_id, messages in batch:
+                        persist_messages(conversation_id, messages)
+                    db.session.commit()
+                    return
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Write-behind commit failed (attempt {attempt}/{self.max_retries}): {e}")
+            time.sleep(min(0.1 * 2 ** attempt, 5) * random.uniform(0.5, 1.5))
+        dropped = sum(len(messages) for _, messages in batch)
+        print(f"Write-behind gave up on a batch of {dropped} messages: "
+              f"{[(conversation_id, [m['role'] for m in messages]) for conversation_id, messages in batch]}")
+        for conversation_id in {conversation_id for conversation_id, _ in batch}:
+            for callback in self.on_give_up:
+                try:
+                    callback(conversation_id)
+                except Exception as e:
+                    print(f"Write-behind give-up callback failed: {e}")
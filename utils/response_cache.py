@@ -0,0 +1,172 @@
+# utils/response_cache.py
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from utils import metrics
+
+VECTOR_DIMENSIONS = 2 ** 16
+# Words that flip or pin down an answer; near-duplicates must agree on them exactly
+NEGATIONS = {"no", "not", "never", "none", "without", "cannot", "can't", "don't", "doesn't",
+             "isn't", "aren't", "won't", "shouldn't", "wasn't", "weren't"}
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def normalize_message(text):
+    """Case-, width- and whitespace-insensitive form of a user message, without trailing punctuation."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return re.sub(r"\s+", " ", text).strip().rstrip("?!. ")
+
+
+def digest(value):
+    return hashlib.sha256((value or "").encode("utf-8")).hexdigest()
+
+
+def embed(text):
+    """
+    Sparse, L2-normalized hashed bag of words and word pairs.
+
+    A CPU-only stand-in for a sentence embedding: reworded questions that
+    keep most of their words score high, which is what near-duplicate
+    matching needs here.
+    """
+    words = WORD.findall(text)
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    vector = Counter()
+    for feature, count in features.items():
+        vector[int(hashlib.md5(feature.encode()).hexdigest()[:8], 16) % VECTOR_DIMENSIONS] += count
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {index: value / norm for index, value in vector.items()}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+def pinned_terms(text):
+    """Numbers and negations: a near-duplicate that differs in these asks something else."""
+    return frozenset(w for w in WORD.findall(text) if w.isdigit() or w in NEGATIONS)
+
+
+class ResponseCache:
+    """
+    Cache of chat completions for low-temperature requests.
+
+    Replies are keyed by model, a hash of the system prompt, a hash of the
+    supplemental content, a hash of the conversation history the prompt
+    carries, and the normalized user message. Only requests at or below
+    `max_temperature` are cached: at those temperatures a repeated answer is
+    what the model would most likely have said anyway.
+
+    With `similarity` set, a request that misses may still reuse a reply
+    to an earlier message with the same model and context whose hashed
+    bag-of-words vector is at least that similar, and which has the same
+    numbers and negations.
+
+    Entries expire after `ttl` seconds; past `max_entries` the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, max_temperature=None, similarity=None):
+        self.max_entries = max_entries or int(os.getenv('RESPONSE_CACHE_SIZE', 2048))
+        self.ttl = ttl or float(os.getenv('RESPONSE_CACHE_TTL', 24 * 3600))
+        self.max_temperature = max_temperature if max_temperature is not None else float(
+            os.getenv('RESPONSE_CACHE_MAX_TEMPERATURE', 0.3))
+        if similarity is None and os.getenv('RESPONSE_CACHE_SIMILARITY'):
+            similarity = float(os.getenv('RESPONSE_CACHE_SIMILARITY'))
+        self.similarity = similarity
+        self._entries = OrderedDict()  # key -> (expires_at, context, message, vector, reply)
+        self._by_context = {}  # context -> set of keys, for near-duplicate lookups
+        self._lock = threading.Lock()
+        metrics.register_gauge("response_cache.entries", lambda: len(self._entries))
+
+    def cacheable(self, temperature):
+        return temperature is not None and temperature <= self.max_temperature
+
+    def split_key(self, messages, model):
+        """
+        (context, normalized message) for a prompt built by plan_prompt:
+        system message, history, optional supplemental system message, user message.
+        """
+        system, user, middle = messages[0], messages[-1], messages[1:-1]
+        supplemental = middle[-1] if middle and middle[-1]["role"] == "system" else None
+        history = middle[:-1] if supplemental else middle
+        context = "|".join([
+            model,
+            digest(system.get("content")),
+            digest(supplemental.get("content") if supplemental else ""),
+            digest("\n".join(f"{m['role']}:{m.get('content') or ''}" for m in history)),
+        ])
+        return context, normalize_message(user.get("content"))
+
+    def get(self, messages, model, temperature):
+        """
+        :return: The cached reply, or None on a miss or for an uncacheable request.
+        """
+        if not self.cacheable(temperature) or len(messages) < 2:
+            return None
+        context, message = self.split_key(messages, model)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((context, message))
+            if entry and entry[0] >= now:
+                self._entries.move_to_end((context, message))
+                metrics.increment("response_cache.hits")
+                return entry[4]
+            if entry:
+                self._remove((context, message))
+
+            if self.similarity is not None:
+                vector, pinned = embed(message), pinned_terms(message)
+                best, best_score = None, self.similarity
+                for key in list(self._by_context.get(context, ())):
+                    candidate = self._entries[key]
+                    if candidate[0] < now:
+                        self._remove(key)
+                        continue
+                    if pinned_terms(candidate[2]) != pinned:
+                        continue
+                    score = cosine(vector, candidate[3])
+                    if score >= best_score:
+                        best, best_score = key, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    metrics.increment("response_cache.near_hits")
+                    return self._entries[best][4]
+        metrics.increment("response_cache.misses")
+        return None
+
+    def put(self, messages, model, temperature, reply):
+        if not self.cacheable(temperature) or len(messages) < 2 or not reply:
+            return
+        context, message = self.split_key(messages, model)
+        vector = embed(message) if self.similarity is not None else None
+        with self._lock:
+            key = (context, message)
+            self._entries[key] = (time.monotonic() + self.ttl, context, message, vector, reply)
+            self._entries.move_to_end(key)
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.increment("response_cache.evictions")
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            keys = self._by_context.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_context[entry[1]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
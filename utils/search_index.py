@@ -0,0 +1,236 @@
+# utils/search_index.py
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from db import db
+
+# SQLite: FTS5 table keyed by message id (rowid). It keeps its own copy of the
+# text so it works whatever format Message.content is stored in. session_id is
+# indexed so the session filter is part of the MATCH rather than applied to
+# every match in the corpus afterwards.
+SQLITE_TABLE = 'message_fts'
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+    "content, conversation_id UNINDEXED, session_id, "
+    "tokenize='porter unicode61')"
+)
+# Deleting messages or conversations, by whatever path, drops their index rows.
+# Without this a reused message id would collide with the stale row.
+SQLITE_TRIGGERS = {
+    "message_fts_message_delete": (
+        "CREATE TRIGGER IF NOT EXISTS message_fts_message_delete AFTER DELETE ON message BEGIN "
+        "DELETE FROM message_fts WHERE rowid = old.id; END"
+    ),
+    "message_fts_conversation_delete": (
+        "CREATE TRIGGER IF NOT EXISTS message_fts_conversation_delete AFTER DELETE ON conversation BEGIN "
+        "DELETE FROM message_fts WHERE conversation_id = old.id; END"
+    ),
+}
+SQLITE_PURGE = "DELETE FROM message_fts WHERE rowid NOT IN (SELECT id FROM message)"
+SQLITE_INSERT = (
+    "INSERT INTO message_fts (rowid, content, conversation_id, session_id) "
+    "SELECT :message_id, :content, id, session_id FROM conversation WHERE id = :conversation_id"
+)
+SQLITE_SEARCH = (
+    "SELECT message_fts.rowid AS message_id, message_fts.conversation_id AS conversation_id, "
+    "conversation.title AS conversation_title, message.role AS role, message.timestamp AS timestamp, "
+    "snippet(message_fts, 0, '**', '**', '…', 16) AS snippet, bm25(message_fts, 1.0, 0.0, 0.0) AS rank "
+    "FROM message_fts "
+    "JOIN conversation ON conversation.id = message_fts.conversation_id "
+    "JOIN message ON message.id = message_fts.rowid AND message.conversation_id = message_fts.conversation_id "
+    "WHERE message_fts MATCH :query "
+    "ORDER BY rank LIMIT :limit OFFSET :offset"
+)
+
+# Postgres: side table with a precomputed tsvector and a GIN index.
+POSTGRES_TABLE = 'message_search'
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS message_search ("
+    "message_id INTEGER PRIMARY KEY REFERENCES message (id) ON DELETE CASCADE, "
+    "conversation_id INTEGER NOT NULL, "
+    "session_id VARCHAR(100) NOT NULL, "
+    "tsv TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_message_search_tsv ON message_search USING GIN (tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_message_search_session_id ON message_search (session_id)",
+]
+POSTGRES_INSERT = (
+    "INSERT INTO message_search (message_id, conversation_id, session_id, tsv) "
+    "SELECT :message_id, id, session_id, to_tsvector('english', :content) "
+    "FROM conversation WHERE id = :conversation_id"
+)
+POSTGRES_SEARCH = (
+    "SELECT message_search.message_id AS message_id, message_search.conversation_id AS conversation_id, "
+    "conversation.title AS conversation_title, message.role AS role, message.timestamp AS timestamp, "
+    "ts_rank_cd(message_search.tsv, query) AS rank "
+    "FROM message_search "
+    "CROSS JOIN websearch_to_tsquery('english', :query) AS query "
+    "JOIN conversation ON conversation.id = message_search.conversation_id "
+    "JOIN message ON message.id = message_search.message_id "
+    "WHERE message_search.session_id = :session_id AND message_search.tsv @@ query "
+    "ORDER BY rank DESC, message_search.message_id DESC LIMIT :limit OFFSET :offset"
+)
+
+
+def search_backend():
+    """Return 'sqlite', 'postgresql', or None if full-text search is unsupported."""
+    name = db.session.get_bind().dialect.name
+    return name if name in ('sqlite', 'postgresql') else None
+
+
+def ensure_search_index():
+    """
+    Create the full-text index if it is missing and backfill it from existing
+    messages. Safe to call on every startup.
+    """
+    backend = search_backend()
+    if not backend:
+        print("Full-text search is not supported on this database")
+        return False
+    table = SQLITE_TABLE if backend == 'sqlite' else POSTGRES_TABLE
+    if inspect(db.engine).has_table(table):
+        if backend == 'sqlite':
+            ensure_sqlite_triggers()
+        return True
+    try:
+        if backend == 'sqlite':
+            db.session.execute(text(SQLITE_DDL))
+            for statement in SQLITE_TRIGGERS.values():
+                db.session.execute(text(statement))
+        else:
+            for statement in POSTGRES_DDL:
+                db.session.execute(text(statement))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not create full-text index: {e}")
+        return False
+    rebuild_search_index()
+    return True
+
+
+def ensure_sqlite_triggers():
+    """
+    Add the delete triggers to an index created before they existed, and drop
+    the index rows of messages deleted before then.
+    """
+    existing = set(db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    ).scalars())
+    missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+    if not missing:
+        return
+    try:
+        for name in missing:
+            db.session.execute(text(SQLITE_TRIGGERS[name]))
+        purged = db.session.execute(text(SQLITE_PURGE)).rowcount
+        db.session.commit()
+        print(f"Added full-text index delete triggers; removed {purged} stale index rows")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not add full-text index delete triggers: {e}")
+
+
+def rebuild_search_index(batch_size=1000):
+    """Index every message. Used once when the index is first created."""
+    from models import Message
+    batch = []
+    count = 0
+    for msg in db.session.query(Message).order_by(Message.id).yield_per(batch_size):
+        batch.append(msg)
+        if len(batch) >= batch_size:
+            count += index_messages(batch)
+            batch = []
+    count += index_messages(batch)
+    db.session.commit()
+    print(f"Indexed {count} messages for full-text search")
+
+
+def index_messages(messages):
+    """
+    Add messages to the full-text index inside the current transaction.
+
+    :param messages: Message objects; they are flushed first so ids are assigned.
+    :return: Number of messages indexed.
+    """
+    if not messages:
+        return 0
+    db.session.flush()
+    return index_rows([
+        {"message_id": msg.id, "conversation_id": msg.conversation_id, "content": msg.content}
+        for msg in messages
+    ])
+
+
+def index_rows(rows):
+    """
+    Add already-inserted messages to the full-text index, for bulk inserts
+    that bypass the ORM.
+
+    :param rows: Dicts with "message_id", "conversation_id" and plain-text "content".
+    :return: Number of messages indexed.
+    """
+    backend = search_backend()
+    if not rows or not backend:
+        return 0
+    db.session.execute(text(SQLITE_INSERT if backend == 'sqlite' else POSTGRES_INSERT), rows)
+    return len(rows)
+
+
+def to_fts5_query(query, session_id):
+    """
+    Turn free text into a safe FTS5 query scoped to one session: all terms
+    required, the last one as a prefix.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    session_phrase = session_id.replace('"', '""')
+    return f'session_id : "{session_phrase}" AND content : ({" ".join(quoted)})'
+
+
+def make_snippet(content, query, width=160):
+    """Cut a window of content around the first query term found."""
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in re.findall(r'\w+', query)]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    snippet = content[start:start + width]
+    return ('…' if start else '') + snippet + ('…' if start + width < len(content) else '')
+
+
+def search_messages(session_id, query, limit=20, offset=0):
+    """
+    Search a session's messages, best matches first.
+
+    :return: List of result dicts.
+    :raises ValueError: If search is unsupported on this database.
+    """
+    backend = search_backend()
+    if not backend:
+        raise ValueError("Full-text search is not supported on this database")
+    params = {"session_id": session_id, "limit": limit, "offset": offset}
+    if backend == 'sqlite':
+        params["query"] = to_fts5_query(query, session_id)
+        if not params["query"]:
+            return []
+        rows = db.session.execute(text(SQLITE_SEARCH), params).mappings().all()
+        # Raw SQL on SQLite hands back timestamps as text
+        return [
+            {**row, "timestamp": datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None}
+            for row in rows
+        ]
+
+    from models import Message
+    params["query"] = query
+    rows = db.session.execute(text(POSTGRES_SEARCH), params).mappings().all()
+    contents = dict(
+        db.session.query(Message.id, Message.content)
+        .filter(Message.id.in_([row["message_id"] for row in rows]))
+        .all()
+    )
+    return [
+        {**row, "snippet": make_snippet(contents.get(row["message_id"], ""), query)}
+        for row in rows
+    ]
@@ -0,0 +1,47 @@
+# utils/session_backend.py
+import os
+from flask_session import Session
+
+SESSION_BACKENDS = ("filesystem", "sqlalchemy", "cookie")
+
+
+def configure_sessions(app, db, backend=None):
+    """
+    Set up the session store selected by SESSION_BACKEND.
+
+    - filesystem: Flask-Session files in ./flask_session (the original setup).
+    - sqlalchemy: Flask-Session rows in a `sessions` table in the app database.
+      Expired rows are deleted on average every SESSION_CLEANUP_N_REQUESTS
+      requests (0 disables this; run `flask session_cleanup` from cron instead).
+    - cookie: Flask's built-in signed cookie. The app only keeps a session id
+      and the current conversation id in the session, so there is nothing to
+      store server side and no I/O per request.
+
+    Must run after db.init_app(app), since the sqlalchemy backend creates its
+    table on the app's engine.
+
+    :param app: The Flask application.
+    :param db: The Flask-SQLAlchemy instance.
+    :param backend: Backend name; defaults to the SESSION_BACKEND env var.
+    :return: The backend name that was configured.
+    """
+    backend = (backend or os.getenv("SESSION_BACKEND", "filesystem")).lower()
+    if backend not in SESSION_BACKENDS:
+        print(f"Unknown SESSION_BACKEND {backend!r}; using filesystem sessions")
+        backend = "filesystem"
+
+    if backend == "cookie":
+        # Flask's default SecureCookieSessionInterface, signed with SECRET_KEY
+        app.config.setdefault("SESSION_COOKIE_HTTPONLY", True)
+        print("Using signed-cookie sessions")
+        return backend
+
+    app.config["SESSION_TYPE"] = backend
+    if backend == "sqlalchemy":
+        app.config["SESSION_SQLALCHEMY"] = db
+        app.config["SESSION_SQLALCHEMY_TABLE"] = os.getenv("SESSION_SQLALCHEMY_TABLE", "sessions")
+        cleanup = int(os.getenv("SESSION_CLEANUP_N_REQUESTS", 1000))
+        app.config["SESSION_CLEANUP_N_REQUESTS"] = cleanup or None
+    Session(app)
+    print(f"Using {backend} sessions")
+    return backend
@@ -0,0 +1,56 @@
+# utils/single_flight.py
+import threading
+from utils import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls.
+
+    The first caller for a key runs the function. Callers arriving with the
+    same key while it runs wait and get the same result, or the same
+    exception. Nothing is kept once the call finishes, so this shares work
+    between requests in flight together and is not a cache.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        :param key: Normalized identity of the call.
+        :param fn: Zero-argument function doing the work.
+        :return: fn's result, possibly from another thread's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.increment(f"single_flight.{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.increment(f"single_flight.{self.name}.executed")
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
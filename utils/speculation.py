@@ -0,0 +1,132 @@
+# utils/speculation.py
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from utils import metrics
+
+# Cheap signals that a message will be routed to internet_search
+FRESHNESS = re.compile(
+    r'\b(latest|current|currently|recent|recently|news|today|tonight|yesterday|this (week|month|year)|'
+    r'upcoming|now|price|weather|forecast|score|schedule|announced|released)\b', re.I
+)
+QUESTION = re.compile(r'^\s*(who|what|when|where|which|how (many|much)|is there|are there)\b', re.I)
+YEAR_OR_DATE = re.compile(r'\b(19|20)\d{2}\b|\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2}\b', re.I)
+URL = re.compile(r'https?://\S+', re.I)
+# Capitalized words after the first word, e.g. "Camp Lejeune", "General Smith"
+NAMED_ENTITY = re.compile(r'(?<!^)(?<![.!?]\s)\b[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*')
+# Signals for the routes that never search
+OTHER_ROUTE = re.compile(
+    r'\b(your code|code base|codebase|FILE:\d+|uploaded|this file|the file|image of|picture of|draw|'
+    r'generate an image|random number|diagram|visuali[sz]e)\b', re.I
+)
+
+
+def search_likelihood(message):
+    """
+    Score how likely a message is to need a web search, from 0 to 1.
+
+    :param message: The user's message.
+    :return: Float score; messages pointing at other routes score 0.
+    """
+    if not message or OTHER_ROUTE.search(message):
+        return 0.0
+    score = 0.0
+    if URL.search(message):
+        score += 0.6
+    if FRESHNESS.search(message):
+        score += 0.4
+    if YEAR_OR_DATE.search(message):
+        score += 0.25
+    if QUESTION.search(message):
+        score += 0.2
+    if NAMED_ENTITY.search(message):
+        score += 0.2
+    return min(score, 1.0)
+
+
+class SpeculativeSearch:
+    """
+    Run a web search concurrently with the routing call, on a guess.
+
+    start() launches the search on a small thread pool when the message
+    looks search-bound and a worker is free; the caller then either uses the
+    result (routing confirmed internet_search) or cancels it. A cancelled
+    search stops at its next step (before the Custom Search request or the
+    next page fetch). Outcomes and wasted calls are counted in utils.metrics.
+    """
+
+    def __init__(self, web_search_cog, max_workers=None, threshold=None):
+        self.web_search_cog = web_search_cog
+        self.max_workers = max_workers or int(os.getenv('SPECULATIVE_SEARCH_WORKERS', 4))
+        self.threshold = threshold if threshold is not None else float(os.getenv('SPECULATIVE_SEARCH_THRESHOLD', 0.4))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="speculative-search")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self, message, history):
+        """
+        Start a speculative search if the message looks search-bound.
+
+        :return: A handle for use() / cancel(), or None if nothing was started.
+        """
+        if search_likelihood(message) < self.threshold:
+            return None
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                # Never queue: a speculative search that starts late saves nothing
+                metrics.increment("speculation.skipped_busy")
+                return None
+            self._in_flight += 1
+        handle = {"cancel": threading.Event(), "stats": {}}
+        handle["future"] = self._executor.submit(self._run, message, list(history), handle)
+        metrics.increment("speculation.started")
+        return handle
+
+    def _run(self, message, history, handle):
+        try:
+            return self.web_search_cog.web_search(
+                message, history, cancel_event=handle["cancel"], stats=handle["stats"]
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def use(self, handle, timeout=30):
+        """
+        Wait for a speculative search whose route was confirmed.
+
+        :return: The search content, or None if it failed (the caller then searches normally).
+        """
+        if handle is None:
+            metrics.increment("speculation.not_started")
+            return None
+        try:
+            content = handle["future"].result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel(handle, outcome="failed")
+            return None
+        except Exception as e:
+            print(f"Speculative search failed: {e}")
+            content = None
+        if not content or not handle["stats"].get("ok"):
+            # Error messages and empty results: let the caller search with the planned queries
+            metrics.increment("speculation.failed")
+            return None
+        metrics.increment("speculation.hit")
+        return content
+
+    def cancel(self, handle, outcome="cancelled"):
+        """Discard a speculative search, counting the calls it already made as wasted."""
+        if handle is None:
+            return
+        handle["cancel"].set()
+        metrics.increment(f"speculation.{outcome}")
+
+        def count_waste(future):
+            stats = handle["stats"]
+            metrics.increment("speculation.wasted_llm_calls", stats.get("llm_calls", 0))
+            metrics.increment("speculation.wasted_search_calls", stats.get("search_calls", 0))
+            metrics.increment("speculation.wasted_page_fetches", stats.get("page_fetches", 0))
+
+        handle["future"].add_done_callback(count_waste)
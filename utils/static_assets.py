@@ -0,0 +1,167 @@
+# utils/static_assets.py
+import gzip
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import request, send_file
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+PRECOMPRESS_EXTENSIONS = {'.js', '.css', '.html', '.json', '.map', '.svg', '.txt', '.ico'}
+PRECOMPRESS_MIN_SIZE = 1024
+# CRA build output: main.f0348447.js, 453.2b1e5c4a.chunk.css, logo.4f5e6a7b.svg
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAssets:
+    """
+    In-memory manifest of the built frontend, scanned once at startup.
+
+    Requests are resolved with a dict lookup instead of touching the
+    filesystem, unknown paths fall back to index.html for client-side
+    routing, and .br/.gz files written by `flask precompress-static` are
+    served to clients that accept them.
+    """
+
+    def __init__(self, static_folder, index='index.html'):
+        self.static_folder = static_folder
+        self.index = index
+        self.files = {}
+        self.scan()
+
+    def _hashed_paths(self):
+        """Paths the build tool fingerprinted, from asset-manifest.json."""
+        try:
+            with open(os.path.join(self.static_folder, 'asset-manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        return {
+            url.lstrip('/') for url in manifest.get('files', {}).values()
+            if HASHED_NAME.search(os.path.basename(url))
+        }
+
+    def scan(self):
+        """Rebuild the manifest from the static folder."""
+        found = set()
+        for root, _, names in os.walk(self.static_folder):
+            for name in names:
+                found.add(os.path.relpath(os.path.join(root, name), self.static_folder).replace(os.sep, '/'))
+
+        hashed = self._hashed_paths()
+        files = {}
+        for path in found:
+            if any(path.endswith(suffix) for _, suffix in ENCODINGS):
+                continue
+            files[path] = {
+                'path': os.path.join(self.static_folder, path),
+                'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                # Anything under static/ with a content hash in its name never changes
+                'immutable': path in hashed or (path.startswith('static/') and bool(HASHED_NAME.search(path))),
+                'variants': {
+                    encoding: os.path.join(self.static_folder, path + suffix)
+                    for encoding, suffix in ENCODINGS if path + suffix in found
+                },
+            }
+        self.files = files
+        print(f"Static manifest: {len(files)} files, "
+              f"{sum(1 for f in files.values() if f['immutable'])} immutable, "
+              f"{sum(1 for f in files.values() if f['variants'])} precompressed")
+
+    def _choose_variant(self, entry):
+        accepted = request.accept_encodings
+        for encoding, _ in ENCODINGS:
+            if encoding in entry['variants'] and accepted[encoding]:
+                return encoding, entry['variants'][encoding]
+        return None, entry['path']
+
+    def serve(self, path):
+        """Response for a frontend path; index.html when it is not a file."""
+        entry = self.files.get(path) or self.files.get(self.index)
+        if entry is None:
+            return "Frontend build not found", 404
+
+        encoding, file_path = self._choose_variant(entry)
+        response = send_file(file_path, mimetype=entry['mimetype'], conditional=True, etag=True)
+        if entry['variants']:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        if entry['immutable']:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # index.html and unhashed files must be revalidated so new builds show up
+            response.cache_control.max_age = None
+            response.cache_control.no_cache = True
+        return response
+
+
+def precompress_folder(static_folder, min_size=PRECOMPRESS_MIN_SIZE):
+    """
+    Write .gz (and .br, when brotli is installed) next to each compressible
+    file, skipping variants that are already up to date or not smaller.
+
+    :return: Number of variant files written.
+    """
+    written = 0
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in PRECOMPRESS_EXTENSIONS or os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            compressors = [('.gz', lambda body: gzip.compress(body, compresslevel=9, mtime=0))]
+            if brotli:
+                compressors.append(('.br', lambda body: brotli.compress(body, quality=11)))
+            for suffix, compress in compressors:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                body = compress(data)
+                if len(body) >= len(data):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(body)
+                written += 1
+    return written
+
+
+def init_static_assets(app, static_folder):
+    """
+    Serve the React build from an in-memory manifest and register the
+    `flask precompress-static` command that writes the .br/.gz variants.
+    """
+    assets = StaticAssets(static_folder)
+
+    @app.route("/")
+    def index():
+        return assets.serve(assets.index)
+
+    @app.route("/<path:path>")
+    def static_proxy(path):
+        # Serve static files if they exist, else serve index.html (for SPA routing)
+        return assets.serve(path)
+
+    @app.cli.command("precompress-static")
+    @click.option("--min-size", default=PRECOMPRESS_MIN_SIZE, show_default=True,
+                  help="Skip files smaller than this many bytes.")
+    def precompress_static(min_size):
+        """Write .gz/.br variants of the frontend build for static serving."""
+        written = precompress_folder(static_folder, min_size)
+        click.echo(f"Wrote {written} precompressed files in {static_folder}"
+                   + ("" if brotli else " (brotli not installed: gzip only)"))
+
+    return assets
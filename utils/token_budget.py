@@ -0,0 +1,151 @@
+# utils/token_budget.py
+from functools import lru_cache
+import tiktoken
+
+# Hard cap on the prompt we are willing to send, regardless of context window.
+PROMPT_TOKEN_LIMIT = 50000
+
+# Approximate per-message overhead (role, separators) added by the chat format.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_NOTICE = "\n\n[Truncated to fit the token budget.]"
+
+# Per-model budgets in tokens. "response" is reserved for the completion
+# (matches max_tokens in generate_chat_response), "system" caps the system
+# prompt, and "history" is the share conversation history is guaranteed before
+# supplemental information (file text, code base, web content) may use the rest.
+MODEL_BUDGETS = {
+    "gpt-4o-mini": {"context": 128000, "response": 2000, "system": 2000, "history": 12000},
+    "gpt-4o": {"context": 128000, "response": 2000, "system": 2000, "history": 12000},
+    "gpt-4": {"context": 8192, "response": 2000, "system": 1000, "history": 2500},
+    "gpt-3.5-turbo": {"context": 16385, "response": 2000, "system": 1000, "history": 5000},
+}
+DEFAULT_BUDGET = MODEL_BUDGETS["gpt-4o-mini"]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model="gpt-4o-mini"):
+    """Return the tokenizer for a model, loaded once per process."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """Count the tokens in a string."""
+    if not text:
+        return 0
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def message_tokens(message, model="gpt-4o-mini"):
+    """Count the tokens a chat message contributes to the prompt."""
+    return count_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4o-mini"):
+    """
+    Cut text to at most max_tokens tokens, keeping the beginning.
+
+    :return: Tuple (text, truncated) where truncated is True if text was cut.
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text or "", disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, False
+    notice_tokens = len(encoding.encode(TRUNCATION_NOTICE))
+    keep = max(max_tokens - notice_tokens, 0)
+    return encoding.decode(tokens[:keep]) + TRUNCATION_NOTICE, True
+
+
+def _truncate_message(message, max_tokens, model):
+    content, truncated = truncate_to_tokens(
+        message.get("content") or "", max(max_tokens - MESSAGE_OVERHEAD_TOKENS, 0), model
+    )
+    return {**message, "content": content}, truncated
+
+
+def get_budget(model):
+    return MODEL_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+def plan_prompt(system_message, conversation_history, supplemental_information, user_message, model):
+    """
+    Assemble the prompt within explicit per-section token budgets.
+
+    The user message and system prompt are fitted first, history is then
+    guaranteed its share, supplemental information gets what remains, and any
+    space supplemental information leaves unused goes back to history. History
+    is dropped from the oldest end; everything else is truncated from the end.
+
+    :param system_message: System message dict.
+    :param conversation_history: List of prior message dicts, oldest first.
+    :param supplemental_information: Supplemental message dict, or empty.
+    :param user_message: User message dict.
+    :param model: Model name used to pick budgets and the tokenizer.
+    :return: Tuple (messages, breakdown) where breakdown maps each section to
+             the tokens it uses.
+    """
+    budget = get_budget(model)
+    available = min(budget["context"] - budget["response"], PROMPT_TOKEN_LIMIT)
+    truncated_sections = []
+
+    # The user's own message always goes out, cut only if it alone blows the budget.
+    user_message, truncated = _truncate_message(user_message, available // 2, model)
+    if truncated:
+        truncated_sections.append("user")
+    user_tokens = message_tokens(user_message, model)
+
+    system_message, truncated = _truncate_message(system_message, budget["system"], model)
+    if truncated:
+        truncated_sections.append("system")
+    system_tokens = message_tokens(system_message, model)
+
+    remaining = max(available - user_tokens - system_tokens, 0)
+
+    history_costs = [message_tokens(msg, model) for msg in conversation_history]
+    history_floor = min(sum(history_costs), budget["history"], remaining)
+
+    supplemental_tokens = 0
+    if supplemental_information:
+        supplemental_allowance = remaining - history_floor
+        if supplemental_allowance <= MESSAGE_OVERHEAD_TOKENS:
+            supplemental_information = {}
+            truncated_sections.append("supplemental")
+        elif message_tokens(supplemental_information, model) > supplemental_allowance:
+            supplemental_information, _ = _truncate_message(
+                supplemental_information, supplemental_allowance, model
+            )
+            truncated_sections.append("supplemental")
+        supplemental_tokens = message_tokens(supplemental_information, model)
+
+    history_allowance = remaining - supplemental_tokens
+    kept_history = []
+    history_tokens = 0
+    for msg, cost in zip(reversed(conversation_history), reversed(history_costs)):
+        if history_tokens + cost > history_allowance:
+            break
+        kept_history.insert(0, msg)
+        history_tokens += cost
+    dropped = len(conversation_history) - len(kept_history)
+    if dropped:
+        truncated_sections.append("history")
+
+    messages = [system_message] + kept_history
+    if supplemental_information:
+        messages.append(supplemental_information)
+    messages.append(user_message)
+
+    breakdown = {
+        "model": model,
+        "system": system_tokens,
+        "history": history_tokens,
+        "history_messages_dropped": dropped,
+        "supplemental": supplemental_tokens,
+        "user": user_tokens,
+        "response_reserve": budget["response"],
+        "prompt_total": system_tokens + history_tokens + supplemental_tokens + user_tokens,
+        "truncated": truncated_sections,
+    }
+    return messages, breakdown
@@ -0,0 +1,216 @@
+# utils/upload_storage.py
+import os
+import threading
+import time
+from db import db
+from models import UploadedFile
+from utils import metrics
+
+# Files the app renders itself and can always regenerate
+DERIVED_PREFIXES = ("codebase_structure_",)
+
+
+class UploadStorageManager:
+    """
+    Keep the uploads folder under a byte quota.
+
+    The folder is scanned at startup; after that, saves, renders and
+    downloads update an in-memory index of sizes and last-access times.
+    When the indexed total passes the quota, a background thread evicts
+    files from the index until usage is back under the low watermark, in
+    this order:
+
+    1. Derived artifacts (rendered diagrams), least recently used first.
+       Messages keep linking to them; UploadsCog re-renders a diagram on
+       request while the code tree is unchanged, and 404s once it differs.
+    2. Orphaned uploads that no UploadedFile row refers to.
+    3. Only with UPLOADS_EVICT_REFERENCED=1: uploads conversations still
+       refer to, least recently used first, with their UploadedFile rows.
+
+    Without the opt-in, eviction stops after orphans and reports when the
+    quota cannot be met. Each worker process keeps its own index; the
+    background thread reconciles it with the folder every
+    UPLOADS_RESCAN_SECONDS to pick up other workers' files, so their
+    writes can go uncounted for at most that long.
+    """
+
+    def __init__(self, app, upload_folder, quota_bytes=None, low_watermark=0.9, orphan_grace_seconds=None,
+                 evict_referenced=None, rescan_seconds=None):
+        self.app = app
+        self.upload_folder = upload_folder
+        if quota_bytes is None:
+            quota_bytes = int(float(os.getenv('UPLOADS_QUOTA_MB', 1024)) * 1024 * 1024)
+        self.quota_bytes = quota_bytes
+        self.low_watermark = low_watermark
+        # Uploads younger than this may still have an uncommitted UploadedFile row
+        if orphan_grace_seconds is None:
+            orphan_grace_seconds = int(os.getenv('UPLOADS_ORPHAN_GRACE_SECONDS', 3600))
+        self.orphan_grace_seconds = orphan_grace_seconds
+        if evict_referenced is None:
+            evict_referenced = os.getenv('UPLOADS_EVICT_REFERENCED', '').lower() in ('1', 'true', 'yes')
+        self.evict_referenced = evict_referenced
+        self.rescan_seconds = rescan_seconds or int(os.getenv('UPLOADS_RESCAN_SECONDS', 300))
+        self.quota_unmet = False
+        self.on_evict = []  # Callbacks taking a filename, e.g. to drop cached lookups
+
+        self._files = {}  # filename -> [size, last_access]
+        self._total = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.evicted = 0
+
+        self.scan()
+        print(f"Upload storage: {len(self._files)} files, {self._total / 1e6:.1f} MB"
+              + (f" of {self.quota_bytes / 1e6:.0f} MB quota" if self.quota_bytes else " (no quota)"))
+        if self.quota_bytes:
+            threading.Thread(target=self._run, name="upload-eviction", daemon=True).start()
+            self._wakeup.set()
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def scan(self):
+        """Reconcile the index with the folder, keeping access times already tracked."""
+        started = time.time()
+        found = {}
+        try:
+            with os.scandir(self.upload_folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        found[entry.name] = [st.st_size, max(st.st_atime, st.st_mtime)]
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            for name, info in found.items():
+                known = self._files.get(name)
+                if known:
+                    info[1] = max(info[1], known[1])
+            for name, info in self._files.items():
+                # Recorded while the folder was being listed
+                if name not in found and info[1] >= started:
+                    found[name] = info
+            self._files = found
+            self._total = sum(size for size, _ in found.values())
+
+    def record(self, filename):
+        """Index a file that was just written and trigger eviction if over quota."""
+        try:
+            size = os.path.getsize(os.path.join(self.upload_folder, filename))
+        except OSError:
+            return
+        with self._lock:
+            previous = self._files.get(filename)
+            self._total += size - (previous[0] if previous else 0)
+            self._files[filename] = [size, time.time()]
+            over = self.quota_bytes and self._total > self.quota_bytes
+        if over:
+            self._wakeup.set()
+
+    def touch(self, filename):
+        """Note that a file was served."""
+        with self._lock:
+            info = self._files.get(filename)
+            if info:
+                info[1] = time.time()
+
+    def _run(self):
+        last_scan = time.monotonic()
+        while True:
+            self._wakeup.wait(timeout=self.rescan_seconds)
+            self._wakeup.clear()
+            if time.monotonic() - last_scan >= self.rescan_seconds:
+                # Periodic reconcile, off the request path, for files other workers wrote
+                self.scan()
+                last_scan = time.monotonic()
+            with self.app.app_context():
+                try:
+                    self.evict()
+                except Exception as e:
+                    print(f"Upload eviction failed: {e}")
+                    db.session.rollback()
+
+    def _referenced(self, filenames):
+        referenced = set()
+        filenames = list(filenames)
+        for start in range(0, len(filenames), 500):
+            referenced.update(
+                row.filename for row in db.session.query(UploadedFile.filename)
+                .filter(UploadedFile.filename.in_(filenames[start:start + 500]))
+            )
+        return referenced
+
+    def evict(self):
+        """
+        Delete files until usage is under the low watermark.
+
+        Works from the in-memory index; the folder is not rescanned. Needs an
+        app context for the UploadedFile lookups.
+
+        :return: List of evicted filenames.
+        """
+        with self._lock:
+            if not self.quota_bytes or self._total <= self.quota_bytes:
+                self.quota_unmet = False
+                return []
+            # Copied under the lock: record() and touch() update entries in place
+            snapshot = sorted(((name, tuple(info)) for name, info in self._files.items()),
+                              key=lambda item: item[1][1])
+            remaining = self._total
+        sizes = {name: size for name, (size, _) in snapshot}
+
+        derived = [name for name, _ in snapshot if name.startswith(DERIVED_PREFIXES)]
+        cutoff = time.time() - self.orphan_grace_seconds
+        uploads = [name for name, (_, last_access) in snapshot
+                   if not name.startswith(DERIVED_PREFIXES) and last_access < cutoff]
+        referenced = self._referenced(uploads)
+        orphans = [name for name in uploads if name not in referenced]
+        in_use = [name for name in uploads if name in referenced] if self.evict_referenced else []
+
+        # Plan first: rows are deleted before their files, so a failed commit
+        # leaves both in place rather than rows pointing at missing files
+        target = self.quota_bytes * self.low_watermark
+        planned = []
+        for name in derived + orphans + in_use:
+            if remaining <= target:
+                break
+            remaining -= sizes[name]
+            planned.append(name)
+        self.quota_unmet = remaining > target
+        if self.quota_unmet:
+            print(f"Upload quota cannot be met: {remaining / 1e6:.1f} MB would remain after evicting "
+                  f"{len(planned)} files (quota {self.quota_bytes / 1e6:.0f} MB)"
+                  + ("" if self.evict_referenced else "; set UPLOADS_EVICT_REFERENCED=1 to evict referenced uploads"))
+            metrics.increment("uploads.quota_unmet")
+
+        evicted_rows = [name for name in planned if name in referenced]
+        for start in range(0, len(evicted_rows), 500):
+            UploadedFile.query.filter(
+                UploadedFile.filename.in_(evicted_rows[start:start + 500])
+            ).delete(synchronize_session=False)
+        if evicted_rows:
+            db.session.commit()
+
+        evicted = []
+        for name in planned:
+            try:
+                os.remove(os.path.join(self.upload_folder, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not evict {name}: {e}")
+                continue
+            with self._lock:
+                info = self._files.pop(name, None)
+                if info:
+                    self._total -= info[0]
+            evicted.append(name)
+
+        for name in evicted:
+            for callback in self.on_evict:
+                callback(name)
+        self.evicted += len(evicted)
+        print(f"Evicted {len(evicted)} upload files ({len(evicted_rows)} with UploadedFile rows); "
+              f"{self._total / 1e6:.1f} MB in use")
+        return evicted